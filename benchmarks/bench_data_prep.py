@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Regression benchmarks for the public methods of Expenditures, Collection,
+ReadingRoom and LoanColl (with the inherited methods of DataPreparation). The
+methods run on the storage files of the synthetic data generator
+(src/synthetic_data.py) in several sizes:
+
+    year         one year
+    decade       ten years
+    decade_x100  ten years with 100 times the data volume
+
+Every method gets a fresh copy of the loaded frame, the best of --repeat runs
+is reported. With --save-baseline the results are stored as baseline (per
+machine, by default benchmarks/results/data_prep_baseline.json), later runs
+are compared with it: a method is flagged if it is slower than the baseline
+by more than --threshold (and --min-delta), with --fail the exit code is 1.
+
+    python benchmarks/bench_data_prep.py --save-baseline
+    python benchmarks/bench_data_prep.py --fail
+    python benchmarks/bench_data_prep.py --sizes year decade --filter LoanColl
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+
+import pandas as pd
+
+# the project root, started as a script only the folder benchmarks is on the path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.data_prep import Expenditures, Collection, ReadingRoom, LoanColl  # noqa: E402
+from src.synthetic_data import SyntheticData, DATASETS, dataset_paths  # noqa: E402
+
+BASELINE_FILE = os.path.join(PROJECT_ROOT, 'benchmarks', 'results', 'data_prep_baseline.json')
+
+# years and scale factor of the generator
+SIZES = {
+    'year': (1, 1),
+    'decade': (10, 1),
+    'decade_x100': (10, 100),
+}
+
+def make_datasets(directory, years, scale, seed=0):
+    """Writes the storage and helper files of the synthetic data generator
+    (src/synthetic_data.py) and returns their paths.
+
+    Parameters
+    ----------
+    directory : str
+        the directory of the files.
+    years : int
+        the number of years up to the current month.
+    scale : int
+        the factor of the data volume.
+    seed : int, optional
+        seed for the random generator, by default 0
+
+    Returns
+    -------
+    dict:
+        with the paths of the storage and helper files by name.
+    """
+    generator = SyntheticData(scale, seed, years)
+    paths = dataset_paths(directory)
+    generator.write_helper_files(paths['helper'])
+    for name in DATASETS:
+        generator.write_storage(getattr(generator, name)(), paths['storage'][name])
+
+    # the largest suppliers for change_col_val (a regex per supplier)
+    suppliers = os.path.join(directory, 'suppliers.csv')
+    pd.read_csv(paths['helper']['lieferanten']).head(5).to_csv(suppliers, index=False)
+
+    return dict(paths['storage'], media_types=paths['helper']['medientypen'],
+                suppliers=suppliers)
+
+
+def cases(paths):
+    """Returns the benchmark cases: name, class, dataset and the call."""
+    # the largest supplier and RVK group
+    body = pd.read_csv(paths['suppliers'])['Lieferant Abk.'][0]
+    return [
+        # inherited methods of DataPreparation
+        ('Expenditures.create_dataframe', Expenditures, 'umsatz',
+         lambda o: o.create_dataframe(paths['umsatz'])),
+        ('Expenditures.get_specific_dates_dataframe', Expenditures, 'umsatz',
+         lambda o: o.get_specific_dates_dataframe('Datum')),
+        ('Expenditures.top_number_values', Expenditures, 'umsatz',
+         lambda o: o.top_number_values('Lieferant Abk.', 'Umsatz (EUR)')),
+        ('Expenditures.groupby_sum', Expenditures, 'umsatz',
+         lambda o: o.groupby_sum('Lieferant Abk.', o._df['Datum'], 'Umsatz (EUR)')),
+        # change_col_val replaces in the whole frame, it runs on the column alone
+        ('Expenditures.change_col_val', Expenditures, 'umsatz',
+         lambda o: setattr(o, '_df', o._df[['Lieferant Abk.']])
+         or o.change_col_val(paths['suppliers'], 'Lieferant Abk.')),
+        # Expenditures
+        ('Expenditures.total_expnd_net', Expenditures, 'umsatz',
+         lambda o: o.total_expnd_net('Datum', 'Umsatz (EUR)')),
+        ('Expenditures.total_expnd_mean_by_body', Expenditures, 'umsatz',
+         lambda o: o.total_expnd_mean_by_body('Datum', 'Umsatz (EUR)', 'Lieferant Abk.', body)),
+        ('Expenditures.total_expnd_net_year_by_body', Expenditures, 'umsatz',
+         lambda o: o.total_expnd_net_year_by_body('Datum', 'Lieferant Abk.', body)),
+        ('Expenditures.total_expnd_net_current_year', Expenditures, 'umsatz',
+         lambda o: o.total_expnd_net_current_year('Datum', 'Umsatz (EUR)')),
+        ('Expenditures.total_expnd_net_current_year_by_body', Expenditures, 'umsatz',
+         lambda o: o.total_expnd_net_current_year_by_body(
+             'Datum', 'Umsatz (EUR)', 'Lieferant Abk.', body)),
+        ('Expenditures.total_expnd_net_years', Expenditures, 'umsatz',
+         lambda o: o.total_expnd_net_years('Datum')),
+        ('Expenditures.total_expnd_net_year', Expenditures, 'umsatz',
+         lambda o: o.total_expnd_net_year('Datum', 'Lieferant Abk.', 'Umsatz (EUR)',
+                                          'Umsatz Diff', body)),
+        ('Expenditures.total_expnd_by_bodies_above_value', Expenditures, 'umsatz',
+         lambda o: o.total_expnd_by_bodies_above_value('Datum', 'Lieferant Abk.',
+                                                       'Umsatz (EUR)', 9)),
+        ('Expenditures.total_expnd_by_bodies_above_value (budget)', Expenditures, 'budget',
+         lambda o: o.total_expnd_by_bodies_above_value('Datum', 'Bezeichnung', 'Ausg. ges.', 4)),
+        # Collection
+        ('Collection.total_collection_years', Collection, 'newacq',
+         lambda o: o.total_collection_years('Datum', 'Signatur')),
+        ('Collection.development_collection_current_year', Collection, 'newacq',
+         lambda o: o.development_collection_current_year('Datum', 'Signatur')),
+        ('Collection.development_media_type_years', Collection, 'newacq',
+         lambda o: o.development_media_type_years(paths['media_types'], '0500', 'Signatur',
+                                                  'Datum', 'Jahr', 'Ex')),
+        ('Collection.development_by_classification', Collection, 'newacq',
+         lambda o: o.development_by_classification('Datum', 'Jahr', 'Systematikgruppe', 'LH')),
+        ('Collection.development_cumsum', Collection, 'newacq',
+         lambda o: o.development_cumsum('Signatur', 'Datum', 'Ex')),
+        ('Collection.development_collection_top_class_years', Collection, 'newacq',
+         lambda o: o.development_collection_top_class_years('Systematikgruppe', 'Signatur',
+                                                            'Datum', 'Ex')),
+        ('Collection.development_collection_class_overall_top', Collection, 'newacq',
+         lambda o: o.development_collection_class_overall_top('Datum', 'Signatur',
+                                                              'Systematikgruppe', 'Ex')),
+        # ReadingRoom
+        ('ReadingRoom.use_by_years', ReadingRoom, 'readingroom',
+         lambda o: o.use_by_years('Jahr')),
+        ('ReadingRoom.use_by_months', ReadingRoom, 'readingroom',
+         lambda o: o.use_by_months('Jahr', 'Datum', 'Monat', year=None)),
+        # LoanColl
+        ('LoanColl.total_loans', LoanColl, 'loan',
+         lambda o: o.total_loans('year', 'cum_loans', 'Systematikgruppe')),
+        ('LoanColl.total_loans (per_year)', LoanColl, 'loan',
+         lambda o: o.total_loans('year', 'cum_loans', 'Systematikgruppe', per_year=True)),
+        ('LoanColl.top_loans_by_title', LoanColl, 'loan',
+         lambda o: o.top_loans_by_title('year', 'cum_loans', 5)),
+        ('LoanColl.library_loan_class', LoanColl, 'loan',
+         lambda o: o.library_loan_class('year', 'Systematikgruppe', 'Buchservice', 'cum_loans')),
+    ]
+
+
+def run(size, repeat, name_filter=None, seed=0):
+    """Runs all cases on the datasets of one size.
+
+    Returns
+    -------
+    dict:
+        with the best time in seconds and the rows of the dataset per case.
+    """
+    years, scale = SIZES[size]
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = make_datasets(tmp, years, scale, seed)
+        instances = {}
+        for name, cls, dataset, call in cases(paths):
+            if name_filter and name_filter not in name:
+                continue
+            if (cls, dataset) not in instances:
+                obj = cls(paths[dataset])
+                instances[(cls, dataset)] = (obj, obj._df)
+            obj, df = instances[(cls, dataset)]
+
+            def setup():
+                obj._df = df.copy()
+
+            seconds = min(timeit.repeat(lambda: call(obj), setup=setup, number=1, repeat=repeat))
+            results[name] = {'seconds': seconds, 'rows': len(df.index)}
+
+    return results
+
+
+def compare(report, baseline, threshold, min_delta):
+    """Flags the cases which are slower than the baseline. Returns the number
+    of regressions."""
+    regressions = 0
+    for size, results in report['results'].items():
+        for name, r in results.items():
+            base = baseline.get('results', {}).get(size, {}).get(name)
+            if base is None:
+                r['status'] = 'new'
+                continue
+            r['baseline'] = base['seconds']
+            r['ratio'] = r['seconds'] / base['seconds'] if base['seconds'] else None
+            slower = (r['ratio'] is not None and r['ratio'] > threshold
+                      and r['seconds'] - base['seconds'] > min_delta)
+            r['status'] = 'SLOWER' if slower else 'ok'
+            regressions += slower
+    return regressions
+
+
+def main():
+    """Runs the benchmarks, compares them with the baseline and prints a table."""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--filter', help='only the cases containing this text')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--baseline', default=BASELINE_FILE, help='the baseline file')
+    parser.add_argument('--save-baseline', action='store_true',
+                        help='store the results as baseline')
+    parser.add_argument('--threshold', type=float, default=1.25,
+                        help='flag a case slower than baseline * threshold')
+    parser.add_argument('--min-delta', type=float, default=0.005,
+                        help='and slower by more than these seconds (noise of short cases)')
+    parser.add_argument('--fail', action='store_true', help='exit code 1 on a regression')
+    parser.add_argument('--json', action='store_true', help='print json instead of a table')
+    args = parser.parse_args()
+
+    report = {'python': platform.python_version(), 'pandas': pd.__version__,
+              'machine': platform.node(),
+              'results': {size: run(size, args.repeat, args.filter) for size in args.sizes}}
+
+    regressions = 0
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    elif os.path.exists(args.baseline):
+        with open(args.baseline, encoding='utf-8') as f:
+            regressions = compare(report, json.load(f), args.threshold, args.min_delta)
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print('{:<58} {:<12} {:>9} {:>10} {:>10} {:>7}  {}'.format(
+            'method', 'size', 'rows', 'ms', 'base ms', 'ratio', 'status'))
+        for size, results in report['results'].items():
+            for name, r in results.items():
+                print('{:<58} {:<12} {:>9} {:>10.1f} {:>10} {:>7}  {}'.format(
+                    name, size, r['rows'], r['seconds'] * 1000,
+                    '{:.1f}'.format(r['baseline'] * 1000) if 'baseline' in r else '-',
+                    '{:.2f}'.format(r['ratio']) if r.get('ratio') else '-',
+                    r.get('status', '')))
+        if regressions:
+            print('{} method(s) slower than the baseline.'.format(regressions))
+
+    if args.fail and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Measures the payload of the tab layouts before and after minimize_figure
+(MINIMIZE_FIGURES=0 / 1). Every mode runs in a fresh Python process, which
+requests the layout of each tab through the Dash callback (render_content)
+with the Flask test client:
+
+    raw       size of the JSON response
+    gzip, br  size of the compressed response (Accept-Encoding)
+    server    time of the request without compression
+    decode    time of JSON.parse in node for the raw response, a proxy for the
+              time the browser needs before plotly.js draws the figures (the
+              drawing itself needs a browser and is not measured)
+
+    python benchmarks/bench_figure_payload.py
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_DIR = os.path.join(PROJECT_ROOT, 'dashboard')
+
+TABS = {
+    'umsatz_budget_tab': 'tabs.expenditures_tab',
+    'lesesaal_ausl_tab': 'tabs.loan_read_tab',
+    'neuerw_bestand_tab': 'tabs.newacq_coll_tab',
+}
+
+TAB_SCRIPT = '''
+import importlib, json, sys, time
+import index
+tabs = json.loads(sys.argv[1])
+repeat = int(sys.argv[2])
+client = index.server.test_client()
+result = {}
+for value, module in tabs.items():
+    try:
+        index.TABS[value] = importlib.import_module(module)
+    except Exception as e:
+        result[value] = {'error': repr(e)}
+        continue
+index.app._setup_server()
+index.WARM_UP['done'].set()
+for value in index.TABS:
+    payload = {'output': 'tab_content.children',
+               'outputs': {'id': 'tab_content', 'property': 'children'},
+               'inputs': [{'id': 'tabs', 'property': 'value', 'value': value}],
+               'changedPropIds': ['tabs.value']}
+    row = {}
+    # first request builds the data and layout
+    client.post('/_dash-update-component', json=payload)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        response = client.post('/_dash-update-component', json=payload)
+    row['server'] = (time.perf_counter() - start) / repeat
+    row['raw'] = len(response.data)
+    with open(sys.argv[3] + '.' + value + '.json', 'wb') as f:
+        f.write(response.data)
+    for encoding in ('gzip', 'br'):
+        response = client.post('/_dash-update-component', json=payload,
+                               headers={'Accept-Encoding': encoding})
+        assert response.headers.get('Content-Encoding') == encoding
+        row[encoding] = len(response.data)
+    result[value] = row
+print(json.dumps(result))
+'''
+
+NODE_SCRIPT = '''
+const fs = require('fs');
+const text = fs.readFileSync(process.argv[1], 'utf8');
+const repeat = Number(process.argv[2]);
+const start = process.hrtime.bigint();
+for (let i = 0; i < repeat; i++) { JSON.parse(text); }
+console.log(Number(process.hrtime.bigint() - start) / 1e9 / repeat);
+'''
+
+
+def _env(minimize):
+    """Returns the environment with the project and dashboard on the path."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [PROJECT_ROOT, DASHBOARD_DIR, env.get('PYTHONPATH', '')])
+    env['MINIMIZE_FIGURES'] = '1' if minimize else '0'
+    return env
+
+
+def measure(minimize, repeat, tmp_dir):
+    """Returns the measurements for every tab in one mode."""
+    prefix = os.path.join(tmp_dir, 'after' if minimize else 'before')
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', TAB_SCRIPT,
+                          json.dumps(TABS), str(repeat), prefix],
+                         cwd=DASHBOARD_DIR, env=_env(minimize), check=True,
+                         stdout=subprocess.PIPE).stdout
+    result = json.loads(out.decode('utf-8').strip().splitlines()[-1])
+
+    node = shutil.which('node')
+    for value, row in result.items():
+        if node and 'error' not in row:
+            decode = subprocess.run([node, '-e', NODE_SCRIPT, '{}.{}.json'.format(prefix, value),
+                                     str(repeat)], check=True, stdout=subprocess.PIPE).stdout
+            row['decode'] = float(decode)
+    return result
+
+
+def main():
+    """Runs both modes and prints a table (or json)."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=20, help='requests per tab')
+    parser.add_argument('--json', action='store_true', help='print json instead of a table')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        report = {'before': measure(False, args.repeat, tmp_dir),
+                  'after': measure(True, args.repeat, tmp_dir)}
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print('{:<20} {:<7} {:>10} {:>10} {:>10} {:>10} {:>10}'.format(
+        'tab', 'mode', 'raw KB', 'gzip KB', 'br KB', 'server ms', 'decode ms'))
+    for value in TABS:
+        for mode in ('before', 'after'):
+            row = report[mode][value]
+            if 'error' in row:
+                print('{:<20} {:<7} {}'.format(value, mode, row['error']))
+                continue
+            print('{:<20} {:<7} {:>10.1f} {:>10.1f} {:>10.1f} {:>10.1f} {:>10}'.format(
+                value, mode, row['raw'] / 1024, row['gzip'] / 1024, row['br'] / 1024,
+                row['server'] * 1000,
+                '{:.2f}'.format(row['decode'] * 1000) if 'decode' in row else '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Measures the startup of the dashboard. Every part runs in a fresh Python
+process:
+
+    imports   time per import in the order the dashboard imports them
+              (cumulative, already imported dependencies are not counted twice),
+              app and index must not load pandas and numpy (deferred startup)
+    datasets  time per load_data() and generate_layout() of every tab
+    server    time until /healthz (liveness) and /readyz (readiness) answer
+
+    python benchmarks/bench_startup.py
+"""
+
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_DIR = os.path.join(PROJECT_ROOT, 'dashboard')
+
+IMPORTS = [
+    'dash',
+    'dash_core_components',
+    'dash_html_components',
+    'app',
+    'index',
+    'pandas',
+    'plotly.express',
+    'dash_bootstrap_components',
+    'src.data_prep',
+    'tabs.expenditures_tab',
+    'tabs.loan_read_tab',
+    'tabs.newacq_coll_tab',
+]
+
+# the modules which are loaded with the data (warm-up), not by app and index
+DEFERRED = ('pandas', 'numpy')
+LIGHT_IMPORTS = ('app', 'index')
+
+TABS = ['tabs.expenditures_tab', 'tabs.loan_read_tab', 'tabs.newacq_coll_tab']
+
+IMPORT_SCRIPT = '''
+import importlib, json, sys, time
+deferred = sys.argv[1].split(',')
+result = []
+for name in sys.argv[2:]:
+    start = time.perf_counter()
+    importlib.import_module(name)
+    result.append((name, time.perf_counter() - start,
+                   [m for m in deferred if m in sys.modules]))
+print(json.dumps(result))
+'''
+
+DATASET_SCRIPT = '''
+import importlib, json, sys, time
+import index
+result = []
+for name in sys.argv[1:]:
+    tab = importlib.import_module(name)
+    start = time.perf_counter()
+    tab.load_data()
+    result.append((name + '.load_data', time.perf_counter() - start))
+    start = time.perf_counter()
+    tab.generate_layout()
+    result.append((name + '.generate_layout', time.perf_counter() - start))
+print(json.dumps(result))
+'''
+
+SERVER_SCRIPT = '''
+import sys
+from werkzeug.serving import make_server
+import index
+index.start_warm_up()
+make_server('127.0.0.1', int(sys.argv[1]), index.server, threaded=True).serve_forever()
+'''
+
+
+def _env():
+    """Returns the environment with the project and dashboard on the path."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [PROJECT_ROOT, DASHBOARD_DIR, env.get('PYTHONPATH', '')])
+    return env
+
+
+def _run(script, *args):
+    """Runs a script in a fresh process and returns its json output."""
+    out = subprocess.run([sys.executable, '-W', 'ignore', '-c', script] + list(args),
+                         cwd=DASHBOARD_DIR, env=_env(), check=True,
+                         stdout=subprocess.PIPE).stdout
+    return json.loads(out.decode('utf-8').strip().splitlines()[-1])
+
+
+def _wait_for(url, deadline):
+    """Polls the url until it answers with 200 and returns the time."""
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter()
+        except urllib.error.HTTPError as e:
+            body = json.loads(e.read().decode('utf-8') or '{}')
+            if body.get('status') == 'failed':
+                raise RuntimeError(body.get('error'))
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.01)
+    raise TimeoutError(url)
+
+
+def check_deferred(imports):
+    """Raises an error if app or index loaded a deferred module."""
+    for name, _, loaded in imports:
+        if name in LIGHT_IMPORTS and loaded:
+            raise RuntimeError('{} loads {} at import time'.format(name, ', '.join(loaded)))
+
+
+def server_startup(timeout=300):
+    """Starts the server and returns the seconds until liveness and readiness."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    start = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, '-W', 'ignore', '-c', SERVER_SCRIPT, str(port)],
+                            cwd=DASHBOARD_DIR, env=_env(),
+                            stderr=subprocess.DEVNULL)
+    try:
+        base = 'http://127.0.0.1:{}'.format(port)
+        alive = _wait_for(base + '/healthz', start + timeout)
+        ready = _wait_for(base + '/readyz', start + timeout)
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    return [('liveness (/healthz)', alive - start), ('readiness (/readyz)', ready - start)]
+
+
+def main():
+    """Runs the measurements and prints a table (or json)."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--json', action='store_true', help='print json instead of a table')
+    args = parser.parse_args()
+
+    imports = _run(IMPORT_SCRIPT, ','.join(DEFERRED), *IMPORTS)
+    check_deferred(imports)
+    report = {
+        'imports': [(name, seconds) for name, seconds, _ in imports],
+        'datasets': _run(DATASET_SCRIPT, *TABS),
+        'server': server_startup(),
+    }
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    for part, rows in report.items():
+        print(part)
+        for name, seconds in rows:
+            print('    {:<45} {:8.1f} ms'.format(name, seconds * 1000))
+
+
+if __name__ == '__main__':
+    main()
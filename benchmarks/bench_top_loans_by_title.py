@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Benchmarks LoanColl.top_loans_by_title against the former implementation
+(groupby with nlargest per year). Both run on the same synthetic loan history
+(src/synthetic_data.py) and the results are checked for equality before the
+timings are printed.
+
+    python benchmarks/bench_top_loans_by_title.py --scale 200 --years 10
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import timeit
+
+import pandas as pd
+
+# the project root, started as a script only the folder benchmarks is on the path
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+
+from src.data_prep import LoanColl  # noqa: E402
+from src.synthetic_data import SyntheticData  # noqa: E402
+
+
+def make_loans(scale, years, seed=0):
+    """Returns the loan storage frame of the synthetic data generator
+    (src/synthetic_data.py), the loans per title are Zipf distributed with
+    many ties.
+
+    Parameters
+    ----------
+    scale : float
+        the factor of the titles.
+    years : int
+        the number of years up to the current year.
+    seed : int, optional
+        seed for the random generator, by default 0
+
+    Returns
+    -------
+    dataframe:
+        with the columns year, shelfmark, shorttitle, cum_loans and the RVK
+        columns.
+    """
+    return SyntheticData(scale, seed, years).loan()
+
+
+def legacy_top_loans_by_title(df, col_name_year, col_name_loan, number=5):
+    """The former implementation of LoanColl.top_loans_by_title."""
+    return df.groupby([df[col_name_year]]).apply(
+        lambda x: x.nlargest(number, col_name_loan))
+
+
+def main():
+    """Runs the benchmark and prints the timings."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=float, default=200)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--number', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    df = make_loans(args.scale, args.years)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = os.path.join(tmp, 'loans.csv')
+        df.to_csv(filename, index=False)
+        loan = LoanColl(filename)
+        df = loan._df
+
+        def vectorized():
+            loan._df = df
+            return loan.top_loans_by_title('year', 'cum_loans', args.number)
+
+        expected = legacy_top_loans_by_title(df, 'year', 'cum_loans', args.number)
+        result = vectorized()
+        # newer pandas versions drop the grouping column in apply
+        pd.testing.assert_frame_equal(
+            result[expected.columns], expected, check_names=False)
+
+        t_legacy = min(timeit.repeat(lambda: legacy_top_loans_by_title(
+            df, 'year', 'cum_loans', args.number), number=1, repeat=args.repeat))
+        t_vectorized = min(timeit.repeat(vectorized, number=1, repeat=args.repeat))
+
+    print(f'rows: {len(df.index)}, scale: {args.scale}, years: {args.years}, top: {args.number}')
+    print(f'groupby/nlargest: {t_legacy * 1000:10.1f} ms')
+    print(f'sort/cumcount:    {t_vectorized * 1000:10.1f} ms')
+    print(f'speedup:          {t_legacy / t_vectorized:10.1f} x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Load test of the dashboard with the protocol of the Dash renderer. Every
+simulated user replays sessions like a browser:
+
+    page      GET /_dash-layout and /_dash-dependencies
+    tab       POST /_dash-update-component for render_content (tab switch)
+    my-id1    supplier changes in the expenditures tab
+    my-id2    year changes in the readingroom tab
+
+The tabs and the values of the dropdowns are taken from the responses, the
+callbacks from /_dash-dependencies (callbacks running in the browser, see
+CLIENTSIDE_FILTERING, are not requested). The server is started locally
+(Werkzeug or gunicorn with dashboard/gunicorn.conf.py) unless --url is given.
+It reports the throughput, p50/p95/p99 latency and the error rate per step.
+
+    python benchmarks/load_test.py [--users 8] [--duration 15] [--server gunicorn]
+    python benchmarks/load_test.py --url http://127.0.0.1:8050
+"""
+
+import argparse
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_DIR = os.path.join(PROJECT_ROOT, 'dashboard')
+
+SERVER_SCRIPT = '''
+import sys
+from werkzeug.serving import make_server
+import index
+index.start_warm_up()
+make_server('127.0.0.1', int(sys.argv[1]), index.server, threaded=True).serve_forever()
+'''
+
+# the changes of a dropdown per visit of a tab
+CHANGES_PER_TAB = 5
+
+
+def _env(port):
+    """Returns the environment with the project and dashboard on the path."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [PROJECT_ROOT, DASHBOARD_DIR, env.get('PYTHONPATH', '')])
+    env['DASHBOARD_BIND'] = '127.0.0.1:{}'.format(port)
+    return env
+
+
+def start_server(kind, timeout=300):
+    """Starts the dashboard and returns the process and its url after the
+    warm-up."""
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    if kind == 'gunicorn':
+        # gunicorn 20.0 has no __main__ module
+        cmd = [sys.executable, '-c', 'from gunicorn.app.wsgiapp import run; run()',
+               '-c', 'gunicorn.conf.py', 'index:server']
+    else:
+        cmd = [sys.executable, '-W', 'ignore', '-c', SERVER_SCRIPT, str(port)]
+    proc = subprocess.Popen(cmd, cwd=DASHBOARD_DIR, env=_env(port),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = 'http://127.0.0.1:{}'.format(port)
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError('the server exited with {}'.format(proc.returncode))
+        try:
+            with urllib.request.urlopen(url + '/readyz', timeout=1) as response:
+                if response.status == 200:
+                    return proc, url
+        except (urllib.error.URLError, ConnectionError, socket.timeout):
+            pass
+        time.sleep(0.1)
+    proc.terminate()
+    raise TimeoutError(url)
+
+
+def request(url, path, payload=None):
+    """Sends a request and returns the status and the decoded json."""
+    data = None if payload is None else json.dumps(payload).encode('utf-8')
+    req = urllib.request.Request(url + path, data=data,
+                                 headers={'Content-Type': 'application/json',
+                                          'Accept-Encoding': 'gzip, br'})
+    try:
+        with urllib.request.urlopen(req, timeout=60) as response:
+            body = response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    encoding = response.headers.get('Content-Encoding')
+    if encoding == 'gzip':
+        import gzip
+        body = gzip.decompress(body)
+    elif encoding == 'br':
+        import brotli
+        body = brotli.decompress(body)
+
+    return status, json.loads(body.decode('utf-8')) if body else None
+
+
+def _outputs(output):
+    """Returns the outputs of a callback, e.g. '..a.figure...b.children..'."""
+    parts = output.strip('.').split('...') if output.startswith('..') else [output]
+    outputs = [dict(zip(('id', 'property'), p.rsplit('.', 1))) for p in parts]
+    return outputs if output.startswith('..') else outputs[0]
+
+
+def _find(component, component_id):
+    """Returns the props of a component in a layout by its id."""
+    if isinstance(component, list):
+        for c in component:
+            found = _find(c, component_id)
+            if found is not None:
+                return found
+    elif isinstance(component, dict):
+        props = component.get('props', {})
+        if props.get('id') == component_id:
+            return props
+        return _find(props.get('children'), component_id)
+    return None
+
+
+def _payload(callback, values):
+    """Returns the body of _dash-update-component for a callback."""
+    return {'output': callback['output'],
+            'outputs': _outputs(callback['output']),
+            'inputs': [dict(i, value=values.get((i['id'], i['property'])))
+                       for i in callback['inputs']],
+            'state': [dict(s, value=values.get((s['id'], s['property'])))
+                      for s in callback['state']],
+            'changedPropIds': ['{}.{}'.format(i['id'], i['property'])
+                               for i in callback['inputs']]}
+
+
+class Stats:
+    """The latencies and errors per step, shared by the users."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, step, seconds, ok):
+        with self._lock:
+            self.latencies.setdefault(step, []).append(seconds)
+            self.errors[step] = self.errors.get(step, 0) + (0 if ok else 1)
+
+
+def timed(stats, step, url, path, payload=None):
+    """Sends a request, records it and returns the json."""
+    start = time.perf_counter()
+    try:
+        status, body = request(url, path, payload)
+        # 204: the callback raised PreventUpdate
+        ok = status in (200, 204)
+    except Exception:
+        body, ok = None, False
+    stats.add(step, time.perf_counter() - start, ok)
+    return body if ok else None
+
+
+def session(url, stats, rng, deadline):
+    """Replays sessions of one user until the deadline."""
+    while time.perf_counter() < deadline:
+        layout = timed(stats, 'page', url, '/_dash-layout')
+        dependencies = timed(stats, 'page', url, '/_dash-dependencies')
+        if layout is None or dependencies is None:
+            continue
+        tabs = _find(layout, 'tabs') or {}
+        render = next(c for c in dependencies if c['output'] == 'tab_content.children')
+        # the callbacks running on the server by their input
+        callbacks = {c['inputs'][0]['id']: c for c in dependencies
+                     if not c.get('clientside_function') and len(c['inputs']) == 1
+                     and c is not render}
+
+        for tab in [t['props']['value'] for t in tabs.get('children', [])]:
+            if time.perf_counter() >= deadline:
+                return
+            content = timed(stats, 'tab', url, '/_dash-update-component',
+                            _payload(render, {('tabs', 'value'): tab}))
+            if content is None:
+                continue
+            children = content['response']['tab_content']['children']
+            for component_id, callback in callbacks.items():
+                dropdown = _find(children, component_id)
+                if dropdown is None or not dropdown.get('options'):
+                    continue
+                for _ in range(CHANGES_PER_TAB):
+                    value = rng.choice(dropdown['options'])['value']
+                    key = (component_id, callback['inputs'][0]['property'])
+                    timed(stats, component_id, url, '/_dash-update-component',
+                          _payload(callback, {key: value}))
+
+
+def percentile(values, p):
+    """Returns the p-th percentile (nearest rank) of sorted values."""
+    return values[min(len(values) - 1, int(round(p / 100 * len(values) + 0.5)) - 1)]
+
+
+def run(url, users, duration, seed):
+    """Runs the users in threads and returns the report."""
+    stats = Stats()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=session,
+                                args=(url, stats, random.Random(seed + i), deadline))
+               for i in range(users)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    report = {'users': users, 'seconds': elapsed, 'steps': {}}
+    steps = dict(stats.latencies, total=[s for v in stats.latencies.values() for s in v])
+    errors = dict(stats.errors, total=sum(stats.errors.values()))
+    for step, latencies in steps.items():
+        latencies = sorted(latencies)
+        report['steps'][step] = {
+            'requests': len(latencies),
+            'requests_per_second': len(latencies) / elapsed,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'error_rate': errors[step] / len(latencies)}
+    return report
+
+
+def main():
+    """Starts the server (or uses --url), runs the load test and prints a table."""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, nargs='+', default=[1, 8],
+                        help='parallel users, several values run one after another')
+    parser.add_argument('--duration', type=float, default=15, help='seconds per run')
+    parser.add_argument('--server', choices=('dev', 'gunicorn'), default='dev',
+                        help='the server which is started locally')
+    parser.add_argument('--url', help='the url of a running dashboard instead')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the choices')
+    parser.add_argument('--json', action='store_true', help='print json instead of a table')
+    args = parser.parse_args()
+
+    proc, url = (None, args.url.rstrip('/')) if args.url else start_server(args.server)
+    try:
+        reports = [run(url, users, args.duration, args.seed) for users in args.users]
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait()
+
+    if args.json:
+        print(json.dumps(reports, indent=2))
+        return
+    print('{:>6} {:<10} {:>9} {:>9} {:>9} {:>9} {:>9} {:>8}'.format(
+        'users', 'step', 'requests', 'req/s', 'p50 ms', 'p95 ms', 'p99 ms', 'errors'))
+    for report in reports:
+        for step, s in report['steps'].items():
+            print('{:>6} {:<10} {:>9} {:>9.1f} {:>9.1f} {:>9.1f} {:>9.1f} {:>7.1%}'.format(
+                report['users'], step, s['requests'], s['requests_per_second'],
+                s['p50'] * 1000, s['p95'] * 1000, s['p99'] * 1000, s['error_rate']))
+
+
+if __name__ == '__main__':
+    main()
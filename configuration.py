@@ -9,43 +9,131 @@ import os
 # absolute path for project folder
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 
+# Mandanten: one process can serve the dashboard for several libraries. Every
+# tenant has its own directory which contains the data folder (like
+# PROJECT_ROOT), the tenant of a request is chosen by the first part of the
+# url, e.g. /institut-a/. The names must not collide with the routes of the
+# dashboard (e.g. assets, metrics, admin).
+# DASHBOARD_TENANTS='institut-a=/srv/institut-a,institut-b=/srv/institut-b'
+DEFAULT_TENANT = 'default'
+TENANTS = {DEFAULT_TENANT: PROJECT_ROOT}
+for _entry in os.environ.get('DASHBOARD_TENANTS', '').split(','):
+    if not _entry.strip():
+        continue
+    _name, _sep, _root = (part.strip() for part in _entry.partition('='))
+    if not _sep or not _name or not _root or '/' in _name:
+        raise ValueError("DASHBOARD_TENANTS: the entry {!r} is not 'name=directory' (e.g. "
+                         "'institut-a=/srv/institut-a', separated by commas).".format(_entry))
+    if _name in TENANTS:
+        raise ValueError('DASHBOARD_TENANTS: the tenant {!r} is defined twice.'.format(_name))
+    TENANTS[_name] = _root
+# the tenant of this process: served without url prefix, used by the import
+# and warm-up scripts
+PROCESS_TENANT = os.environ.get('DASHBOARD_TENANT', DEFAULT_TENANT)
+if PROCESS_TENANT not in TENANTS:
+    raise ValueError('DASHBOARD_TENANT: the tenant {!r} is not in DASHBOARD_TENANTS ({}).'.format(
+        PROCESS_TENANT, ', '.join(TENANTS)))
+# the directory which contains the data folder of this process
+DATA_ROOT = TENANTS[PROCESS_TENANT]
+# memory of the memoized results per tenant in MB, the least recently used
+# results of a tenant are dropped above it, 0 = no limit
+TENANT_CACHE_MB = float(os.environ.get('TENANT_CACHE_MB', 0))
+
 # path for the import folders
 DIRPATH_IMP = 'data/import_folders'
 # path for the storage folders
 STOR_DIRPATH = 'data/storage_folders/'
 
 
+# path for the helper files
+HELPER_DIRPATH = 'data/helper_files'
+
+
 # path to each file for importing the data
 UMSATZ_IMP = 'umsatz'  # umsatz
 BUDGET_IMP = 'budget'  # budget
-
-# for further paths (example)
-# NEWACQ_IMP = '...' # example
+NEWACQ_IMP = 'newacq'  # neuerwerbungen
+READING_IMP = 'readingroom'  # lesesaal
+LOAN_IMP = 'loan'  # ausleihe
 
 
 # path to each file for storage and loading the data
 UMSATZ_STOR = 'umsatz/umsatz_total.csv'  # umsatz
 BUDGET_STOR = 'budget/budget_total.csv'  # budget
-
-# for further files (example)
-# NEWACQ_STOR = '...'
+NEWACQ_STOR = 'newacq/newacq_total.csv'  # neuerwerbungen
+READING_STOR = 'readingroom/readingroom_total.csv'  # lesesaal
+LOAN_STOR = 'loan/loan_total.csv'  # ausleihe
 
 # Helper files for preparing the data during import and preparation
-# FILE_LIEF = '...'
+FILE_LIEF = 'lieferanten.csv'  # Lieferant -> Abkürzung
+FILE_KOST = 'kostenstellen.csv'  # Kostenstelle -> Bezeichnung
+FILE_RVK = 'rvk_data.csv'  # RVK-Notation -> Benennung (src/rvk_xml_to_csv.py)
+FILE_MAT = 'medientypen.csv'  # Code der Medienart (0500) -> Bezeichnung
 
 # Path to the import folders
-FILEPATH_UMSATZ_IMP = os.path.join(PROJECT_ROOT, DIRPATH_IMP, UMSATZ_IMP)
-FILEPATH_BUDGET_IMP = os.path.join(PROJECT_ROOT, DIRPATH_IMP, BUDGET_IMP)
-
-# for further paths (example)
-# FILEPATH_NEWACQ_IMP = os.path.join(...)
+FILEPATH_UMSATZ_IMP = os.path.join(DATA_ROOT, DIRPATH_IMP, UMSATZ_IMP)
+FILEPATH_BUDGET_IMP = os.path.join(DATA_ROOT, DIRPATH_IMP, BUDGET_IMP)
+FILEPATH_NEWACQ_IMP = os.path.join(DATA_ROOT, DIRPATH_IMP, NEWACQ_IMP)
+FILEPATH_READING_IMP = os.path.join(DATA_ROOT, DIRPATH_IMP, READING_IMP)
+FILEPATH_LOAN_IMP = os.path.join(DATA_ROOT, DIRPATH_IMP, LOAN_IMP)
 
 # Path to the storage files
-FILEPATH_UMSATZ_STOR = os.path.join(PROJECT_ROOT, STOR_DIRPATH, UMSATZ_STOR)
-FILEPATH_BUDGET_STOR = os.path.join(PROJECT_ROOT, STOR_DIRPATH, BUDGET_STOR)
-
-# for further paths (example)
-# FILEPATH_NEWACQ_STOR = os.path.join(...)
-
-# Path to the helper files if necessary ... (example)
-# HELPER_FILE_LIEF = os.path.join(...)
+FILEPATH_UMSATZ_STOR = os.path.join(DATA_ROOT, STOR_DIRPATH, UMSATZ_STOR)
+FILEPATH_BUDGET_STOR = os.path.join(DATA_ROOT, STOR_DIRPATH, BUDGET_STOR)
+FILEPATH_NEWACQ_STOR = os.path.join(DATA_ROOT, STOR_DIRPATH, NEWACQ_STOR)
+FILEPATH_READING_STOR = os.path.join(DATA_ROOT, STOR_DIRPATH, READING_STOR)
+FILEPATH_LOAN_STOR = os.path.join(DATA_ROOT, STOR_DIRPATH, LOAN_STOR)
+
+# Path to the helper files
+HELPER_FILE_LIEF = os.path.join(DATA_ROOT, HELPER_DIRPATH, FILE_LIEF)
+HELPER_FILE_KOST = os.path.join(DATA_ROOT, HELPER_DIRPATH, FILE_KOST)
+FILEPATH_HELPER_RVK = os.path.join(DATA_ROOT, HELPER_DIRPATH, FILE_RVK)
+FILEPATH_HELPER_MAT = os.path.join(DATA_ROOT, HELPER_DIRPATH, FILE_MAT)
+
+# the storage files which are loaded by the dashboard
+DATASET_FILES = (FILEPATH_UMSATZ_STOR, FILEPATH_BUDGET_STOR, FILEPATH_NEWACQ_STOR,
+                 FILEPATH_READING_STOR, FILEPATH_LOAN_STOR)
+
+# Memoization of the dashboard callbacks
+# number of results per callback which are kept in memory
+CALLBACK_CACHE_SIZE = 128
+# directory of the shared on-disk cache (e.g. for several processes), None = off
+CALLBACK_CACHE_DIR = os.environ.get('CALLBACK_CACHE_DIR')
+
+# Aggregation of large frames (Collection, LoanColl) in worker processes,
+# see src/parallel.py: DATA_PREP_PARALLEL 0 = off, 1 = on and
+# DATA_PREP_WORKERS the number of processes (0 = one per core)
+DATA_PREP_PARALLEL = os.environ.get('DATA_PREP_PARALLEL', '0')
+if DATA_PREP_PARALLEL not in ('0', '1'):
+    raise ValueError("DATA_PREP_PARALLEL must be '0' or '1' (the number of processes "
+                     "is DATA_PREP_WORKERS), not {!r}.".format(DATA_PREP_PARALLEL))
+DATA_PREP_PARALLEL = DATA_PREP_PARALLEL == '1'
+DATA_PREP_WORKERS = int(os.environ.get('DATA_PREP_WORKERS', 0))
+
+# Backend of the data preparation in the tabs: 'pandas' or 'sql' (the
+# aggregations run as queries in DuckDB or SQLite, see src/sql_backend.py).
+# The expenditures tab reads its pre-aggregated cube with both.
+DATA_BACKEND = os.environ.get('DATA_BACKEND', 'pandas')
+if DATA_BACKEND not in ('pandas', 'sql'):
+    raise ValueError("DATA_BACKEND must be 'pandas' or 'sql', not {!r}.".format(DATA_BACKEND))
+
+# Filtering of the dropdown figures in the browser (clientside callbacks),
+# the data for all values is shipped once per page load in a dcc.Store
+CLIENTSIDE_FILTERING = os.environ.get('CLIENTSIDE_FILTERING', '0') == '1'
+
+# Payload of the figures (see minimize_figure in src/utils_dash.py):
+# rounding the floats and using a slim template
+MINIMIZE_FIGURES = os.environ.get('MINIMIZE_FIGURES', '1') == '1'
+# number of decimals of the floats in the figures
+FIGURE_DECIMALS = 2
+# compression of the responses by Flask-Compress, in order of preference
+COMPRESS_ALGORITHM = ['br', 'gzip']
+# compression level of brotli (0-11), higher levels cost much more time
+COMPRESS_BR_LEVEL = 4
+
+# HTTP conditional caching (ETag / If-None-Match) of the dashboard responses
+HTTP_CACHING = os.environ.get('HTTP_CACHING', '1') == '1'
+
+# Token for the admin endpoints (/admin/memory), expected in the header
+# X-Admin-Token. Without a token the admin endpoints are switched off (404).
+ADMIN_TOKEN = os.environ.get('DASHBOARD_ADMIN_TOKEN')
@@ -7,8 +7,140 @@ imports: the files containing the callback definitions require access to the
 Dash app instance however if this were imported from index.py, 
 the initial loading of index.py would ultimately
 require itself to be already imported, which cannot be satisfied.
+The responses are compressed by Flask-Compress with brotli or gzip. Dash
+would only enable gzip, so its own compression is turned off.
+The page, the layout and the dependencies get an ETag, derived from the
+version of the datasets, the code and the request. A request with a matching
+If-None-Match header is answered with 304 (Not Modified) without building the
+response. The callbacks (POST) are not conditional, browsers and proxies never
+revalidate a POST.
+The endpoint /metrics reports latencies, payload sizes and cache counters in
+the text format of Prometheus (see src/metrics.py).
+If profiling is switched on (see src/profiling.py), the calls of the data
+preparation methods are written as one report per request to stderr.
+The admin endpoints /admin/memory and /admin/memory/tracemalloc report the
+memory of the frames and caches (see src/memory.py).
+With several tenants (libraries, see src/tenants.py) the first part of the url
+chooses the tenant, e.g. /institut-a/. The page tells the browser to send the
+requests of the dashboard with this prefix.
 """
+import contextlib
+import datetime
+import glob
+import hashlib
+import os
+
 import dash
+from flask import g, request
+from flask_compress import Compress
+
+from src.cache import dataset_version
+from src.tenants import current_tenant, tenant_path
+from src import tenants
+from src import metrics
+from src import profiling
+from src import memory
+
+from configuration import PROJECT_ROOT, DATASET_FILES, HTTP_CACHING, ADMIN_TOKEN
+from configuration import CLIENTSIDE_FILTERING, MINIMIZE_FIGURES, FIGURE_DECIMALS
+from configuration import COMPRESS_ALGORITHM, COMPRESS_BR_LEVEL
+
+
+
+class TenantDash(dash.Dash):
+    """The Dash app, the browser sends its requests (layout, callbacks) with
+    the url prefix of the tenant of the page.
+    """
+
+    def _config(self):
+        config = super()._config()
+        config['requests_pathname_prefix'] = (request.script_root
+                                              + self.config.requests_pathname_prefix)
+        return config
 
-app = dash.Dash(__name__, suppress_callback_exceptions=True)
+
+app = TenantDash(__name__, suppress_callback_exceptions=True, compress=False)
 server = app.server
+
+# the tenant of a request is chosen by the url prefix
+tenants.init_app(server)
+
+# first, so the metrics see the responses as sent (after the compression)
+metrics.init_app(server, app)
+
+# the memory accounting for the admins
+memory.init_app(server, token=ADMIN_TOKEN)
+
+server.config['COMPRESS_ALGORITHM'] = COMPRESS_ALGORITHM
+server.config['COMPRESS_BR_LEVEL'] = COMPRESS_BR_LEVEL
+Compress(server)
+
+
+# ---------------------------HTTP conditional caching--------------------------
+
+# the responses which only change with the data (and the code), GET requests
+CACHED_ROUTES = ('/', '/_dash-layout', '/_dash-dependencies')
+
+# version of the code and of the settings which change the responses (e.g.
+# the callbacks with CLIENTSIDE_FILTERING), the same in every worker process
+CODE_VERSION = '{}:{}'.format(
+    dataset_version(*sorted(
+        glob.glob(os.path.join(PROJECT_ROOT, 'dashboard', '**', '*.py'), recursive=True)
+        + glob.glob(os.path.join(PROJECT_ROOT, 'dashboard', 'assets', '*'))
+        + glob.glob(os.path.join(PROJECT_ROOT, 'src', '*.py'))
+        + [os.path.join(PROJECT_ROOT, 'configuration.py')])),
+    repr((CLIENTSIDE_FILTERING, MINIMIZE_FIGURES, FIGURE_DECIMALS, HTTP_CACHING)))
+
+
+def response_etag():
+    """Returns the ETag of the response to the current request. The figures
+    with the current year change with the date, so the date is part of it.
+    """
+    key = '|'.join([CODE_VERSION, current_tenant(),
+                    dataset_version(*[tenant_path(f) for f in DATASET_FILES]),
+                    datetime.date.today().isoformat(), request.path])
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+
+@server.before_request
+def not_modified():
+    """Answers with 304 if the client already has the current response."""
+    if not HTTP_CACHING or request.path not in CACHED_ROUTES:
+        return None
+    g.etag = response_etag()
+    # Flask-Compress adds the encoding to the ETag, e.g. "<etag>:br"
+    etags = [etag.split(':')[0] for etag in request.if_none_match.as_set(include_weak=True)]
+    if g.etag in etags:
+        response = server.response_class(status=304)
+        response.set_etag(g.etag, weak=True)
+        return response
+    return None
+
+
+@server.after_request
+def add_etag(response):
+    """Adds the ETag to the responses of the cached routes."""
+    etag = g.get('etag')
+    if etag is not None and response.status_code == 200:
+        response.set_etag(etag, weak=True)
+        # the client has to revalidate, but can use its copy on 304
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# ---------------------------profiling-----------------------------------------
+
+@server.before_request
+def start_profile():
+    """Starts the profile of the request, if profiling is switched on."""
+    if profiling.is_enabled():
+        g.profile = contextlib.ExitStack()
+        g.profile.enter_context(profiling.report('{} {}'.format(request.method, request.path)))
+
+
+@server.teardown_request
+def write_profile(exc):
+    """Writes the profile of the request."""
+    profile = g.pop('profile', None)
+    if profile is not None:
+        profile.close()
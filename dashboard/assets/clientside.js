@@ -0,0 +1,135 @@
+/* Clientside callbacks of the dashboard (option CLIENTSIDE_FILTERING in
+configuration.py). The data of all dropdown values is shipped once per page
+load in a dcc.Store as columnar arrays (see store_data() in the tabs). The
+callbacks filter the arrays in the browser and fill the figure templates, so
+a change of a dropdown does not need a request to the server.
+*/
+
+// positions of the rows with the value
+function positions(column, value) {
+    var result = [];
+    for (var i = 0; i < column.length; i++) {
+        if (column[i] === value) {
+            result.push(i);
+        }
+    }
+    return result;
+}
+
+// values of a column at the positions
+function take(column, pos) {
+    return pos.map(function (i) { return column[i]; });
+}
+
+// copy of a figure template with the new x and y values of the traces
+function fillFigure(template, traces) {
+    var figure = JSON.parse(JSON.stringify(template));
+    figure.data.forEach(function (trace, i) {
+        trace.x = traces[i] ? traces[i].x : [];
+        trace.y = traces[i] ? traces[i].y : [];
+    });
+    return figure;
+}
+
+// like generate_card_content in utils_dash.py: '1.234 EUR'
+function formatEuro(value) {
+    var number = Math.trunc(value).toString();
+    return number.replace(/\B(?=(\d{3})+(?!\d))/g, '.') + ' EUR';
+}
+
+// copy of the cards template with the new values
+function fillCards(template, values) {
+    var cards = JSON.parse(JSON.stringify(template));
+    cards.forEach(function (card, i) {
+        // Card > [CardHeader, CardBody > [H5]]
+        card.props.children[1].props.children[0].props.children = formatEuro(values[i]);
+    });
+    return cards;
+}
+
+// position of the value in the sorted array (left: the first, right: after the last)
+function bisect(sorted, value, right) {
+    var lo = 0;
+    var hi = sorted.length;
+    while (lo < hi) {
+        var mid = (lo + hi) >> 1;
+        if (sorted[mid] < value || (right && sorted[mid] === value)) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
+        }
+    }
+    return lo;
+}
+
+// like ExpenditureCube._range: the positions lo:hi of the dates from start
+// to end (inclusive), the start is rounded down to the first of its month
+function dateRange(axis, start, end) {
+    var lo = start ? bisect(axis, String(start).slice(0, 7) + '-01', false) : 0;
+    var hi = end ? bisect(axis, String(end).slice(0, 10), true) : axis.length;
+    return [lo, Math.max(lo, hi)];
+}
+
+// like the rounding of the cards in ExpenditureCube.total_expnd_net_range
+function round2(value) {
+    return Math.round(value * 100) / 100;
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    expenditures: {
+        // outputs of the supplier dropdown (my-id1)
+        update_body: function (body, store) {
+            var code = store.bodies.indexOf(body);
+            var years = positions(store.years.body, code);
+            var diff = positions(store.diff.body, code);
+            var values = code >= 0 ? store.cards[code] : [0, 0];
+
+            return [
+                fillFigure(store.templates[0],
+                           [{x: take(store.years.x, years), y: take(store.years.y, years)}]),
+                fillFigure(store.templates[1],
+                           [{x: take(store.diff.x, diff), y: take(store.diff.y, diff)}]),
+                fillCards(store.templates[2], values)
+            ];
+        },
+        // outputs of the date range (umsatz_range) for the supplier (my-id1),
+        // like fig_range_body and generate_cards_range, an empty dropdown
+        // sums all suppliers
+        update_range: function (start, end, body, store) {
+            var axis = store.range;
+            var bounds = dateRange(axis.x, start, end);
+            var lo = bounds[0];
+            var hi = bounds[1];
+            var months = axis.total.slice(lo, hi);
+            if (body !== null && body !== undefined) {
+                var code = store.bodies.indexOf(body);
+                months = months.map(function () { return 0; });
+                positions(axis.body, code).forEach(function (i) {
+                    if (axis.pos[i] >= lo && axis.pos[i] < hi) {
+                        months[axis.pos[i] - lo] = axis.y[i];
+                    }
+                });
+            }
+            var sum = function (values) {
+                return values.reduce(function (a, b) { return a + b; }, 0);
+            };
+
+            return [
+                fillFigure(store.templates[3], [{x: axis.x.slice(lo, hi), y: months}]),
+                fillCards(store.templates[4],
+                          [round2(sum(months)), round2(sum(axis.total.slice(lo, hi)))])
+            ];
+        }
+    },
+    readingroom: {
+        // monthly use of the reading room for the year dropdown (my-id2)
+        update_year: function (year, store) {
+            var pos = positions(store.year, Number(year));
+            var x = take(store.x, pos);
+            var traces = store.columns.map(function (column) {
+                return {x: x, y: take(store.values[column], pos)};
+            });
+            return fillFigure(store.template, traces);
+        }
+    }
+});
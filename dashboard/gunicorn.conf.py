@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Configuration of gunicorn for running the dashboard in production. Start it
+in the folder dashboard with:
+
+    gunicorn index:server
+
+The app and its data are loaded in the master process before the workers are
+forked (preload_app), so the workers share the memory pages of the datasets
+copy-on-write. A thread in the master process watches the storage files. After
+an import it sends SIGHUP to the master, which loads the new data and replaces
+the workers gracefully (the old workers finish their requests). With
+DATA_PREP_PARALLEL the pool of src/parallel.py is started in the master when
+index is imported, before the watcher thread; the workers compute without it.
+
+The settings can be changed by environment variables:
+    DASHBOARD_BIND            address, by default 0.0.0.0:8050
+    DASHBOARD_WORKERS         number of workers, by default 2 * cores + 1
+    DASHBOARD_TIMEOUT         seconds per request, by default 120
+    DASHBOARD_WATCH_INTERVAL  seconds between checks of the data, by default 30
+                              (0 = off)
+"""
+
+import multiprocessing
+import os
+import signal
+import threading
+import time
+
+from src.cache import dataset_version
+from src.tenants import tenant_path
+
+from configuration import DATASET_FILES, TENANTS
+
+bind = os.environ.get('DASHBOARD_BIND', '0.0.0.0:8050')
+workers = int(os.environ.get('DASHBOARD_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('DASHBOARD_TIMEOUT', 120))
+graceful_timeout = timeout
+preload_app = True
+accesslog = '-'
+
+WATCH_INTERVAL = int(os.environ.get('DASHBOARD_WATCH_INTERVAL', 30))
+# the storage files of all tenants
+WATCHED_FILES = [tenant_path(f, tenant) for tenant in TENANTS for f in DATASET_FILES]
+
+
+def _watch_datasets(server):
+    """Sends SIGHUP to the master process when the storage files (of any
+    tenant) change."""
+    version = dataset_version(*WATCHED_FILES)
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        new_version = dataset_version(*WATCHED_FILES)
+        if new_version != version:
+            version = new_version
+            server.log.info('Data changed, reloading workers')
+            os.kill(server.pid, signal.SIGHUP)
+
+
+def when_ready(server):
+    """Loads the data and layouts in the master before the workers are forked
+    and starts watching the storage files."""
+    import index
+    index.preload()
+    if WATCH_INTERVAL > 0:
+        threading.Thread(target=_watch_datasets, args=(server,),
+                         name='dataset-watcher', daemon=True).start()
+
+
+def on_reload(server):
+    """Loads the new data in the master before the new workers are forked."""
+    import index
+    index.preload()
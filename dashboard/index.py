@@ -4,13 +4,51 @@
 It's the entry point for running the app.
 It contains some layout functionalities for the dashboard and it loaded the
 specific layout from the single tabs and the different tabs.
+The server binds immediately: the tab modules (pandas, plotly express, dash
+bootstrap components) and their data are loaded by a warm-up thread. Until the
+warm-up is done, /healthz (liveness) answers while /readyz (readiness) does not
+and requests to the dashboard wait for the warm-up (the monitoring routes
+/metrics and /admin/memory answer at once). The warm-up loads the
+data and layouts of every tenant (see src/tenants.py). With DATA_PREP_PARALLEL
+the pool of src/parallel.py is started at import time, before any threads.
 """
 
+import os
+import threading
+
 import dash_core_components as dcc
 import dash_html_components as html
 from dash.dependencies import Output, Input
-from app import app
-from tabs import expenditures_tab #, loan_read_tab, newacq_coll_tab
+from flask import jsonify, request
+from app import app, server
+from src.metrics import LAYOUT_SECONDS
+from src.tenants import use_tenant
+
+from configuration import TENANTS, DATA_PREP_PARALLEL, DATA_PREP_WORKERS
+
+# the worker processes of the data preparation are forked now, before the
+# warm-up and the server start any threads (src/parallel.py)
+if DATA_PREP_PARALLEL:
+    from src.parallel import start_pool
+    start_pool(DATA_PREP_WORKERS)
+
+# the tab modules by tab value, filled by the warm-up
+TABS = {}
+# warm-up state
+WARM_UP = {'thread': None, 'error': None, 'done': threading.Event()}
+# how long a request waits for the warm-up (seconds)
+WARM_UP_TIMEOUT = 300
+# routes which never wait for the warm-up (health checks, monitoring)
+HEALTH_ROUTES = ('/healthz', '/readyz', '/metrics', '/admin/memory',
+                 '/admin/memory/tracemalloc')
+
+# Dash collects the scripts of the component libraries on the first request.
+# The libraries of the tabs are imported by the warm-up, so this is done at
+# the end of the warm-up instead (otherwise a health check could trigger it).
+# This uses private internals (Dash._setup_server, registered in
+# Flask.before_first_request_funcs), pinned to dash 1.18 / Flask 1.1, check it
+# when updating them.
+server.before_first_request_funcs.remove(app._setup_server)
 
 # defining the layout for the three tabbed dashboard
 app.layout = html.Div(
@@ -53,15 +91,103 @@ def render_content(tab):
     """Returns the single app and layout based on the value which iss
     choosen.
     """
-    if tab == 'umsatz_budget_tab':
-        return expenditures_tab.generate_layout()
-    if tab == 'lesesaal_ausl_tab':
-        return None
-    if tab == 'neuerw_bestand_tab':
+    if tab in TABS:
+        with LAYOUT_SECONDS.time(tab):
+            return TABS[tab].generate_layout()
+    return None
+
+
+# ----------------------------------Warm-up------------------------------------
+
+def build_layouts():
+    """Builds the data and layouts of the tabs for every tenant."""
+    for tenant in TENANTS:
+        with use_tenant(tenant):
+            for tab in TABS.values():
+                tab.generate_layout()
+
+
+def warm_up():
+    """Imports the tab modules, which registers their callbacks, and builds
+    their data and layouts.
+    """
+    try:
+        from tabs import expenditures_tab, loan_read_tab, newacq_coll_tab
+        TABS['umsatz_budget_tab'] = expenditures_tab
+        TABS['lesesaal_ausl_tab'] = loan_read_tab
+        TABS['neuerw_bestand_tab'] = newacq_coll_tab
+
+        app._setup_server()
+
+        build_layouts()
+    except Exception as e:  # the error is reported by /readyz
+        WARM_UP['error'] = repr(e)
+        raise
+    finally:
+        WARM_UP['done'].set()
+
+
+def start_warm_up(wait=False):
+    """Starts the warm-up in a background thread (only once).
+
+    Parameters
+    ----------
+    wait : bool, optional
+        wait until the warm-up is done, by default False
+    """
+    if WARM_UP['thread'] is None:
+        WARM_UP['thread'] = threading.Thread(target=warm_up, name='warm-up', daemon=True)
+        WARM_UP['thread'].start()
+    if wait:
+        WARM_UP['done'].wait()
+
+
+def preload():
+    """Runs the warm-up and waits for it, e.g. in the master process of
+    gunicorn before the workers are forked (see gunicorn.conf.py). Called
+    again after a change of the data, it rebuilds the data and layouts.
+    """
+    start_warm_up(wait=True)
+    if WARM_UP['error']:
+        raise RuntimeError(WARM_UP['error'])
+    build_layouts()
+
+
+@server.before_request
+def wait_for_warm_up():
+    """Lets the requests to the dashboard wait until the warm-up is done. After
+    a failed warm-up the dashboard is not served (the tabs may be incomplete).
+    """
+    if request.path in HEALTH_ROUTES:
         return None
+    start_warm_up()
+    if not WARM_UP['done'].wait(WARM_UP_TIMEOUT):
+        return jsonify(status='starting'), 503
+    if WARM_UP['error']:
+        return jsonify(status='failed'), 503
     return None
 
 
+@server.route('/healthz')
+def healthz():
+    """Liveness: the server is running."""
+    return jsonify(status='alive')
+
+
+@server.route('/readyz')
+def readyz():
+    """Readiness: the tabs and their data are loaded."""
+    start_warm_up()
+    if not WARM_UP['done'].is_set():
+        return jsonify(status='starting'), 503
+    if WARM_UP['error']:
+        return jsonify(status='failed', error=WARM_UP['error']), 503
+    return jsonify(status='ready')
+
+
 if __name__ == "__main__":
+    # with the reloader the server runs in a child process, warm up only there
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_warm_up()
     app.run_server(debug=True, host='0.0.0.0')
     
\ No newline at end of file
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This script prints the memory accounting of the dashboard (see
+src/memory.py): the totals per tab, dataset and tenant, the owners (caches,
+tab modules, DataPreparation instances) and the largest frames. Without --url it
+loads the tabs in this process like a worker after the warm-up, with --url it
+asks a running server (one of its workers) via /admin/memory.
+
+    python memory_report.py [--top N] [--json] [--tracemalloc]
+    python memory_report.py --url http://127.0.0.1:8050 [--token TOKEN]
+"""
+
+import argparse
+import json
+import os
+import sys
+import urllib.request
+
+# the tabs import the app from this folder
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+
+def fetch(url, token, top):
+    """Returns the memory accounting of a running server."""
+    request = urllib.request.Request('{}/admin/memory?top={}'.format(url.rstrip('/'), top))
+    if token:
+        request.add_header('X-Admin-Token', token)
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+def print_report(report):
+    """Prints the memory accounting as tables."""
+    mb = 1024 ** 2
+    print('pid {}  RSS {} MB  accounted {:.1f} MB'.format(
+        report['pid'], report['rss_mb'], report['accounted_bytes'] / mb))
+    for title in ('tabs', 'datasets', 'tenants'):
+        print('\n{:<60} {:>10}'.format(title, 'MB'))
+        for name, size in sorted(report[title].items(), key=lambda t: -t[1]):
+            print('{:<60} {:>10.2f}'.format(name, size / mb))
+    print('\n{:<60} {:>8} {:>10}'.format('owner', 'entries', 'MB'))
+    for o in report['owners']:
+        print('{:<60} {:>8} {:>10.2f}'.format(
+            o['owner'][:60], '-' if o['entries'] is None else o['entries'], o['bytes'] / mb))
+    print('\n{:<60} {:>8} {:>8} {:>10}'.format('frame', 'rows', 'columns', 'MB'))
+    for f in report['frames']:
+        print('{:<60} {:>8} {:>8} {:>10.2f}'.format(
+            f['frame'][-60:], f['rows'], f['columns'], f['bytes'] / mb))
+
+
+def main():
+    """Prints the memory accounting of this process or of a running server."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--top', type=int, default=20, help='number of the largest frames')
+    parser.add_argument('--json', action='store_true', help='print json instead of tables')
+    parser.add_argument('--tracemalloc', action='store_true',
+                        help='print the lines which allocate the most during the warm-up')
+    parser.add_argument('--url', help='the url of a running dashboard')
+    parser.add_argument('--token', default=os.environ.get('DASHBOARD_ADMIN_TOKEN'),
+                        help='the admin token of the running dashboard')
+    args = parser.parse_args()
+
+    if args.url:
+        report = fetch(args.url, args.token, args.top)
+    else:
+        from src import memory
+        if args.tracemalloc:
+            memory.tracemalloc_diff()
+        import index
+        index.preload()
+        report = memory.memory_report(top=args.top)
+        if args.tracemalloc:
+            report['tracemalloc'] = memory.tracemalloc_diff()['diff']
+            memory.stop_tracemalloc()
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    print_report(report)
+    for line in report.get('tracemalloc', []):
+        print('{:>+12} B {:>+8} {}'.format(line['size_diff'], line['count_diff'], line['line']))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,8 @@
 #!/usr/bin/env python
 # -*- coding:utf-8 -*-
 """This file creates figures about expenditure data from the library
-collection with the help of the methods of the class Expenditure from the module
+collection with the help of the pre-aggregated expenditure cube (ExpenditureCube), whose
+methods give the same results as the class Expenditures from the module
 data_prep.py. It also produces html divs with those figures which finally
 will be returned as general layout for the presentation in the dashboard. It also
 handles the interactivity for part of the figures by a callback decorator function.
@@ -9,58 +10,99 @@ There are several parts in the code: Instantiating and loading the data, getting
 for the dropdown, making figures of the data, making cards, making html.Divs of the figures,
 cards and dropdown, making the overall layout, and a callback decorator function for interactivity.
 of the tab. There are two functions from utils_dash.py which help to create the dropdown menu
-(create_dropdown_list, get_list_from_df) and the cards (generate_card_content).
+(create_dropdown_list) and the cards (generate_card_content). The values of the
+dropdown come from the index of distinct values (DistinctValues).
 They will be called by the function get_dropdown_menu inside this file.
+The date range picker (get_date_range_picker) selects any range of months, its
+figures and cards are range queries on the time axis of the cubes.
+With the option CLIENTSIDE_FILTERING (configuration.py) the data of the dropdown
+is shipped in a dcc.Store (store_data) and filtered in the browser by a
+clientside callback (assets/clientside.js) instead of the server callback. The
+store also holds the monthly time axis of all suppliers, so the figure and the
+cards of the date range are range queries in the browser as well; only the
+figure of the cost centres (budget) in the range is computed by the server,
+it does not depend on the dropdown.
 """
 
-import pandas as pd
+import datetime
+
+from dateutil.relativedelta import relativedelta
+import numpy as np
 import plotly.express as px
 
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State, ClientsideFunction
 import dash_core_components as dcc
 import dash_html_components as html
 import dash_bootstrap_components as dbc
 
-from app import app
-from src.data_prep import Expenditures
-from src.utils_dash import create_dropdown_list, get_list_from_df, generate_card_content
+from app import app, CODE_VERSION
+from src.expenditure_cube import ExpenditureCube
+from src.utils_dash import create_dropdown_list, generate_card_content, minimize_figure
+from src.cache import memoize
+from src.tenants import TenantLocal, tenant_path
+from src.figure_cache import FigureCache
+from src.distinct_values import DistinctValues
 
 from configuration import FILEPATH_UMSATZ_STOR, FILEPATH_BUDGET_STOR
+from configuration import CALLBACK_CACHE_SIZE, CALLBACK_CACHE_DIR, CLIENTSIDE_FILTERING
 
+# vorberechnete Abbildungen je Lieferant (siehe precompute_figures), je Mandant
+FIGURE_CACHE = TenantLocal(lambda: FigureCache(tenant_path(FILEPATH_UMSATZ_STOR),
+                                                code_version=CODE_VERSION))
+# der zuerst angezeigte Lieferant (falls vorhanden)
+DEFAULT_BODY = 'Antiquariat'
+# der zuerst angezeigte Zeitraum in Monaten bis zum letzten Datum
+DEFAULT_RANGE_MONTHS = 18
 
 # -------------------------------Loading the essential data -------------------
 
+@memoize(FILEPATH_UMSATZ_STOR, FILEPATH_BUDGET_STOR, maxsize=1)
+def load_data():
+    """Returns a dictionary with the essential data of this tab. It is loaded
+    the first time the tab is requested and kept until the umsatz or budget
+    data changes.
+    """
+    data = {}
+
+    # für die DropdownListe, aus dem Index der Lieferanten
+    data['list_retailler'] = DistinctValues(
+        tenant_path(FILEPATH_UMSATZ_STOR), ['Lieferant Abk.']).values('Lieferant Abk.')
+    # der zuerst angezeigte Lieferant, die Daten der Mandanten haben eigene Lieferanten
+    data['default_body'] = (DEFAULT_BODY if DEFAULT_BODY in data['list_retailler']
+                            else next(iter(data['list_retailler']), DEFAULT_BODY))
+
+    # vorberechnete Umsätze je Datum und Lieferant, alle Karten und Abbildungen
+    # sind Ausschnitte daraus
+    data['cube_umsatz'] = ExpenditureCube(tenant_path(FILEPATH_UMSATZ_STOR),
+                                          col_name_body='Lieferant Abk.',
+                                          col_name_expnd='Umsatz (EUR)',
+                                          col_name_expnd_diff='Umsatz Diff')
+    # Gesamtumsatz
+    data['df_total_expnd'] = data['cube_umsatz'].total_expnd_net_years()
+
+    # Top-Gesamtumsatz
+    data['df_top_expnd'] = data['cube_umsatz'].total_expnd_by_bodies_above_value(9)
+
+    # vorberechnete Ausgaben je Datum und Kostenstelle
+    cube_budget = ExpenditureCube(tenant_path(FILEPATH_BUDGET_STOR),
+                                  col_name_body='Bezeichnung',
+                                  col_name_expnd='Ausg. ges.')
+    data['cube_budget'] = cube_budget
+    # Gesamtbudget
+    data['df_total_budget'] = cube_budget.total_expnd_net_years()
+
+    # Top-Gesamtbudget
+    data['df_top_budget'] = cube_budget.total_expnd_by_bodies_above_value(4)
+    return data
 
-# für die DropdownListe
-df_list_retailler = pd.read_csv(FILEPATH_UMSATZ_STOR)
-
-# Gesamtumsatz
-h = Expenditures(FILEPATH_UMSATZ_STOR)
-df_total_expnd = h.total_expnd_net_years('Datum')
-
-# Top-Gesamtumsatz
-j = Expenditures(FILEPATH_UMSATZ_STOR)
-# df_gesamtumsatz_top
-df_top_expnd = j.total_expnd_by_bodies_above_value('Datum',
-                                                   'Lieferant Abk.',
-                                                   'Umsatz (EUR)', 9)
-# Gesamtbudget
-i = Expenditures(FILEPATH_BUDGET_STOR)
-df_total_budget = i.total_expnd_net_years('Datum')
-
-# Top-Gesamtbudget
-i = Expenditures(FILEPATH_BUDGET_STOR)
-df_top_budget = i.total_expnd_by_bodies_above_value('Datum',
-                                                    'Bezeichnung',
-                                                    'Ausg. ges.', 4)
 
 # ---------------------------------Figures Umsatz------------------------------
 
 
 def fig_bookseller_trends(body='Antiquariat'):
     """Returns a Plotly Graph Object with expenditure data. 
-    There is a need for the interactivity to instanciating an object from the 
-    class Expenditures and to invoke a method for filtering the data by the parameter.
+    For the interactivity the data of the body is a slice of the expenditure
+    cube.
 
     Parameters
     ----------
@@ -69,10 +111,7 @@ def fig_bookseller_trends(body='Antiquariat'):
 
     """
 
-    # Instanciaring an object.
-    f = Expenditures(FILEPATH_UMSATZ_STOR)
-    df_net_year_body = f.total_expnd_net_year_by_body(
-        col_name_date='Datum', col_name_body='Lieferant Abk.', body=body)
+    df_net_year_body = load_data()['cube_umsatz'].total_expnd_net_year_by_body(body)
 
     # making the plot
     fig = px.bar(df_net_year_body,
@@ -92,13 +131,13 @@ def fig_bookseller_trends(body='Antiquariat'):
     # set the color of the bars
     fig.update_traces(marker_color='#66C5CC')
 
-    return fig
+    return minimize_figure(fig)
 
 
 def fig_total_expnd():
     """Returns a Plotly Graph Object with expenditure data.
     """
-    fig = px.bar(df_total_expnd,
+    fig = px.bar(load_data()['df_total_expnd'],
                  x='Umsatz (EUR)',
                  y='Datum',
                  orientation='h',
@@ -113,13 +152,13 @@ def fig_total_expnd():
                       height=500)
 
     fig.update_xaxes(nticks=20)
-    return fig
+    return minimize_figure(fig)
 
 
 def fig_top_expnd():
     """Returns a Plotly Graph Object with expenditure data.
     """
-    fig = px.bar(df_top_expnd,
+    fig = px.bar(load_data()['df_top_expnd'],
                   y='Umsatz (EUR)',
                   x='Lieferant Abk.',
                   title = 'Top 10 Lieferanten mit Sonstige',
@@ -135,12 +174,12 @@ def fig_top_expnd():
     
     fig.update_xaxes(categoryorder='total descending')
     
-    return fig
+    return minimize_figure(fig)
 
 def fig_expnd_diff(body='Antiquariat'):
     """Returns a Plotly Graph Object with expenditure data. 
-    There is a need for the interactivity to instanciating an object from the 
-    class Expenditures and to invoke a method for filtering the data by the parameter.
+    For the interactivity the data of the body is a slice of the expenditure
+    cube.
 
     Parameters
     ----------
@@ -149,12 +188,7 @@ def fig_expnd_diff(body='Antiquariat'):
 
     """
 
-    h = Expenditures(FILEPATH_UMSATZ_STOR)
-    df_expnd_diff = h.total_expnd_net_year(col_name_date='Datum',
-                                           col_name_body='Lieferant Abk.',
-                                           col_name_expnd='Umsatz (EUR)',
-                                           col_name_expnd_diff='Umsatz Diff',
-                                           body=body)
+    df_expnd_diff = load_data()['cube_umsatz'].total_expnd_net_year(body)
 
     fig = px.bar(df_expnd_diff,
                  x='Datum',
@@ -171,14 +205,47 @@ def fig_expnd_diff(body='Antiquariat'):
     fig.update_xaxes(tick0='2020-01-01', dtick="M1", tickformat="%b")
     
 
-    return fig
+    return minimize_figure(fig)
+
+
+def fig_range_body(start_date=None, end_date=None, body='Antiquariat'):
+    """Returns a Plotly Graph Object with the monthly expenditures of a body
+    within a date range, a slice of the time axis of the expenditure cube.
+
+    Parameters
+    ----------
+    start_date : str, optional
+        the first date of the range, by default None (the first date)
+    end_date : str, optional
+        the last date of the range, by default None (the latest date)
+    body : str or None, optional
+        by default 'Antiquariat', None (empty dropdown) sums all bodies
+
+    """
+    df_months = load_data()['cube_umsatz'].total_expnd_net_months(start_date, end_date, body)
+
+    fig = px.bar(df_months,
+                 x='Datum',
+                 y='Umsatz Diff',
+                 title='Lieferant Umsatz pro Monat im Zeitraum',
+                 color_discrete_sequence=px.colors.qualitative.Pastel,
+                 template='simple_white')
+
+    fig.update_layout(title_x=0.5,
+                      xaxis_title='Monat',
+                      yaxis_title='Umsatz (EUR)',
+                      height=400)
+
+    fig.update_xaxes(dtick="M1", tickformat="%m.%Y")
+
+    return minimize_figure(fig)
 
 
 # ---------------------------------Figures Budget------------------------------
 def fig_total_budget_years():
     """Returns a Plotly Graph Object with expenditure data.
     """
-    fig = px.bar(df_total_budget,
+    fig = px.bar(load_data()['df_total_budget'],
                  x='Ausg. ges.',
                  y='Datum',
                  orientation='h',
@@ -194,13 +261,13 @@ def fig_total_budget_years():
     
     fig.update_xaxes(nticks=20)
 
-    return fig
+    return minimize_figure(fig)
 
 
 def fig_budget_top():
     """Returns a Plotly Graph Object with expenditure data.
     """
-    fig = px.pie(df_top_budget,
+    fig = px.pie(load_data()['df_top_budget'],
                  values='Ausg. ges.',
                  names='Bezeichnung',
                  title='Top 5 Kostenstellen mit Sonstige',
@@ -208,22 +275,43 @@ def fig_budget_top():
                  template='simple_white')
 
     fig.update_layout(title_x=0.5, height=500)
-    return fig
+    return minimize_figure(fig)
+
+
+def fig_budget_range(start_date=None, end_date=None):
+    """Returns a Plotly Graph Object with the expenditures of the top cost
+    centres within a date range (range query on the budget cube).
+
+    Parameters
+    ----------
+    start_date : str, optional
+        the first date of the range, by default None (the first date)
+    end_date : str, optional
+        the last date of the range, by default None (the latest date)
+
+    """
+    fig = px.pie(load_data()['cube_budget'].total_expnd_by_bodies_range(start_date, end_date, 4),
+                 values='Ausg. ges.',
+                 names='Bezeichnung',
+                 title='Top 5 Kostenstellen im Zeitraum mit Sonstige',
+                 color_discrete_sequence=px.colors.qualitative.Pastel,
+                 template='simple_white')
+
+    fig.update_layout(title_x=0.5, height=400)
+    return minimize_figure(fig)
 
 
 # ---------------------------------Cards Umsatz--------------------------------
 
 def generate_cards_total():
     """Returns a HtmL Div with with dash bootstrap components for cards. It is
-    filled with the values calculated by methods of the class Expenditure (total,
-    and total per current year.)
+    filled with the values of the expenditure cube (total, and total per
+    current year.)
     """
-    i = Expenditures(FILEPATH_UMSATZ_STOR)
-    bookseller_total = i.total_expnd_net(col_name_date='Datum',
-                                         col_name_expnd='Umsatz (EUR)')
+    cube = load_data()['cube_umsatz']
+    bookseller_total = cube.total_expnd_net()
     
-    bookseller_total_year = i.total_expnd_net_current_year(col_name_date='Datum',
-                                                           col_name_expnd='Umsatz (EUR)')
+    bookseller_total_year = cube.total_expnd_net_current_year()
 
     cards = html.Div(
         [
@@ -243,8 +331,8 @@ def generate_cards_total():
 
 def generate_cards_for_body(body='Antiquariat'):
     """Returns a HtmL Div with with dash bootstrap components for cards. It is
-    filled with the values calculated by methods of the class Expenditure (total
-    expenditures for body and mean for body)
+    filled with the values of the expenditure cube (total expenditures for body
+    and mean for body)
 
     Parameters
     ----------
@@ -257,16 +345,9 @@ def generate_cards_for_body(body='Antiquariat'):
        with the calculated values.
     """
 
-    i = Expenditures(FILEPATH_UMSATZ_STOR)
-    bookseller_total_current_year = i.total_expnd_net_current_year_by_body(col_name_date='Datum',
-                                                                           col_name_expnd='Umsatz (EUR)',
-                                                                           col_name_body='Lieferant Abk.',
-                                                                           body=body)
-    i = Expenditures(FILEPATH_UMSATZ_STOR)
-    current_year_mean = i.total_expnd_mean_by_body(col_name_date='Datum',
-                                                   col_name_expnd='Umsatz (EUR)',
-                                                   col_name_body='Lieferant Abk.',
-                                                   body=body)
+    cube = load_data()['cube_umsatz']
+    bookseller_total_current_year = cube.total_expnd_net_current_year_by_body(body)
+    current_year_mean = cube.total_expnd_mean_by_body(body)
     cards = html.Div(
         [
             dbc.Card(generate_card_content(
@@ -283,6 +364,44 @@ def generate_cards_for_body(body='Antiquariat'):
     return cards
 
 
+def generate_cards_range(start_date=None, end_date=None, body='Antiquariat'):
+    """Returns a HtmL Div with with dash bootstrap components for cards. It is
+    filled with the expenditures within a date range (for the body and
+    overall), each the difference of two prefix sums of the expenditure cube.
+
+    Parameters
+    ----------
+    start_date : str, optional
+        the first date of the range, by default None (the first date)
+    end_date : str, optional
+        the last date of the range, by default None (the latest date)
+    body : str or None, optional
+        the name of the body, by default 'Antiquariat', None (empty dropdown)
+        sums all bodies
+
+    Returns
+    -------
+    html.Div:
+       with the calculated values.
+    """
+    cube = load_data()['cube_umsatz']
+    cards = html.Div(
+        [
+            dbc.Card(generate_card_content(
+                'Umsatz Lieferant im Zeitraum',
+                cube.total_expnd_net_range(start_date, end_date, body)),
+                color='success',
+                inverse=True),
+
+            dbc.Card(generate_card_content(
+                'Gesamtumsatz im Zeitraum', cube.total_expnd_net_range(start_date, end_date)),
+                color='success',
+                inverse=True),
+        ], id='umsatz_range_card', className="one columns chart_div"
+    )
+    return cards
+
+
 # ---------------------------HTML-UMSATZ---------------------------------------
 
 def html_fig_bookseller_trends():
@@ -295,7 +414,7 @@ def html_fig_bookseller_trends():
                 [
                     dcc.Graph(
                         id='expnd_net_year_by_body',
-                        figure=fig_bookseller_trends('Antiquariat')
+                        figure=fig_bookseller_trends(load_data()['default_body'])
                     ),
                 ], className="five columns chart_div", style={'margin-top': '20px', 'margin-left': '10px'}
             ),
@@ -331,7 +450,7 @@ def html_fig_expnd_diff():
                 [
                     dcc.Graph(
                         id='umsatz_diff',
-                        figure=fig_expnd_diff('Antiquariat')
+                        figure=fig_expnd_diff(load_data()['default_body'])
                     ),
                 ], className="six columns chart_div", style={'margin-top': '20px', 'margin-left': '10px'}
             ),
@@ -373,14 +492,87 @@ def get_dropdown_menu(id):
                 [html.Label('Auswahl Lieferant'),
                  dcc.Dropdown(id='my-id'+str(id),
                               options=create_dropdown_list(
-                                  get_list_from_df(df_list_retailler, 'Lieferant Abk.')),
-                              value='Antiquariat'
+                                  load_data()['list_retailler'], sort=False),
+                              value=load_data()['default_body']
                               ),
                  ], className='eleven columns', style={'margin-left': '10px'}
             )
         ], className="row", style={}
     )
 
+def default_date_range():
+    """Returns the first and the last date of the range which is shown
+    first: the last DEFAULT_RANGE_MONTHS months up to the latest date.
+    """
+    first, last = load_data()['cube_umsatz'].date_range()
+    if last is None:
+        return None, None
+    # one date per month (the monthly stand)
+    start = (datetime.date.fromisoformat(last)
+             - relativedelta(months=DEFAULT_RANGE_MONTHS - 1)).isoformat()
+    return max(first, start), last
+
+
+def get_date_range_picker():
+    """Returns a html Div with the date range picker, limited to the dates of
+    the umsatz data.
+    """
+    first, last = load_data()['cube_umsatz'].date_range()
+    start_date, end_date = default_date_range()
+    return html.Div(
+        [
+            html.Div(
+                [html.Label('Auswahl Zeitraum'),
+                 dcc.DatePickerRange(id='umsatz_range',
+                                     min_date_allowed=first,
+                                     max_date_allowed=last,
+                                     start_date=start_date,
+                                     end_date=end_date,
+                                     display_format='DD.MM.YYYY',
+                                     first_day_of_week=1
+                                     ),
+                 ], className='eleven columns', style={'margin-left': '10px'}
+            )
+        ], className="row", style={}
+    )
+
+
+def html_fig_range_body():
+    """Returns a html Div with a Plotly Graph Object returned by 'fig_range_body',
+    which is called inside this function.
+    """
+    start_date, end_date = default_date_range()
+    return html.Div(
+        [
+            html.Div(
+                [
+                    dcc.Graph(
+                        id='umsatz_range_body',
+                        figure=fig_range_body(start_date, end_date, load_data()['default_body'])
+                    ),
+                ], className="five columns chart_div", style={'margin-top': '20px', 'margin-left': '10px'}
+            ),
+        ],
+    )
+
+
+def html_fig_budget_range():
+    """Returns a html Div with a Plotly Graph Object returned by 'fig_budget_range',
+    which is called inside this function.
+    """
+    return html.Div(
+        [
+            html.Div(
+                [
+                    dcc.Graph(
+                        id='budget_range_top',
+                        figure=fig_budget_range(*default_date_range())
+                    ),
+                ], className="five columns chart_div", style={'margin-top': '20px', 'margin-left': '10px'}
+            ),
+        ]
+    )
+
 # ---------------------------HTML-Budget---------------------------------------
 
 def html_fig_total_budget_years():
@@ -419,10 +611,69 @@ def html_fig_budget_top():
     )
 
 
+# ---------------------------Store für clientseitige Filterung-----------------
+
+@memoize(FILEPATH_UMSATZ_STOR, maxsize=1)
+def store_data():
+    """Returns the data of the supplier dropdown for all suppliers as compact
+    columnar arrays, used by the clientside callback (assets/clientside.js).
+    The figures and cards for the default value are shipped as templates,
+    the browser only replaces their values.
+
+    Returns
+    -------
+    dict:
+        with the list of suppliers, the arrays of the yearly totals, the
+        monthly differences of the current year, the time axis of the monthly
+        differences, the card values and the templates.
+    """
+    cube = load_data()['cube_umsatz']
+    df_years = load_data()['df_total_expnd']
+    bodies = load_data()['list_retailler']
+    codes = {body: i for i, body in enumerate(bodies)}
+
+    df_diff = cube.total_expnd_net_year(body=None)
+    # Lieferanten ohne Jahreswerte haben den Durchschnitt 0
+    mean_bodies = set(df_years['Lieferant Abk.'])
+
+    # die Zeitachse für den Zeitraum: die Summe aller Lieferanten je Monat und
+    # die Monatswerte je Lieferant ohne die Nullen (Position auf der Achse)
+    axis, axis_bodies, values = cube.time_axis()
+    pos, cols = np.nonzero(values)
+    axis_codes = np.array([codes.get(body, -1) for body in axis_bodies], dtype=np.int64)
+    start_date, end_date = default_date_range()
+
+    return {
+        'bodies': bodies,
+        'years': {'body': df_years['Lieferant Abk.'].map(codes).tolist(),
+                  'x': df_years['Datum'].tolist(),
+                  'y': df_years['Umsatz (EUR)'].tolist()},
+        'diff': {'body': df_diff['Lieferant Abk.'].map(codes).tolist(),
+                 'x': df_diff['Datum'].tolist(),
+                 'y': df_diff['Umsatz Diff'].tolist()},
+        'range': {'x': axis.tolist(),
+                  'total': values.sum(axis=1).tolist(),
+                  'body': axis_codes[cols].tolist(),
+                  'pos': pos.tolist(),
+                  'y': values[pos, cols].tolist()},
+        'cards': [[float(cube.total_expnd_net_current_year_by_body(body)),
+                   float(cube.total_expnd_mean_by_body(body) if body in mean_bodies else 0)]
+                  for body in bodies],
+        'templates': [fig_bookseller_trends(load_data()['default_body']),
+                      fig_expnd_diff(load_data()['default_body']),
+                      generate_cards_for_body(load_data()['default_body']).children,
+                      fig_range_body(start_date, end_date, load_data()['default_body']),
+                      generate_cards_range(start_date, end_date,
+                                           load_data()['default_body']).children],
+    }
+
+
 # ---------------------------------------Tab-Layout----------------------------
 
+@memoize(FILEPATH_UMSATZ_STOR, FILEPATH_BUDGET_STOR, maxsize=1)
 def generate_layout():
-    """Returns the layout for this tab, that will be used in index.py
+    """Returns the layout for this tab, that will be used in index.py. The
+    layout is built on the first request and reused until the data changes.
     """
     layout = html.Div(
         [
@@ -441,7 +692,18 @@ def generate_layout():
              html.Div([
                 html_fig_bookseller_trends(),
                 html_fig_expnd_diff(),
-                generate_cards_for_body(),
+                generate_cards_for_body(load_data()['default_body']),
+                ], className='row'),
+
+            html.Div([
+                html.H6('Zeitraum'),
+                get_date_range_picker(),
+             ], className='row'),
+
+            html.Div([
+                html_fig_range_body(),
+                html_fig_budget_range(),
+                generate_cards_range(*default_date_range(), load_data()['default_body']),
                 ], className='row'),
             
             html.Div([
@@ -451,21 +713,59 @@ def generate_layout():
             ], className='row')
         ]
     )
+    if CLIENTSIDE_FILTERING:
+        layout.children.append(dcc.Store(id='umsatz_store', data=store_data()))
     return layout
 
 
 # ----------------------------------Callback(s)--------------------------------
 
-@app.callback([
-    Output(component_id='expnd_net_year_by_body', component_property='figure'),
-    Output(component_id='umsatz_diff', component_property='figure'),
-    Output(component_id='umsatz_card', component_property='children')],
-    [Input(component_id='my-id1', component_property='value')])
+def outputs_for_body(body):
+    """Returns the outputs of the callback for one value of the dropdown list
+    (fig_bookseller_trends, fig_expnd_diff, generate_cards_for_body).
+
+    Parameters
+    ----------
+    body : str
+        the value of the dropdown list.
+
+    Returns
+    -------
+    list:
+        with the two figures and the cards.
+    """
+    return [fig_bookseller_trends(body), fig_expnd_diff(body), generate_cards_for_body(body)]
+
+
+def precompute_figures(workers=None):
+    """Precomputes the outputs of the callback for all values of the dropdown
+    list in a pool of worker processes. It is called after each import of the
+    umsatz data (see warm_up_figures.py).
+
+    Parameters
+    ----------
+    workers : int, optional
+        the number of worker processes, by default None (number of cores)
+
+    Returns
+    -------
+    int:
+        the number of precomputed values.
+    """
+    return FIGURE_CACHE().precompute(outputs_for_body, load_data()['list_retailler'],
+                                     workers=workers)
+
+
+@memoize(FILEPATH_UMSATZ_STOR, maxsize=CALLBACK_CACHE_SIZE, disk_dir=CALLBACK_CACHE_DIR)
 def update_output_div(input_value):
     """Changed the output for three functions (fig_bookseller_trends,
     fig_expnd_diff, generate_cards_for_body )which are modified by the values of
     the dropdown list. The "inputs" and "outputs" are described declaratively as 
-    the arguments of the @app.callback decorator.
+    the arguments of app.callback (see the end of this file). It is only
+    registered without CLIENTSIDE_FILTERING. The outputs are served from
+    the precomputed figures if they are up to date, otherwise they are computed.
+    The results are memoized by the input value and the version of the umsatz
+    data.
     
     see: https://dash.plotly.com/basic-callbacks
 
@@ -479,4 +779,93 @@ def update_output_div(input_value):
     functions:
         which are modified by the input value.
     """
-    return fig_bookseller_trends(input_value), fig_expnd_diff(input_value), generate_cards_for_body(input_value)
+    cached = FIGURE_CACHE().get(input_value)
+    if cached is not None:
+        return cached
+    return outputs_for_body(input_value)
+
+
+@memoize(FILEPATH_UMSATZ_STOR, FILEPATH_BUDGET_STOR, maxsize=CALLBACK_CACHE_SIZE)
+def update_range(start_date, end_date, input_value):
+    """Changes the outputs of the date range (fig_range_body,
+    fig_budget_range, generate_cards_range) for the selected range and the
+    value of the dropdown list. The outputs are range queries on the time
+    axis of the expenditure cubes, they are memoized by the inputs and the
+    versions of the umsatz and budget data. It is only registered without
+    CLIENTSIDE_FILTERING.
+
+    Parameters
+    ----------
+    start_date : str
+        the first date of the date range picker.
+    end_date : str
+        the last date of the date range picker.
+    input_value : str
+        the value of the dropdown list.
+
+    Returns
+    -------
+    list:
+        with the two figures and the cards.
+    """
+    return [fig_range_body(start_date, end_date, input_value),
+            fig_budget_range(start_date, end_date),
+            generate_cards_range(start_date, end_date, input_value)]
+
+
+@memoize(FILEPATH_BUDGET_STOR, maxsize=CALLBACK_CACHE_SIZE)
+def update_budget_range(start_date, end_date):
+    """Changes the figure of the cost centres within the date range
+    (fig_budget_range). It is only registered with CLIENTSIDE_FILTERING, the
+    other outputs of the range are filtered in the browser. The figure is
+    memoized by the dates and the version of the budget data.
+
+    Parameters
+    ----------
+    start_date : str
+        the first date of the date range picker.
+    end_date : str
+        the last date of the date range picker.
+
+    Returns
+    -------
+    plotly graph object:
+        the figure of the cost centres within the range.
+    """
+    return fig_budget_range(start_date, end_date)
+
+
+# Die Ausgaben werden entweder im Browser aus dem Store gefiltert oder auf dem Server berechnet.
+if CLIENTSIDE_FILTERING:
+    app.clientside_callback(
+        ClientsideFunction(namespace='expenditures', function_name='update_body'),
+        [Output(component_id='expnd_net_year_by_body', component_property='figure'),
+         Output(component_id='umsatz_diff', component_property='figure'),
+         Output(component_id='umsatz_card', component_property='children')],
+        [Input(component_id='my-id1', component_property='value')],
+        [State(component_id='umsatz_store', component_property='data')])
+    app.clientside_callback(
+        ClientsideFunction(namespace='expenditures', function_name='update_range'),
+        [Output(component_id='umsatz_range_body', component_property='figure'),
+         Output(component_id='umsatz_range_card', component_property='children')],
+        [Input(component_id='umsatz_range', component_property='start_date'),
+         Input(component_id='umsatz_range', component_property='end_date'),
+         Input(component_id='my-id1', component_property='value')],
+        [State(component_id='umsatz_store', component_property='data')])
+    app.callback(
+        Output(component_id='budget_range_top', component_property='figure'),
+        [Input(component_id='umsatz_range', component_property='start_date'),
+         Input(component_id='umsatz_range', component_property='end_date')])(update_budget_range)
+else:
+    app.callback([
+        Output(component_id='expnd_net_year_by_body', component_property='figure'),
+        Output(component_id='umsatz_diff', component_property='figure'),
+        Output(component_id='umsatz_card', component_property='children')],
+        [Input(component_id='my-id1', component_property='value')])(update_output_div)
+    app.callback([
+        Output(component_id='umsatz_range_body', component_property='figure'),
+        Output(component_id='budget_range_top', component_property='figure'),
+        Output(component_id='umsatz_range_card', component_property='children')],
+        [Input(component_id='umsatz_range', component_property='start_date'),
+         Input(component_id='umsatz_range', component_property='end_date'),
+         Input(component_id='my-id1', component_property='value')])(update_range)
@@ -11,60 +11,83 @@ Instantiating and loading the data, making figures of the data, making html.Divs
 of the figures and dropdown, making the overall layout, 
 and a callback decorator function for interactivity.
 There are two functions from utils.py which help to create the dropdown menu
-(create_dropdown_list, get_list_from_df).
+(create_dropdown_list). The years of the dropdown come from the index of
+distinct values (DistinctValues).
 They will be called by the function get_dropdown_menu inside this file.
+With the option CLIENTSIDE_FILTERING (configuration.py) the data of the dropdown
+is shipped in a dcc.Store (store_data) and filtered in the browser by a
+clientside callback (assets/clientside.js) instead of the server callback.
+With DATA_BACKEND = 'sql' (configuration.py) the classes of src/sql_backend.py
+run the aggregations as SQL queries.
 """
 
-import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State, ClientsideFunction
 import dash_core_components as dcc
 import dash_html_components as html
 
 from app import app
 from src.data_prep import ReadingRoom, LoanColl
 
-from src.utils_dash import create_dropdown_list, get_list_from_df
+from src.utils_dash import create_dropdown_list, minimize_figure
+from src.distinct_values import DistinctValues
+from src.cache import memoize
+from src.tenants import tenant_path
 
 from configuration import FILEPATH_LOAN_STOR, FILEPATH_READING_STOR
+from configuration import CALLBACK_CACHE_SIZE, CALLBACK_CACHE_DIR, CLIENTSIDE_FILTERING
+from configuration import DATA_PREP_PARALLEL, DATA_BACKEND
+
+if DATA_BACKEND == 'sql':
+    from src.sql_backend import SqlReadingRoom as ReadingRoom, SqlLoanColl as LoanColl
 
 
 # -------------------------------Loading the essential data -------------------
 
-# liste Jahr für dropdown
-df_liste_year_reading = pd.read_csv(FILEPATH_READING_STOR)
+@memoize(FILEPATH_READING_STOR, FILEPATH_LOAN_STOR, maxsize=1)
+def load_data():
+    """Returns a dictionary with the essential data of this tab. It is loaded
+    the first time the tab is requested and kept until the readingroom or loan
+    data changes.
+    """
+    data = {}
+
+    # liste Jahr für dropdown
+    data['liste_year_reading'] = DistinctValues(
+        tenant_path(FILEPATH_READING_STOR), ['Jahr']).values('Jahr')
 
-# Jahresnutzung Lesesaal
-a = ReadingRoom(FILEPATH_READING_STOR)
-df_use_years = a.use_by_years(col_name_year='Jahr')
+    # Jahresnutzung Lesesaal
+    a = ReadingRoom(tenant_path(FILEPATH_READING_STOR))
+    data['df_use_years'] = a.use_by_years(col_name_year='Jahr')
 
-# mtl. Nutzung Lesesaal
-c = ReadingRoom(FILEPATH_READING_STOR)
-df_use_months = c.use_by_months(
-    col_name_year='Jahr',
-    col_name_date='Datum',
-    col_name_month='Monat',
-    year=2020)
+    # Ausleihe Jahre
+    x = LoanColl(tenant_path(FILEPATH_LOAN_STOR), parallel=DATA_PREP_PARALLEL)
+    data['df_loan_dist'] = x.total_loans(
+        col_name_year='year',
+        col_name_loan='cum_loans',
+        col_name_class='Systematikgruppe', new_value='Bibliothek', number=1)
 
-# Ausleihe Jahre
-x = LoanColl(FILEPATH_LOAN_STOR)
-df_loan_dist = x.total_loans(
-    col_name_year='year',
-    col_name_loan='cum_loans',
-    col_name_class='Systematikgruppe', new_value='Bibliothek', number=1)
+    y = LoanColl(tenant_path(FILEPATH_LOAN_STOR), parallel=DATA_PREP_PARALLEL)
+    data['df_loan_years'] = y.total_loans(
+        col_name_year='year',
+        col_name_loan='cum_loans',
+        col_name_class='Systematikgruppe', new_value='Sonstiges', number=9)
 
-y = LoanColl(FILEPATH_LOAN_STOR)
-df_loan_years = y.total_loans(
-    col_name_year='year',
-    col_name_loan='cum_loans',
-    col_name_class='Systematikgruppe', new_value='Sonstiges', number=9)
+    # Top Ausleihe
+    z = LoanColl(tenant_path(FILEPATH_LOAN_STOR), parallel=DATA_PREP_PARALLEL)
+    data['df_top_loans'] = z.top_loans_by_title(
+        col_name_year='year', col_name_loan='cum_loans', number=5)
 
-# Top Ausleihe
-z = LoanColl(FILEPATH_LOAN_STOR)
-df_top_loans = z.top_loans_by_title(
-    col_name_year='year', col_name_loan='cum_loans', number=5)
+    return data
+
+
+def latest_year():
+    """Returns the latest year of the readingroom data, the default of the
+    dropdown.
+    """
+    return load_data()['liste_year_reading'][-1]
 
 
 # ---------------------------------Figures Ausleihe----------------------------
@@ -72,6 +95,7 @@ df_top_loans = z.top_loans_by_title(
 def fig_use_by_years():
     """Returns a Plotly Graph Object with use data.
     """
+    df_use_years = load_data()['df_use_years']
     fig = px.bar(df_use_years,
                  x=df_use_years.index,
                  y=['10.00 - 12.30', '12.30 - 15.00',
@@ -86,7 +110,7 @@ def fig_use_by_years():
                       xaxis_title='Jahr',
                       yaxis_title='Anzahl der Nutzer:innen',
                       legend_title='Service-Zeiten')
-    return fig
+    return minimize_figure(fig)
 
 
 def fig_use_by_month(year=2017):
@@ -100,7 +124,7 @@ def fig_use_by_month(year=2017):
     """
     # Instanciating an object and filtering after the parameter by a method of
     # the class ReadingRoom
-    e = ReadingRoom(FILEPATH_READING_STOR)
+    e = ReadingRoom(tenant_path(FILEPATH_READING_STOR))
     df = e.use_by_months(
         col_name_year='Jahr',
         col_name_date='Datum',
@@ -126,12 +150,13 @@ def fig_use_by_month(year=2017):
     fig.update_xaxes(dtick="M1", tickformat="%b\n%Y")
     fig.update_yaxes(nticks=20)
 
-    return fig
+    return minimize_figure(fig)
 
 
 def fig_top_loan_years():
     """Returns a Plotly Graph Object with loan data.
     """
+    df_loan_years = load_data()['df_loan_years']
     fig = px.bar(df_loan_years,
                  y=df_loan_years.index,
                  x='cum_loans',
@@ -150,14 +175,14 @@ def fig_top_loan_years():
     fig.update_traces(marker_line_width=0)
     fig.update_xaxes(nticks=20)
 
-    return fig
+    return minimize_figure(fig)
 
 
 def fig_top_loan_dist():
     """Returns a Plotly Graph Object with loan data.
     """
 
-    fig = px.pie(df_loan_dist,
+    fig = px.pie(load_data()['df_loan_dist'],
                  values='cum_loans',
                  names='Systematikgruppe',
                  title='Gesamtverteilung Ausleihe Buchservice / Bibliothek',
@@ -169,12 +194,13 @@ def fig_top_loan_dist():
 
     fig.update_layout(title_x=0.5)
 
-    return fig
+    return minimize_figure(fig)
 
 
 def fig_top_loan_title():
     """Returns a Plotly Graph Object with use data.
     """
+    df_top_loans = load_data()['df_top_loans']
     fig = go.Figure(
         data=[
             go.Table(
@@ -197,7 +223,7 @@ def fig_top_loan_title():
                       plot_bgcolor='#fffcfc',
                       paper_bgcolor='#fffcfc')
 
-    return fig
+    return minimize_figure(fig)
 
 
 # ---------------------------HTML-Lesesaal-------------------------------------
@@ -230,7 +256,7 @@ def html_fig_use_by_month():
                 [
                     dcc.Graph(
                         id='use_by_month',
-                        figure=fig_use_by_month(year=2017)
+                        figure=fig_use_by_month(year=latest_year())
                     ),
                 ], className="six columns chart_div", style={'margin-top': '20px', 'margin-left': '10px'}
             ),
@@ -253,8 +279,8 @@ def get_dropdown_menu(id):
                 [html.Label('Auswahl Jahr'),
                  dcc.Dropdown(id='my-id'+str(id),
                               options=create_dropdown_list(
-                                  get_list_from_df(df_liste_year_reading, 'Jahr')),
-                              value=2017
+                                  load_data()['liste_year_reading'], sort=False),
+                              value=latest_year()
                               ),
                  ], className='six columns', style={'margin-top': '20px', 'margin-left': '10px'}
             )
@@ -318,10 +344,47 @@ def html_fig_top_loan_dist():
     )
 
 
+# ---------------------------Store für clientseitige Filterung-----------------
+
+# Service-Zeiten, eine Linie je Spalte
+SERVICE_TIMES = ['10.00 - 12.30', '12.30 - 15.00', '15.00 - 17.00', '17.00 - 18.30']
+
+
+@memoize(FILEPATH_READING_STOR, maxsize=1)
+def store_data():
+    """Returns the monthly use of the reading room for all years as compact
+    columnar arrays, used by the clientside callback (assets/clientside.js).
+    The figure for the default year is shipped as template, the browser only
+    replaces its values.
+
+    Returns
+    -------
+    dict:
+        with the arrays of the years, months and numbers per service time and
+        the template.
+    """
+    e = ReadingRoom(tenant_path(FILEPATH_READING_STOR))
+    df = e.use_by_months(
+        col_name_year='Jahr',
+        col_name_date='Datum',
+        col_name_month='Monat',
+        year=None)
+
+    return {
+        'year': df['Jahr'].tolist(),
+        'x': df.index.strftime('%Y-%m-%d').tolist(),
+        'columns': SERVICE_TIMES,
+        'values': {col: df[col].tolist() for col in SERVICE_TIMES},
+        'template': fig_use_by_month(year=latest_year()),
+    }
+
+
 # ---------------------------------------Tab-Layout----------------------------
 
+@memoize(FILEPATH_READING_STOR, FILEPATH_LOAN_STOR, maxsize=1)
 def generate_layout():
-    """Returns the layout for this tab, that will be used in index.py
+    """Returns the layout for this tab, that will be used in index.py. The
+    layout is built on the first request and reused until the data changes.
     """
     layout = html.Div(
         [
@@ -346,20 +409,22 @@ def generate_layout():
             ],className='row')
 
         ])
+    if CLIENTSIDE_FILTERING:
+        layout.children.append(dcc.Store(id='lesesaal_store', data=store_data()))
 
     return layout
 
 # ----------------------------------Callback(s)--------------------------------
 
 
-@app.callback(
-    Output(component_id='use_by_month', component_property='figure'),
-    [Input(component_id='my-id2', component_property='value')])
+@memoize(FILEPATH_READING_STOR, maxsize=CALLBACK_CACHE_SIZE, disk_dir=CALLBACK_CACHE_DIR)
 def update_output_div(input_value):
     """Changed the output for one function (fig_use_by_month)
     which is modified by the values of the dropdown list. 
     The "inputs" and "outputs" are described declaratively as 
-    the arguments of the @app.callback decorator.
+    the arguments of app.callback (see the end of this file). It is only
+    registered without CLIENTSIDE_FILTERING. The results are memoized by
+    the input value and the version of the readingroom data.
 
     see: https://dash.plotly.com/basic-callbacks
 
@@ -375,3 +440,16 @@ def update_output_div(input_value):
     """
 
     return fig_use_by_month(input_value)
+
+
+# Die Abbildung wird entweder im Browser aus dem Store gefiltert oder auf dem Server berechnet.
+if CLIENTSIDE_FILTERING:
+    app.clientside_callback(
+        ClientsideFunction(namespace='readingroom', function_name='update_year'),
+        Output(component_id='use_by_month', component_property='figure'),
+        [Input(component_id='my-id2', component_property='value')],
+        [State(component_id='lesesaal_store', component_property='data')])
+else:
+    app.callback(
+        Output(component_id='use_by_month', component_property='figure'),
+        [Input(component_id='my-id2', component_property='value')])(update_output_div)
@@ -6,7 +6,8 @@ data_prep.py. It also produces html divs with those figures which finally
 will be returned as general layout for the presentation in the dashboard.
 There are 4 parts in the code: Instantiating and loading the data, making 
 figures of the data, making html.Divs of the figures, making the overall layout
-of the tab.
+of the tab. With DATA_BACKEND = 'sql' (configuration.py) the classes of
+src/sql_backend.py run the aggregations as SQL queries.
 """
 
 import plotly.express as px
@@ -18,65 +19,78 @@ import dash_bootstrap_components as dbc
 
 from app import app
 from src.data_prep import Collection, LoanColl
+from src.collection_counter import CollectionCounter
+from src.utils_dash import minimize_figure
+from src.cache import memoize
+from src.tenants import tenant_path
 
 from configuration import FILEPATH_HELPER_MAT
 
 from configuration import FILEPATH_NEWACQ_STOR, FILEPATH_LOAN_STOR
+from configuration import DATA_PREP_PARALLEL, DATA_BACKEND
+
+if DATA_BACKEND == 'sql':
+    from src.sql_backend import SqlCollection as Collection, SqlLoanColl as LoanColl
 
 
 # -------------------------------Loading the essential data -------------------
 
-# neuerwerbungen laufendes jahr
-a = Collection(FILEPATH_NEWACQ_STOR)
-df_new_acq_curr_year = a.development_collection_current_year(
-    col_name_date='Datum', col_name_shelfmark='Signatur')
-
-# Bestandswachstum relatives und absolutes
-e = Collection(FILEPATH_NEWACQ_STOR)
-df_total_collection_years = e.total_collection_years(
-    col_name_date='Datum', col_name_shelfmark='Signatur')
-
-# Bestandswachstum nach Medientyp
-# wird nicht in Dashboard angezeigt
-# k = Collection(FILEPATH_NEWACQ_STOR)
-# df_development_media_type_years = k.development_media_type_years(FILEPATH_HELPER_MAT,
-#                                                                  col_name_date='Datum',
-#                                                                  col_name_media_type='0500',
-#                                                                  col_name_shelfmark='Signatur',
-#                                                                  col_name_year='Jahr',
-#                                                                  col_name_copy='Ex')
-
-# Bestandswachstum nach Monat / Jahr
-j = Collection(FILEPATH_NEWACQ_STOR)
-df_cumsum_development_years = j.development_cumsum(col_name_shelfmark='Signatur',
-                                                   col_name_date='Datum',
-                                                   col_name_copy='Ex')
-
-# Top ten classes per year
-i = Collection(FILEPATH_NEWACQ_STOR)
-df_development_top_class_years = i.development_collection_top_class_years(col_name_class='Systematikgruppe',
-                                                                          col_name_shelfmark='Signatur',
-                                                                          col_name_date='Datum',
-                                                                          col_name_copy='Ex')
-
-# Top class total
-k = Collection(FILEPATH_NEWACQ_STOR)
-df_development_top_class_total = k.development_collection_class_overall_top(col_name_date='Datum',
-                                                                            col_name_shelfmark='Signatur',
-                                                                            col_name_class='Systematikgruppe',
-                                                                            col_name_copy='Ex')
-
-y = LoanColl(FILEPATH_LOAN_STOR)
-df_library_loan_class = y.library_loan_class(col_name_year='year',
-                                             col_name_class='Systematikgruppe',
-                                             exclude_value='Buchservice',
-                                             col_name_loan='cum_loans')
+@memoize(FILEPATH_NEWACQ_STOR, FILEPATH_LOAN_STOR, maxsize=1)
+def load_data():
+    """Returns a dictionary with the essential data of this tab. It is loaded
+    the first time the tab is requested and kept until the new acquisition or
+    loan data changes.
+    """
+    data = {}
+
+    # neuerwerbungen laufendes jahr
+    a = Collection(tenant_path(FILEPATH_NEWACQ_STOR), parallel=DATA_PREP_PARALLEL)
+    data['df_new_acq_curr_year'] = a.development_collection_current_year(
+        col_name_date='Datum', col_name_shelfmark='Signatur')
+
+    # laufende Zähler des Bestandswachstums (werden beim Import aktualisiert)
+    counter = CollectionCounter(tenant_path(FILEPATH_NEWACQ_STOR))
+
+    # Bestandswachstum relatives und absolutes
+    data['df_total_collection_years'] = counter.total_collection_years()
+
+    # Bestandswachstum nach Medientyp
+    # wird nicht in Dashboard angezeigt
+    # k = Collection(FILEPATH_NEWACQ_STOR)
+    # data['df_development_media_type_years'] = k.development_media_type_years(FILEPATH_HELPER_MAT,
+    #                                                                          col_name_date='Datum',
+    #                                                                          col_name_media_type='0500',
+    #                                                                          col_name_shelfmark='Signatur',
+    #                                                                          col_name_year='Jahr',
+    #                                                                          col_name_copy='Ex')
+
+    # Bestandswachstum nach Monat / Jahr
+    data['df_cumsum_development_years'] = counter.development_cumsum()
+
+    # Top ten classes per year
+    data['df_development_top_class_years'] = counter.development_collection_top_class_years()
+
+    # Top class total
+    k = Collection(tenant_path(FILEPATH_NEWACQ_STOR), parallel=DATA_PREP_PARALLEL)
+    data['df_development_top_class_total'] = k.development_collection_class_overall_top(col_name_date='Datum',
+                                                                                        col_name_shelfmark='Signatur',
+                                                                                        col_name_class='Systematikgruppe',
+                                                                                        col_name_copy='Ex')
+
+    y = LoanColl(tenant_path(FILEPATH_LOAN_STOR), parallel=DATA_PREP_PARALLEL)
+    data['df_library_loan_class'] = y.library_loan_class(col_name_year='year',
+                                                         col_name_class='Systematikgruppe',
+                                                         exclude_value='Buchservice',
+                                                         col_name_loan='cum_loans')
+    return data
+
 
 # ---------------------------------Figures Bestand-----------------------------
 
 def fig_new_acq_curr_year():
     """Returns a Plotly Graph Object with collection data.
     """
+    df_new_acq_curr_year = load_data()['df_new_acq_curr_year']
     fig = px.bar(df_new_acq_curr_year,
                  x=df_new_acq_curr_year.index,
                  y='Signatur',
@@ -93,12 +107,13 @@ def fig_new_acq_curr_year():
     fig.update_xaxes(tick0='2020-01-31', dtick="M1", tickformat="%b")
     fig.update_yaxes(nticks=20)
 
-    return fig
+    return minimize_figure(fig)
 
 
 def fig_total_collection_years():
     """Returns a Plotly Graph Object with collection data.
     """
+    df_total_collection_years = load_data()['df_total_collection_years']
     fig = px.bar(df_total_collection_years,
                  x=df_total_collection_years.index,
                  y=['Gesamt', 'Ex'],
@@ -116,7 +131,7 @@ def fig_total_collection_years():
 
     fig.update_yaxes(nticks=20)
 
-    return fig
+    return minimize_figure(fig)
 
 
 # wird nicht in Dashboard umgesetzt.
@@ -147,6 +162,7 @@ def fig_total_collection_years():
 def fig_cumsum_development_years():
     """Returns a Plotly Graph Object with collection data.
     """
+    df_cumsum_development_years = load_data()['df_cumsum_development_years']
     fig = px.line(df_cumsum_development_years,
                   x=df_cumsum_development_years['Monat'],
                   y='cum_s',
@@ -164,12 +180,13 @@ def fig_cumsum_development_years():
 
     fig.update_xaxes(dtick="M1")
 
-    return fig
+    return minimize_figure(fig)
 
 
 def fig_development_top_class_years():
     """Returns a Plotly Graph Object with collection data.
     """
+    df_development_top_class_years = load_data()['df_development_top_class_years']
     fig = px.bar(df_development_top_class_years,
                  x=df_development_top_class_years['Datum'],
                  y='Ex',
@@ -188,13 +205,14 @@ def fig_development_top_class_years():
     fig.update_traces(marker_line_width=0)
     fig.update_xaxes(nticks=10)
 
-    return fig
+    return minimize_figure(fig)
 
 
 def fig_development_top_class_total():
     """Returns a Plotly Graph Object with collection data.
     """
     
+    df_development_top_class_total = load_data()['df_development_top_class_total']
     fig = px.bar(df_development_top_class_total,
                  x='Systematikgruppe',
                  y='Ex',
@@ -213,12 +231,13 @@ def fig_development_top_class_total():
     fig.update_yaxes(nticks=10)
     fig.update_xaxes(categoryorder='total descending')
 
-    return fig
+    return minimize_figure(fig)
 
 
 def fig_top_loan_dist():
     """Returns a Plotly Graph Object with loan data.
     """
+    df_library_loan_class = load_data()['df_library_loan_class']
     fig = px.bar(df_library_loan_class,
                  y='cum_loans',
                  x='Systematikgruppe',
@@ -237,7 +256,7 @@ def fig_top_loan_dist():
     fig.update_xaxes(categoryorder='total ascending')
         
     
-    return fig
+    return minimize_figure(fig)
 
 # ---------------------------HTML Figure---------------------------------------
 
@@ -371,8 +390,10 @@ def html_fig_top_loan_dist():
 
 # ---------------------------------------Tab-Layout----------------------------
 
+@memoize(FILEPATH_NEWACQ_STOR, FILEPATH_LOAN_STOR, maxsize=1)
 def generate_layout():
-    """Returns the layout for this tab, that will be used in index.py
+    """Returns the layout for this tab, that will be used in index.py. The
+    layout is built on the first request and reused until the data changes.
     """
     layout = html.Div(
         [
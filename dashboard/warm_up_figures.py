@@ -0,0 +1,37 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This script precomputes the figures of the dropdown lists after an import,
+so the callbacks of the dashboard serve stored JSON (see src/figure_cache.py).
+It is called by run_instances.sh after the import scripts. Like the import
+scripts it works on the data of the tenant in DASHBOARD_TENANT (see
+src/tenants.py).
+
+    python warm_up_figures.py [--workers N]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+# the tabs import the app from this folder
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from tabs import expenditures_tab
+
+
+def main():
+    """Precomputes the figures of every tab with a dropdown list."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes, by default the number of cores')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    number = expenditures_tab.precompute_figures(workers=args.workers)
+    print('{} Lieferanten in {:.1f} s vorberechnet.'.format(
+        number, time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
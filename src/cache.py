@@ -0,0 +1,586 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module memoizes functions of the dashboard, e.g. the Dash callbacks.
+A result is stored under the arguments of the call and the version of the
+datasets (modification time and size of the storage files), so a new import
+invalidates the cached results. The results are kept in a bounded LRU cache in
+memory and optionally in a directory which can be shared by several processes.
+Concurrent calls with the same key wait for one computation and share its
+result (single-flight). Every tenant (see src/tenants.py) has its own
+partition of the caches, the results of all memoized functions of a tenant
+can be bounded by memory (MemoryBudget, TENANT_CACHE_MB in configuration.py).
+It includes the following classes and functions:
+    MemoryBudget
+    LRUCache
+    DiskCache
+    SingleFlight
+    dataset_version(*filenames)
+    tenant_budget(tenant)
+    memoize(*filenames, maxsize=128, disk_dir=None)
+    cache_stats()
+    budget_stats()
+
+"""
+
+# os func
+import os
+# hash func
+import hashlib
+# serialization
+import pickle
+# threading func
+import threading
+# counter for the last use of the entries
+import itertools
+# ordered dictionary for the lru cache
+from collections import OrderedDict
+# decorator func
+from functools import wraps
+
+from src.tenants import current_tenant, tenant_path
+
+from configuration import TENANT_CACHE_MB
+
+# the order of the uses of all entries, for the LRU order across caches
+_CLOCK = itertools.count()
+
+
+def dataset_version(*filenames):
+    """Returns the version of the datasets, which changes with every import.
+
+    Parameters
+    ----------
+    filenames : str
+        the names of the storage files.
+
+    Returns
+    -------
+    str:
+        built from the modification time and the size of the files.
+    """
+    stats = []
+    for f in filenames:
+        if os.path.exists(f):
+            stat = os.stat(f)
+            stats.append('{}:{}:{}'.format(f, stat.st_mtime_ns, stat.st_size))
+        else:
+            stats.append('{}:-'.format(f))
+
+    return hashlib.sha1('|'.join(stats).encode('utf-8')).hexdigest()[:16]
+
+
+class MemoryBudget:
+    """An upper bound for the memory of the entries of several LRU caches,
+    e.g. of all memoized functions of one tenant. Above the bound the least
+    recently used entries of all these caches are dropped, the newest entry
+    is always kept. Without a bound the sizes are not measured.
+
+    Attributes
+    ----------
+
+    maxbytes : int or None
+    bytes : int
+    evictions : int
+    _caches : list
+    _lock : threading.Lock
+
+    Methods
+    -------
+    sizeof(self, value)
+    register(self, cache)
+    add(self, nbytes)
+    discard(self, nbytes)
+    enforce(self, cache, key)
+
+    """
+
+    def __init__(self, maxbytes=None):
+        """Inits MemoryBudget with:
+
+        Parameters
+        ----------
+        maxbytes : int, optional
+            the bound in bytes, by default None (no bound)
+        """
+        self.maxbytes = maxbytes
+        self.bytes = 0
+        self.evictions = 0
+        self._caches = []
+        self._lock = threading.Lock()
+
+    def sizeof(self, value):
+        """Returns the size of a value in bytes (see memory.deep_size), 0
+        without a bound."""
+        if self.maxbytes is None:
+            return 0
+        from src.memory import deep_size
+
+        return deep_size(value)
+
+    def register(self, cache):
+        """Adds a cache whose entries count against the bound."""
+        with self._lock:
+            self._caches.append(cache)
+
+    def add(self, nbytes):
+        """Counts a new entry."""
+        with self._lock:
+            self.bytes += nbytes
+
+    def discard(self, nbytes):
+        """Counts a dropped entry."""
+        with self._lock:
+            self.bytes -= nbytes
+
+    def enforce(self, cache, key):
+        """Drops the least recently used entries of all caches until the
+        bound is kept, except the entry key of cache (the newest).
+        """
+        with self._lock:
+            while self.maxbytes is not None and self.bytes > self.maxbytes:
+                oldest = None
+                for c in self._caches:
+                    entry = c.oldest()
+                    if entry is None or (c is cache and entry[1] == key):
+                        continue
+                    if oldest is None or entry[0] < oldest[0]:
+                        oldest = (entry[0], c, entry[1])
+                if oldest is None:
+                    break
+                self.bytes -= oldest[1].pop(oldest[2])
+                self.evictions += 1
+
+
+class LRUCache:
+    """A bounded cache in memory which drops the least recently used entry.
+    With a MemoryBudget the entries also count against its bound.
+
+    Attributes
+    ----------
+
+    maxsize : int
+    budget : MemoryBudget or None
+    hits : int
+    misses : int
+    _data : OrderedDict
+    _sizes : dict
+    _stamps : dict
+    _lock : threading.Lock
+
+    Methods
+    -------
+    get(self, key, default=None, count=True)
+    set(self, key, value)
+    oldest(self)
+    pop(self, key)
+    clear(self)
+
+    """
+
+    def __init__(self, maxsize=128, budget=None):
+        """Inits LRUCache with:
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            the maximal number of entries, by default 128
+        budget : MemoryBudget, optional
+            the bound of the memory shared with other caches, by default None
+        """
+        self.maxsize = maxsize
+        self.budget = budget
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._sizes = {}
+        self._stamps = {}
+        self._lock = threading.Lock()
+        if budget is not None:
+            budget.register(self)
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None, count=True):
+        """Returns the value for the key and marks it as recently used. With
+        count=False the lookup is not counted as hit or miss (a repeated
+        lookup of the same call)."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self._stamps[key] = next(_CLOCK)
+                self.hits += count
+                return self._data[key]
+            self.misses += count
+            return default
+
+    def set(self, key, value):
+        """Stores the value and drops the oldest entries above maxsize (and
+        above the bound of the budget)."""
+        nbytes = self.budget.sizeof(value) if self.budget is not None else 0
+        with self._lock:
+            dropped = self._sizes.get(key, 0)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._sizes[key] = nbytes
+            self._stamps[key] = next(_CLOCK)
+            while len(self._data) > self.maxsize:
+                old, _ = self._data.popitem(last=False)
+                del self._stamps[old]
+                dropped += self._sizes.pop(old)
+        # the budget locks the caches, so it is called without the lock
+        if self.budget is not None:
+            self.budget.add(nbytes - dropped)
+            self.budget.enforce(self, key)
+
+    def oldest(self):
+        """Returns the last use and the key of the least recently used entry
+        (None if empty)."""
+        with self._lock:
+            if not self._data:
+                return None
+            key = next(iter(self._data))
+            return self._stamps[key], key
+
+    def pop(self, key):
+        """Removes an entry and returns its size in bytes (0 if missing)."""
+        with self._lock:
+            if key not in self._data:
+                return 0
+            del self._data[key]
+            del self._stamps[key]
+            return self._sizes.pop(key)
+
+    def clear(self):
+        """Removes all entries."""
+        with self._lock:
+            self._data.clear()
+            self._stamps.clear()
+            dropped = sum(self._sizes.values())
+            self._sizes.clear()
+        if self.budget is not None:
+            self.budget.discard(dropped)
+
+
+class DiskCache:
+    """A cache in a directory, one pickle file per entry. It can be shared by
+    several processes (e.g. workers of a server). The entries belong to a
+    namespace (e.g. a memoized function of a tenant) and a version of its
+    datasets, the first entry of a new version removes the entries of the
+    older versions of the namespace.
+
+    Attributes
+    ----------
+
+    directory : str
+    _pruned : dict
+    _lock : threading.Lock
+
+    Methods
+    -------
+    get(self, key, default=None, namespace='', version='')
+    set(self, key, value, namespace='', version='')
+    prune(self, namespace, version)
+
+    """
+
+    def __init__(self, directory):
+        """Inits DiskCache and creates the directory.
+
+        Parameters
+        ----------
+        directory : str
+            the path of the cache directory.
+        """
+        self.directory = directory
+        # the latest version per namespace, pruned by this process
+        self._pruned = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def _hash(text, length=None):
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()[:length]
+
+    def _path(self, key, namespace, version):
+        """Returns the path of an entry: namespace-version-key (hashed)."""
+        return os.path.join(self.directory, '{}-{}-{}.pkl'.format(
+            self._hash(namespace, 16), self._hash(version, 16), self._hash(key)))
+
+    def get(self, key, default=None, namespace='', version=''):
+        """Returns the value for the key or the default."""
+        try:
+            with open(self._path(key, namespace, version), 'rb') as f:
+                return pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return default
+
+    def set(self, key, value, namespace='', version=''):
+        """Stores the value, written to a temporary file and renamed, so other
+        processes never read half written files. Removes the entries of older
+        versions of the namespace (see prune)."""
+        self.prune(namespace, version)
+        path = self._path(key, namespace, version)
+        tmp = '{}.{}.{}'.format(path, os.getpid(), threading.get_ident())
+        with open(tmp, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def prune(self, namespace, version):
+        """Removes the entries of the namespace with another version. The
+        directory is scanned once per new version and process.
+
+        Parameters
+        ----------
+        namespace : str
+            e.g. the name of a memoized function and the tenant.
+        version : str
+            the current version of the datasets.
+
+        Returns
+        -------
+        int:
+            the number of removed entries.
+        """
+        with self._lock:
+            if self._pruned.get(namespace) == version:
+                return 0
+            self._pruned[namespace] = version
+
+        prefix = self._hash(namespace, 16) + '-'
+        current = prefix + self._hash(version, 16) + '-'
+        removed = 0
+        for filename in os.listdir(self.directory):
+            if filename.startswith(prefix) and not filename.startswith(current):
+                try:
+                    os.remove(os.path.join(self.directory, filename))
+                    removed += 1
+                except OSError:
+                    # removed by another process
+                    pass
+        return removed
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key: the first call computes
+    the result, the others wait for it and share the result (or the
+    exception). A call which arrives after the flight ended finds the stored
+    result by the lookup and does not start a new flight.
+
+    Attributes
+    ----------
+
+    computations : int
+    coalesced : int
+    _flights : dict
+    _lock : threading.Lock
+
+    Methods
+    -------
+    do(self, key, func, *args, lookup=None, **kwargs)
+
+    """
+
+    def __init__(self):
+        """Inits SingleFlight without running computations."""
+        self.computations = 0
+        self.coalesced = 0
+        self._flights = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._flights)
+
+    def do(self, key, func, *args, lookup=None, **kwargs):
+        """Returns func(*args, **kwargs), computed only once for concurrent
+        calls with the same key.
+
+        Parameters
+        ----------
+        key : str
+            identifies the computation.
+        func : function
+            the computation.
+        lookup : function, optional
+            returns the stored result or _MISSING, checked before a new flight
+            is started (the caller may have missed the result just before the
+            last flight stored it), by default None
+
+        Returns
+        -------
+        the result of the computation.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            value = _MISSING
+            if flight is None and lookup is not None:
+                value = lookup()
+            if value is not _MISSING:
+                self.coalesced += 1
+                return value
+            if flight is None:
+                flight = {'done': threading.Event(), 'value': None, 'error': None}
+                self._flights[key] = flight
+                leader = True
+                self.computations += 1
+            else:
+                leader = False
+                self.coalesced += 1
+
+        if not leader:
+            flight['done'].wait()
+            if flight['error'] is not None:
+                raise flight['error']
+            return flight['value']
+
+        try:
+            flight['value'] = func(*args, **kwargs)
+            return flight['value']
+        except BaseException as e:
+            flight['error'] = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight['done'].set()
+
+
+_MISSING = object()
+
+# the memoized functions by name, for the counters
+MEMOIZED = {}
+
+# the memory budgets by tenant (see tenant_budget)
+BUDGETS = {}
+_BUDGETS_LOCK = threading.Lock()
+
+
+def tenant_budget(tenant):
+    """Returns the memory budget of a tenant, shared by the partitions of all
+    memoized functions for this tenant (TENANT_CACHE_MB in configuration.py).
+
+    Parameters
+    ----------
+    tenant : str
+        the name of the tenant.
+
+    Returns
+    -------
+    MemoryBudget:
+        the budget of the tenant.
+    """
+    with _BUDGETS_LOCK:
+        if tenant not in BUDGETS:
+            BUDGETS[tenant] = MemoryBudget(
+                int(TENANT_CACHE_MB * 1024 ** 2) if TENANT_CACHE_MB else None)
+        return BUDGETS[tenant]
+
+
+def memoize(*filenames, maxsize=128, disk_dir=None):
+    """Returns a decorator which memoizes a function by its arguments, the
+    current tenant and the version of its datasets. Every tenant has its own
+    partition of maxsize results, bounded by the memory budget of the tenant
+    (see tenant_budget). Concurrent calls with the same key are computed
+    once (see SingleFlight). The decorated function has the attributes caches
+    (LRUCache by tenant) and flights (SingleFlight) with the counters and
+    filenames.
+
+    Parameters
+    ----------
+    filenames : str
+        the storage files the function depends on (paths of the process
+        tenant, see tenants.tenant_path).
+    maxsize : int, optional
+        the maximal number of results in memory per tenant, by default 128
+    disk_dir : str, optional
+        a directory for the shared on-disk cache, by default None (off)
+
+    Returns
+    -------
+    function:
+        the decorator.
+    """
+    def decorator(func):
+        caches = {}
+        caches_lock = threading.Lock()
+        disk = DiskCache(disk_dir) if disk_dir else None
+        flights = SingleFlight()
+        name = '{}.{}'.format(func.__module__, func.__qualname__)
+
+        def partition(tenant):
+            """Returns the cache in memory of the tenant."""
+            with caches_lock:
+                if tenant not in caches:
+                    caches[tenant] = LRUCache(maxsize, budget=tenant_budget(tenant))
+                return caches[tenant]
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            tenant = current_tenant()
+            version = dataset_version(*[tenant_path(f, tenant) for f in filenames])
+            key = '{}|{}|{}|{!r}|{!r}'.format(name, tenant, version,
+                                              args, sorted(kwargs.items()))
+            memory = partition(tenant)
+            value = memory.get(key, _MISSING)
+            if value is not _MISSING:
+                return value
+            return flights.do(key, compute, memory, key, '{}|{}'.format(name, tenant), version,
+                              args, kwargs, lookup=lambda: memory.get(key, _MISSING, count=False))
+
+        def compute(memory, key, namespace, version, args, kwargs):
+            value = _MISSING
+            if disk is not None:
+                value = disk.get(key, _MISSING, namespace, version)
+            if value is _MISSING:
+                value = func(*args, **kwargs)
+                if disk is not None:
+                    disk.set(key, value, namespace, version)
+            memory.set(key, value)
+            return value
+
+        wrapper.caches = caches
+        wrapper.flights = flights
+        wrapper.filenames = filenames
+        MEMOIZED[name] = wrapper
+        return wrapper
+
+    return decorator
+
+
+def cache_stats():
+    """Returns the counters of all memoized functions.
+
+    Returns
+    -------
+    dict:
+        with the hits and misses of the caches in memory (all tenants), the
+        computations and the coalesced (saved) computations per function name.
+    """
+    stats = {}
+    for name, f in MEMOIZED.items():
+        caches = list(f.caches.values())
+        stats[name] = {'hits': sum(c.hits for c in caches),
+                       'misses': sum(c.misses for c in caches),
+                       'size': sum(len(c) for c in caches),
+                       'computations': f.flights.computations,
+                       'coalesced': f.flights.coalesced}
+    return stats
+
+
+def budget_stats():
+    """Returns the memory of the memoized results per tenant.
+
+    Returns
+    -------
+    dict:
+        with the bytes (measured only with a bound), the bound and the
+        dropped results per tenant.
+    """
+    with _BUDGETS_LOCK:
+        budgets = list(BUDGETS.items())
+    return {tenant: {'bytes': b.bytes, 'maxbytes': b.maxbytes, 'evictions': b.evictions}
+            for tenant, b in budgets}
+
+
+if __name__ == '__main__':
+    pass
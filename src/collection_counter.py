@@ -0,0 +1,259 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module maintains running counters for the growth of the collection.
+The counters are stored next to the storage file of the new acquisitions and
+are only updated with the data of each import (delta), so the figures about
+the collection growth read a few hundred precomputed values instead of the
+whole acquisition history. Like the index of the distinct values they record
+the version of the storage file and are rebuilt if it was changed without
+them. It includes the following class:
+    CollectionCounter
+
+"""
+
+# os func
+import os
+# json func
+import json
+# pandas func
+import pandas as pd
+
+from src.cache import dataset_version
+from src.utils import sidecar_path
+
+
+class CollectionCounter:
+    """Counts the copies of the new acquisitions per date and per class. Like
+    in the class Collection of data_prep only the first row of a shelfmark is
+    counted, except for the shelfmarks '/' and 'Signatur'. Therefore the known
+    shelfmarks are stored with the counters.
+
+    Attributes
+    ----------
+
+    storage_file_path : str
+    counter_file_path : str
+    col_name_date : str
+    col_name_shelfmark : str
+    col_name_copy : str
+    col_name_class : str
+    _counts : dataframe
+    _shelfmarks : set
+
+    Class Attributes
+    ----------------
+    multiple_shelfmarks : tuple
+
+    Methods
+    -------
+    load(self)
+    rebuild(self)
+    update(self, df)
+    save(self)
+    total_collection_years(self, col_name_cum_sum='Gesamt')
+    development_cumsum(self, col_name_year='Jahr', col_name_month='Monat', col_name_cum='cum_s')
+    development_collection_top_class_years(self, number=10)
+
+    """
+    # shelfmarks which are counted every time
+    multiple_shelfmarks = ('/', 'Signatur')
+
+    def __init__(self, storage_file_path, col_name_date='Datum', col_name_shelfmark='Signatur',
+                 col_name_copy='Ex', col_name_class='Systematikgruppe'):
+        """Inits CollectionCounter and loads the counters. If there are no
+        counters yet or they are outdated, they will be built from the storage
+        file.
+
+        Parameters
+        ----------
+        storage_file_path : str
+            the path of the storage file of the new acquisitions.
+        col_name_date : str, optional
+            the name of the date column, by default 'Datum'
+        col_name_shelfmark : str, optional
+            the name of the shelfmark column, by default 'Signatur'
+        col_name_copy : str, optional
+            the name of the copy (item) column, by default 'Ex'
+        col_name_class : str, optional
+            the name of the classification column, by default 'Systematikgruppe'
+        """
+        self.storage_file_path = storage_file_path
+        self.counter_file_path = sidecar_path(storage_file_path, 'counter', ext='.json')
+        self.col_name_date = col_name_date
+        self.col_name_shelfmark = col_name_shelfmark
+        self.col_name_copy = col_name_copy
+        self.col_name_class = col_name_class
+        # typed, the copies stay numeric after the first update
+        self._counts = pd.DataFrame({col_name_date: pd.Series(dtype=object),
+                                     col_name_class: pd.Series(dtype=object),
+                                     col_name_copy: pd.Series(dtype=float)})
+        self._shelfmarks = set()
+        self.load()
+
+    def load(self):
+        """Loads the counters and the known shelfmarks. Builds them from the
+        storage file if they do not exist or are outdated (e.g. the storage file
+        was corrected by hand or an import stopped before saving the counters).
+
+        Returns
+        -------
+        dataframe:
+            with the copies per date and class.
+        """
+        content = None
+        if os.path.exists(self.counter_file_path):
+            with open(self.counter_file_path, encoding='utf-8') as f:
+                content = json.load(f)
+
+        if (content is not None
+                and content['version'] == dataset_version(self.storage_file_path)):
+            columns = [self.col_name_date, self.col_name_class, self.col_name_copy]
+            self._counts = pd.DataFrame(content['counts'], columns=columns)
+            self._counts[self.col_name_copy] = self._counts[self.col_name_copy].astype(float)
+            self._shelfmarks = set(content['shelfmarks'])
+        elif os.path.exists(self.storage_file_path):
+            self.rebuild()
+            self.save()
+
+        return self._counts
+
+    def rebuild(self):
+        """Builds the counters from the whole storage file.
+
+        Returns
+        -------
+        dataframe:
+            with the copies per date and class.
+        """
+        self._counts = self._counts.iloc[0:0]
+        self._shelfmarks = set()
+
+        return self.update(pd.read_csv(self.storage_file_path))
+
+    def update(self, df):
+        """Adds the copies of newly imported rows to the counters.
+
+        Parameters
+        ----------
+        df : dataframe
+            the rows of one import (delta).
+
+        Returns
+        -------
+        dataframe:
+            with the copies per date and class.
+        """
+        shelfmark = df[self.col_name_shelfmark].fillna('').astype(str)
+        multiple = shelfmark.isin(self.multiple_shelfmarks)
+        # first row of a shelfmark which is not already known
+        first = ~shelfmark.duplicated() & ~shelfmark.isin(self._shelfmarks)
+        df = df.loc[(multiple | first).to_numpy()]
+        self._shelfmarks.update(shelfmark[first & ~multiple])
+
+        delta = pd.DataFrame({
+            self.col_name_date: pd.to_datetime(
+                df[self.col_name_date]).dt.strftime('%Y-%m-%d'),
+            self.col_name_class: df[self.col_name_class].fillna('').astype(str),
+            self.col_name_copy: pd.to_numeric(df[self.col_name_copy]).fillna(0),
+        })
+        self._counts = pd.concat([self._counts, delta]).groupby(
+            [self.col_name_date, self.col_name_class])[self.col_name_copy].sum().reset_index()
+
+        return self._counts
+
+    def save(self):
+        """Saves the counters and the known shelfmarks with the current version
+        of the storage file.
+        """
+        tmp = '{}.{}'.format(self.counter_file_path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': dataset_version(self.storage_file_path),
+                       'counts': {col: self._counts[col].tolist() for col in self._counts},
+                       'shelfmarks': sorted(self._shelfmarks)},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self.counter_file_path)
+
+    def _copies_by_date(self):
+        """Returns a series with the copies indexed by date (datetime)."""
+        copies = self._counts.groupby(self.col_name_date)[self.col_name_copy].sum()
+        copies.index = pd.to_datetime(copies.index)
+
+        return copies
+
+    def total_collection_years(self, col_name_cum_sum='Gesamt'):
+        """Returns a pandas dataframe with the collection numbers indexed by year
+        and a column with cumulated sum collection numbers by year, like
+        Collection.total_collection_years.
+
+        Parameters
+        ----------
+        col_name_cum_sum : str, optional
+            the name of the cumulated sum column, by default 'Gesamt'
+
+        Returns
+        -------
+        dataframe:
+            with the collection numbers indexed by year.
+        """
+        copies = self._copies_by_date()
+        df = copies.groupby(copies.index.year).sum().to_frame()
+        df.index.name = self.col_name_date
+        df[col_name_cum_sum] = df[self.col_name_copy].cumsum()
+
+        return df
+
+    def development_cumsum(self, col_name_year='Jahr', col_name_month='Monat', col_name_cum='cum_s'):
+        """Returns a pandas dataframe with the copies indexed by date and the
+        cumulated sum per year, like Collection.development_cumsum.
+
+        Parameters
+        ----------
+        col_name_year : str, optional
+            the name of the new created year column, by default 'Jahr'
+        col_name_month : str, optional
+            the name of the new created month column, by default 'Monat'
+        col_name_cum : str, optional
+            the name of the new created cum_sum column, by default 'cum_s'
+
+        Returns
+        -------
+        dataframe:
+            with the cumulated summation of the copies by year.
+        """
+        df = self._copies_by_date().to_frame()
+        df.index.name = self.col_name_date
+        df[col_name_year] = df.index.year
+        df[col_name_month] = df.index.month
+        df[col_name_cum] = df[self.col_name_copy].groupby(
+            df[col_name_year]).cumsum()
+
+        return df
+
+    def development_collection_top_class_years(self, number=10):
+        """Returns a pandas dataframe with the top values of the classes by year,
+        like Collection.development_collection_top_class_years.
+
+        Parameters
+        ----------
+        number : int, optional
+            the number of the top classes per year, by default 10
+
+        Returns
+        -------
+        dataframe:
+            with the top values of the classes by year.
+        """
+        # rows without class are not part of the ranking
+        df = self._counts[self._counts[self.col_name_class] != '']
+        year = pd.to_datetime(df[self.col_name_date]).dt.year.rename(
+            self.col_name_date)
+        df = df.groupby([year, self.col_name_class])[
+            self.col_name_copy].sum().reset_index()
+        df = df.sort_values([self.col_name_copy, self.col_name_class],
+                            ascending=False).groupby(self.col_name_date).head(number)
+
+        return df
+
+
+if __name__ == '__main__':
+    pass
@@ -8,6 +8,8 @@ It includes the following classes:
     SaveDfToCSV
     CleanPreProcDf
 
+The public methods of CleanPreProcDf can be profiled per import (see
+src/profiling.py).
 """
 # os func
 import os
@@ -17,6 +19,8 @@ import re
 import pandas as pd
 
 from src.utils import read_csv_file_in_dict, date_from_filename
+# opt-in profiling hooks
+from src.profiling import profile_methods
 
 
 class FilenameValidation:
@@ -43,6 +47,7 @@ class FilenameValidation:
     -------
     check_dir(self)
     check_files_exist(self)
+    file_list(self)
     filename_format_corr(self)
 
 
@@ -117,15 +122,27 @@ class FilenameValidation:
         if not os.listdir(self.dir_name):
             raise FileNotFoundError('There are any file(s) to import.')
 
-        # if not returning a list with filenames
-        self._file_list = [f for f in os.listdir(
-            self.dir_name) if os.path.isfile(os.path.join(self.dir_name, f))]
+        # if not returning a list with filenames, sorted by name (the date in
+        # the filename), so the rows are imported in the same order everywhere
+        self._file_list = sorted(f for f in os.listdir(
+            self.dir_name) if os.path.isfile(os.path.join(self.dir_name, f)))
 
         print('The directory {0} contains {1} files: {2}'.format(
             self.dir_name, len(self._file_list), self._file_list))
 
         return self._file_list
 
+    def file_list(self):
+        """Returns the names of all files in the directory (found by
+        check_files_exist).
+
+        Returns
+        -------
+        list:
+            with all filenames in the directory.
+        """
+        return list(self._file_list)
+
     def filename_format_corr(self):
         """Checks if the formats of the files are correct depending on a list
         with extensions and on a regex expression.
@@ -342,6 +359,7 @@ class SaveDfToCSV:
         return self.df.to_csv(self.storage_file_path, mode=mode, index=index, encoding=encoding)
 
 
+@profile_methods(frame_attr='df')
 class CleanPreProcDf:
     """Basic cleaning and preprocessing the dataframe before importing to csv.
     attributes and methods. Can also extract Information from columns into new
@@ -5,18 +5,30 @@ includes subclasses of the class DataPreparation, e.g. Expenditures, Collection,
 ReadingRoom and LoanColl which are tailored to specific problems in
 context of library expenditures (budgets, sales), collection,
 readingroom use and loan. They all present the basic layer for the latter data
-visualization with Plotly and Dash."""
+visualization with Plotly and Dash. Their public methods can be profiled at
+runtime (see src/profiling.py)."""
 
 # os func
 import os
 # datetime func
 import datetime
+# numpy func
+import numpy as np
 # pandas func
 import pandas as pd
 # some utils func
-from src.utils import read_csv_file_in_dict, get_dates_list
-
-
+from src.utils import read_csv_file_in_dict, get_dates_list, bucket_top_values
+# partitioned aggregation in worker processes
+from src.parallel import partitioned_groupby_sum
+# load times of the datasets for /metrics
+from src.metrics import DATASET_LOAD_SECONDS
+# opt-in profiling hooks
+from src.profiling import profile_methods
+# memory accounting of the instances
+from src.memory import track_instance
+
+
+@profile_methods()
 class DataPreparation:
     """This class contains generic method for the preprocessing and preparation
     of data which will be shown in the dashboard. These methods will be applied
@@ -28,12 +40,12 @@ class DataPreparation:
     ----------
 
     filename : str
+    parallel : bool
     _df : dataframe
     _match : str
     _change_row_val : dictionary
     _years : list
     _date_max : Pandas Timestamp Object
-    _not_top_number_val : Pandas Series
 
     Methods
     -------
@@ -41,11 +53,14 @@ class DataPreparation:
     change_col_val(self, file, col_name, col_headers=None)
     set_str_to_datetime(self, col_name)
     get_specific_dates_dataframe(self, col_name_date)
+    top_number_values(self, col_name_sum, col_name_sort, new_value='Sonstige',
+        number=9, col_name_group=None)
+    groupby_sum(self, by, partition, value_cols=None)
 
 
    """
 
-    def __init__(self, filename):
+    def __init__(self, filename, parallel=False):
         """Inits Datapreparation with some private attributes which will be
         needed in other methods. Calls the method create_dataframe which will
         load dataframe.
@@ -54,23 +69,27 @@ class DataPreparation:
         ----------
         filename : str
              the name of the file.
+        parallel : bool, optional
+             aggregate large frames in the worker processes of
+             src/parallel.py (see start_pool), by default False
 
         Attributes
         ----------
         filename : str
+        parallel : bool
         _df : dataframe
         _change_row_val : dictionary
         _years : list
         _date_max : Pandas Timestamp Object
-        _not_top_number_val : Pandas Series
 
         """
         self.filename = filename
+        self.parallel = parallel
+        track_instance(self)
         self._df = self.create_dataframe(self.filename)
         self._change_row_val = {}
         self._years = []
         self._date_max = None
-        self._not_top_number_val = None
 
     def create_dataframe(self, filename, encoding='utf-8'):
         """Returns the loaded dataframe.
@@ -96,14 +115,16 @@ class DataPreparation:
         if not os.path.exists(filename):
             raise FileNotFoundError('File does not exists.')
 
-        self._df = pd.read_csv(filename, encoding=encoding)
+        with DATASET_LOAD_SECONDS.time(os.path.basename(filename)):
+            self._df = pd.read_csv(filename, encoding=encoding)
 
         return self._df
 
-    def top_number_values(self, col_name_sum, col_name_sort, new_value='Sonstige', number=9):
-        """Returns a pandas Dataframe with the top number values grouped and sum by
-        a column, sorted by a another column. It also replaces the other not top
-        ten values with unique value.
+    def top_number_values(self, col_name_sum, col_name_sort, new_value='Sonstige', number=9, col_name_group=None):
+        """Returns a pandas Dataframe in which the values of a column which are
+        not among the top number values are replaced by a new value. The values
+        are ranked by the sum of another column, either overall or per group
+        (e.g. per year). Only the ranked column is changed.
 
         Parameters
         ----------
@@ -115,18 +136,65 @@ class DataPreparation:
             name of the new value for the not top ten values, by default 'Sonstige'
         number : int, optional
             filter the top values by that number, by default 9
+        col_name_group : str, optional
+            the name of the column (or index) by which the top values are
+            determined per group, by default None (overall)
 
         Returns
         -------
         dataframe:
            with top number values
         """
-        self._not_top_number_val = self._df.groupby(col_name_sum).sum().sort_values(
-            col_name_sort, ascending=False).index[number:]
-        self._df = self._df.replace(self._not_top_number_val, new_value)
+        groups = None
+        if col_name_group is not None:
+            if col_name_group in self._df.columns:
+                groups = self._df[col_name_group]
+            else:
+                groups = self._df.index.get_level_values(col_name_group)
+
+        # the frame is often a filtered one, its column is replaced on purpose
+        with pd.option_context('mode.chained_assignment', None):
+            self._df[col_name_sum] = bucket_top_values(self._df[col_name_sum],
+                                                       self._df[col_name_sort],
+                                                       new_value=new_value,
+                                                       number=number,
+                                                       groups=groups)
 
         return self._df
 
+    def groupby_sum(self, by, partition, value_cols=None):
+        """Returns the sum of columns grouped by keys, like
+        groupby(by)[value_cols].sum(). If the parallel mode is switched on,
+        large frames are split by the partition key (e.g. the year) and summed
+        in the worker processes of the pool (if it is started).
+
+        Parameters
+        ----------
+        by : str, array or list
+            the group keys, column names or arrays (e.g. the index).
+        partition : array
+            the partition key for every row, e.g. the year.
+        value_cols : str or list, optional
+            the column(s) to sum, by default None (all numeric columns)
+
+        Returns
+        -------
+        dataframe or series:
+            with the sums indexed by the group keys.
+        """
+        if not self.parallel:
+            if value_cols is None:
+                return self._df.groupby(by).sum()
+            return self._df.groupby(by)[value_cols].sum()
+
+        if value_cols is None:
+            keys = [key for key in (by if isinstance(by, list) else [by])
+                    if isinstance(key, str)]
+            value_cols = [col for col in self._df.select_dtypes('number').columns
+                          if col not in keys]
+
+        return partitioned_groupby_sum(self._df, by, value_cols, partition)
+
     def change_col_val(self, file, col_name, col_headers=None):
         """Replaces values in a column with values from a dictionary which will
         be load from a csv file.
@@ -188,6 +256,7 @@ class DataPreparation:
         return self._df
 
 
+@profile_methods()
 class Expenditures(DataPreparation):
     """This class is tailored for the expenditure data of the library. It is a
     child class which inherits attributes and methods from its parent class
@@ -384,8 +453,10 @@ class Expenditures(DataPreparation):
             the name of the expenditures column
         col_name_expnd_diff : str
             the name of the new column for the monthly difference.
-        body : str, optional
-            the actual retailler/ cost centre, by default 'Antiquariat'
+        body : str or None, optional
+            the actual retailler/ cost centre, by default 'Antiquariat'. None
+            keeps all retaillers / cost centres, the difference is calculated
+            for each of them.
 
         Returns
         -------
@@ -397,13 +468,18 @@ class Expenditures(DataPreparation):
         # extracting current year from dataframe
         self._df = self._df[self._df[col_name_date].str.contains(
             str(self._curr_year))]
-        # sorting date values
-        self._df = self._df.sort_values(by=col_name_date)
-        # filtering data from one body
-        self._df = self._df[self._df[col_name_body] == body]
-        # determine the difference, overwrite nan value for the first month
-        self._df[col_name_expnd_diff] = self._df[col_name_expnd].diff().fillna(
-            self._df[col_name_expnd])
+        # sorting date values, the rows of a date keep their order (stable)
+        self._df = self._df.sort_values(by=col_name_date, kind='mergesort')
+        if body is not None:
+            # filtering data from one body
+            self._df = self._df[self._df[col_name_body] == body]
+            # determine the difference, overwrite nan value for the first month
+            self._df[col_name_expnd_diff] = self._df[col_name_expnd].diff().fillna(
+                self._df[col_name_expnd])
+        else:
+            # the difference for every body
+            self._df[col_name_expnd_diff] = self._df.groupby(col_name_body)[
+                col_name_expnd].diff().fillna(self._df[col_name_expnd])
         return self._df
 
     def total_expnd_by_bodies_above_value(self, col_name_date, col_name_body, col_name_expnd, number=7):
@@ -439,6 +515,7 @@ class Expenditures(DataPreparation):
         return self._df
 
 
+@profile_methods()
 class Collection(DataPreparation):
     """This class  is tailored for the development in collection. It is a
     child class which inherits attributes and methods from its parent class
@@ -472,7 +549,7 @@ class Collection(DataPreparation):
         Parent class
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, parallel=False):
         """Inits the child class Collection with methods inherited from the base class
         DataPreparation.
 
@@ -480,9 +557,11 @@ class Collection(DataPreparation):
         ----------
         filename : str
             the name of the file.
+        parallel : bool, optional
+            aggregate large frames in worker processes, by default False
         """
         self.filename = filename
-        super().__init__(filename)
+        super().__init__(filename, parallel=parallel)
         self._media_types = {}
         self._curr_year = None
 
@@ -507,7 +586,7 @@ class Collection(DataPreparation):
         self._df = self._df.set_index(col_name_date)
         self._df = self._df.loc[((self._df[col_name_shelfmark] == '/') | (
             self._df[col_name_shelfmark] == 'Signatur')) | ~self._df[col_name_shelfmark].duplicated()]
-        self._df = self._df.groupby(self._df.index.year).sum()
+        self._df = self.groupby_sum(self._df.index.year, self._df.index.year)
         self._df[col_name_cum_sum] = self._df.cumsum()
 
         return self._df
@@ -571,8 +650,8 @@ class Collection(DataPreparation):
             self._df[col_name_shelfmark] == 'Signatur')) | ~self._df[col_name_shelfmark].duplicated()]
         self._df[col_name_date] = pd.to_datetime(self._df[col_name_date])
         self._df = self._df.set_index(col_name_date)
-        self._df = self._df.groupby([self._df.index.year, col_name_media_type])[
-            col_name_copy].sum().reset_index()
+        self._df = self.groupby_sum([self._df.index.year, col_name_media_type],
+                                    self._df.index.year, col_name_copy).reset_index()
 
         return self._df
 
@@ -634,8 +713,8 @@ class Collection(DataPreparation):
         # setting col_name to index
         self._df = self._df.set_index(col_name_date)
         # summation of the copies grouped by date index and resetting index
-        self._df = self._df.groupby(self._df.index)[
-            col_name_copy].sum().reset_index()
+        self._df = self.groupby_sum(self._df.index, self._df.index.year,
+                                    col_name_copy).reset_index()
         # setting col_name to index
         self._df = self._df.set_index(col_name_date)
         # creating new column year from index
@@ -672,8 +751,8 @@ class Collection(DataPreparation):
         # drop all the duplicates in shelfmark except two parameters -> REFACTOR
         self._df = self._df.loc[((self._df[col_name_shelfmark] == '/') | (
             self._df[col_name_shelfmark] == 'Signatur')) | ~self._df[col_name_shelfmark].duplicated()]
-        self._df = self._df.groupby([self._df.index.year, col_name_class])[
-            col_name_copy].sum().reset_index()
+        self._df = self.groupby_sum([self._df.index.year, col_name_class],
+                                    self._df.index.year, col_name_copy).reset_index()
         self._df = self._df.sort_values(
             [col_name_copy, col_name_class], ascending=False).groupby(col_name_date).head(10)
 
@@ -708,12 +787,13 @@ class Collection(DataPreparation):
             self._df[col_name_shelfmark] == 'Signatur')) | ~self._df[col_name_shelfmark].duplicated()]
         self._df = self.top_number_values(
             col_name_sum=col_name_class, col_name_sort=col_name_copy, number=number)
-        self._df = self._df.groupby(col_name_class)[
-            col_name_copy].sum().reset_index()
+        self._df = self.groupby_sum(col_name_class, self._df.index.year,
+                                    col_name_copy).reset_index()
 
         return self._df
 
 
+@profile_methods()
 class ReadingRoom(DataPreparation):
     """This class is tailored for the use of the Reading room data. It is a
     child class which inherits attributes and methods from its parent class
@@ -779,8 +859,9 @@ class ReadingRoom(DataPreparation):
             name of the date column.
         col_name_month : str
             name of the month column.
-        year : int, optional
-            the year by the frame filtered, by default 2017
+        year : int or None, optional
+            the year by the frame filtered, by default 2017. None keeps all
+            years.
 
         Returns
         -------
@@ -793,7 +874,8 @@ class ReadingRoom(DataPreparation):
         # setting the date column to datetime
         self._df[col_name_date] = pd.to_datetime(self._df[col_name_date])
         # filtering the dataframe by year
-        self._df = self._df[self._df[col_name_date].dt.year == year]
+        if year is not None:
+            self._df = self._df[self._df[col_name_date].dt.year == year]
         # seting the date column to index
         self._df = self._df.set_index(col_name_date)
         # groupbing by the index month
@@ -805,6 +887,7 @@ class ReadingRoom(DataPreparation):
         return self._df
 
 
+@profile_methods()
 class LoanColl(DataPreparation):
     """This class is tailored for the use of the loan data. It is a
     child class which inherits attributes and methods from its parent class
@@ -818,8 +901,11 @@ class LoanColl(DataPreparation):
 
     Methods
     -------
-    total_loans(self, col_name_year, col_name_loan)
-    use_by_months(self, col_name_year, col_name_date, col_name_month, year=2017)
+    total_loans(self, col_name_year, col_name_loan, col_name_class,
+        new_value='Sonstige', number=9, per_year=False)
+    top_loans_by_title(self, col_name_year, col_name_loan, number=5, keep='first')
+    library_loan_class(self, col_name_year, col_name_class, exclude_value,
+        col_name_loan, new_value='Sonstige', number=9)
 
 
     Parameters
@@ -828,7 +914,7 @@ class LoanColl(DataPreparation):
         Parent class
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, parallel=False):
         """Inits the child class LoanColl with methods inherited from the base class
         DataPreparation.
 
@@ -836,12 +922,14 @@ class LoanColl(DataPreparation):
         ----------
         filename : str
             the name of the file which will be loaded to the dataframe.
+        parallel : bool, optional
+            aggregate large frames in worker processes, by default False
         """
 
         self.filename = filename
-        super().__init__(filename)
+        super().__init__(filename, parallel=parallel)
 
-    def total_loans(self, col_name_year, col_name_loan, col_name_class, new_value='Sonstige', number=9):
+    def total_loans(self, col_name_year, col_name_loan, col_name_class, new_value='Sonstige', number=9, per_year=False):
         """Returns a pandas dataframe with all the titles indexed by years.
 
         Parameters
@@ -852,6 +940,8 @@ class LoanColl(DataPreparation):
             the name of the loan column.         
         number : int, optional
             number of the top value, by default 9
+        per_year : bool, optional
+            determine the top values for every year instead of overall, by default False
 
         Returns
         -------
@@ -862,20 +952,22 @@ class LoanColl(DataPreparation):
             self._df[col_name_year], format='%Y').dt.year
 
         self._df = self.top_number_values(
-            col_name_sum=col_name_class, col_name_sort=col_name_loan, new_value=new_value, number=number)
+            col_name_sum=col_name_class, col_name_sort=col_name_loan, new_value=new_value,
+            number=number, col_name_group=col_name_year if per_year else None)
 
         self._df = self._df.set_index(col_name_year)
 
-        self._df = self._df.groupby(
-            [self._df.index, col_name_class]).sum().reset_index()
+        self._df = self.groupby_sum(
+            [self._df.index, col_name_class], self._df.index).reset_index()
 
         self._df = self._df.set_index(col_name_year)
 
         return self._df
 
-    def top_loans_by_title(self, col_name_year, col_name_loan, number=5):
+    def top_loans_by_title(self, col_name_year, col_name_loan, number=5, keep='first'):
         """Returns a pandas dataframe with the top number of loans multi indexed
-        (years).
+        (years). The loans are sorted once and the rows are counted per year,
+        instead of calling nlargest for every year.
 
         Parameters
         ----------
@@ -885,16 +977,38 @@ class LoanColl(DataPreparation):
             the name of the loan column.
         number : int, optional
             number of how many rows should be shown, by default 5
+        keep : str, optional
+            'first' keeps exactly number rows per year (like nlargest),
+            'all' also keeps the titles which are tied with the last one, by default 'first'
 
         Returns
         -------
         dataframe:
             with the top number of loans over the years by year.
         """
+        # rows without loans or year are never part of the top values
+        self._df = self._df[self._df[col_name_loan].notna()
+                            & self._df[col_name_year].notna()]
+
+        if keep == 'all':
+            # rank of the loans per year, ties share the best rank
+            rank = self._df.groupby(col_name_year)[col_name_loan].rank(
+                method='min', ascending=False)
+            self._df = self._df[(rank <= number).to_numpy()]
+        else:
+            # one stable sort over the loans (descending), ties keep their order
+            order = np.argsort(-self._df[col_name_loan].to_numpy(), kind='mergesort')
+            years = self._df[col_name_year].to_numpy()[order]
+            # position of every row within its year
+            position = pd.Series(years).groupby(years).cumcount().to_numpy()
+            self._df = self._df.iloc[np.sort(order[position < number])]
+
+        # only the top rows are left, sort them by year and loans
+        self._df = self._df.sort_values(
+            [col_name_year, col_name_loan], ascending=[True, False], kind='mergesort')
         # returns a dataframe multi indexed by year
-        # group the largest number of loans by the year
-        self._df = self._df.groupby([self._df[col_name_year]]).apply(
-            lambda x: x.nlargest(number, col_name_loan))
+        self._df.index = pd.MultiIndex.from_arrays(
+            [self._df[col_name_year], self._df.index], names=[col_name_year, None])
 
         return self._df
 
@@ -926,8 +1040,8 @@ class LoanColl(DataPreparation):
         self._df = self._df[self._df[col_name_class] != exclude_value]
         self._df = self.top_number_values(
             col_name_sum=col_name_class, col_name_sort=col_name_loan, new_value=new_value, number=number)
-        self._df = self._df.groupby(col_name_class)[
-            col_name_loan].sum().reset_index()
+        self._df = self.groupby_sum(col_name_class, self._df.index,
+                                    col_name_loan).reset_index()
 
         return self._df
 
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module maintains an index of the distinct values of the dimension
+columns of a dataset (e.g. supplier, cost centre, year, RVK group). The index
+is stored next to the storage file and updated with the data of each import
+(delta), so the option lists of the dropdowns are read from a small file
+instead of the whole dataset. It includes the following class:
+    DistinctValues
+
+"""
+
+# os func
+import os
+# json func
+import json
+# pandas func
+import pandas as pd
+
+from src.cache import dataset_version
+from src.utils import sidecar_path
+
+
+class DistinctValues:
+    """The sorted distinct values of some columns of a storage file. The index
+    records the version of the storage file (see cache.dataset_version). If the
+    storage file was changed without updating the index, it is rebuilt.
+
+    Attributes
+    ----------
+
+    storage_file_path : str
+    index_file_path : str
+    columns : list
+    _values : dict
+
+    Methods
+    -------
+    load(self)
+    rebuild(self)
+    update(self, df)
+    save(self)
+    values(self, column)
+
+    """
+
+    def __init__(self, storage_file_path, columns):
+        """Inits DistinctValues and loads the index. If there is no index yet or
+        it is outdated, it will be built from the storage file.
+
+        Parameters
+        ----------
+        storage_file_path : str
+            the path of the storage file.
+        columns : list
+            the names of the dimension columns.
+        """
+        self.storage_file_path = storage_file_path
+        self.index_file_path = sidecar_path(storage_file_path, 'distinct', ext='.json')
+        self.columns = list(columns)
+        self._values = {col: [] for col in self.columns}
+        self.load()
+
+    def load(self):
+        """Loads the index. Builds it from the storage file if it does not
+        exist, is outdated or misses a column.
+
+        Returns
+        -------
+        dict:
+            with the sorted distinct values per column.
+        """
+        content = None
+        if os.path.exists(self.index_file_path):
+            with open(self.index_file_path, encoding='utf-8') as f:
+                content = json.load(f)
+
+        if (content is not None
+                and content['version'] == dataset_version(self.storage_file_path)
+                and all(col in content['values'] for col in self.columns)):
+            self._values = {col: content['values'][col] for col in self.columns}
+        elif os.path.exists(self.storage_file_path):
+            self.rebuild()
+            self.save()
+
+        return self._values
+
+    def rebuild(self):
+        """Builds the index from the columns of the whole storage file.
+
+        Returns
+        -------
+        dict:
+            with the sorted distinct values per column.
+        """
+        self._values = {col: [] for col in self.columns}
+
+        return self.update(pd.read_csv(self.storage_file_path, usecols=self.columns))
+
+    def update(self, df):
+        """Adds the values of newly imported rows to the index.
+
+        Parameters
+        ----------
+        df : dataframe
+            the rows of one import (delta).
+
+        Returns
+        -------
+        dict:
+            with the sorted distinct values per column.
+        """
+        for col in self.columns:
+            new = pd.Series(df[col].dropna().unique()).tolist()
+            self._values[col] = sorted(set(self._values[col]).union(new))
+
+        return self._values
+
+    def save(self):
+        """Saves the index with the current version of the storage file.
+        """
+        tmp = '{}.{}'.format(self.index_file_path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': dataset_version(self.storage_file_path),
+                       'values': self._values}, f, ensure_ascii=False)
+        os.replace(tmp, self.index_file_path)
+
+    def values(self, column):
+        """Returns the sorted distinct values of a column.
+
+        Parameters
+        ----------
+        column : str
+            the name of the dimension column.
+
+        Returns
+        -------
+        list:
+            with the sorted distinct values.
+        """
+        return self._values[column]
+
+
+if __name__ == '__main__':
+    pass
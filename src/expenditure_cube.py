@@ -0,0 +1,545 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module maintains a pre-aggregated cube of the expenditure data (umsatz
+or budget) with the dimensions date (year, month) and body (supplier or cost
+centre). The cube is stored next to the storage file and updated with the
+data of each import (delta). Besides the total per date and body it holds the
+monthly difference of the accumulated values and marks the year-end dates, so
+the cards and figures of the expenditures tab are slices of a few hundred
+precomputed rows instead of filters over the whole history. For arbitrary date
+ranges (e.g. the last 18 months, a fiscal year) the monthly values are kept on
+a sorted time axis with their prefix sums: a range is found by binary search
+and its sum is the difference of two rows. It includes the following class:
+    ExpenditureCube
+
+"""
+
+# os func
+import os
+# json func
+import json
+# datetime func
+import datetime
+# numpy func
+import numpy as np
+# pandas func
+import pandas as pd
+
+from src.cache import dataset_version
+from src.utils import get_dates_list, sidecar_path, bucket_top_values
+
+
+class ExpenditureCube:
+    """The expenditures summed per date and body, with the same results as the
+    methods of the class Expenditures of data_prep. The values are accumulated
+    per year in the storage files, therefore the year-end dates (and the
+    latest date) give the yearly numbers and the difference to the previous
+    month gives the monthly numbers. The slices per body are prepared when the
+    cube is loaded, a query is a lookup and does not depend on the number of
+    rows. The returned frames are shared and must not be changed.
+
+    Attributes
+    ----------
+
+    storage_file_path : str
+    cube_file_path : str
+    col_name_date : str
+    col_name_body : str
+    col_name_expnd : str
+    col_name_expnd_diff : str
+    _cube : dataframe
+    _years : dataframe
+    _months : dataframe
+    _years_by_body : dict
+    _months_by_body : dict
+    _mean_by_body : dict
+    _current_year_by_body : dict
+    _total : float
+    _current_year : float
+    _axis : ndarray
+    _axis_bodies : ndarray
+    _axis_pos : dict
+    _axis_values : ndarray
+    _prefix : ndarray
+
+    Class Attributes
+    ----------------
+    col_name_year : str
+    col_name_month : str
+    col_name_rows : str
+    col_name_diff : str
+    col_name_year_end : str
+
+    Methods
+    -------
+    load(self)
+    rebuild(self)
+    update(self, df)
+    save(self)
+    total_expnd_net(self)
+    total_expnd_mean_by_body(self, body='Antiquariat')
+    total_expnd_net_year_by_body(self, body='Antiquariat')
+    total_expnd_net_current_year(self)
+    total_expnd_net_current_year_by_body(self, body='Antiquariat')
+    total_expnd_net_years(self)
+    total_expnd_net_year(self, body='Antiquariat')
+    total_expnd_by_bodies_above_value(self, number=7)
+    date_range(self)
+    time_axis(self)
+    total_expnd_net_range(self, start=None, end=None, body=None)
+    total_expnd_net_months(self, start=None, end=None, body=None)
+    total_expnd_by_bodies_range(self, start=None, end=None, number=7)
+
+    """
+    # the columns of the cube besides date, body and expenditures
+    col_name_year = 'Jahr'
+    col_name_month = 'Monat'
+    col_name_rows = 'Zeilen'
+    col_name_diff = 'Differenz'
+    col_name_year_end = 'Jahresende'
+
+    def __init__(self, storage_file_path, col_name_body='Lieferant Abk.',
+                 col_name_expnd='Umsatz (EUR)', col_name_date='Datum',
+                 col_name_expnd_diff='Diff'):
+        """Inits ExpenditureCube and loads the cube. If there is no cube yet or
+        it is outdated, it will be built from the storage file.
+
+        Parameters
+        ----------
+        storage_file_path : str
+            the path of the storage file (umsatz or budget).
+        col_name_body : str, optional
+            the name of the body column, by default 'Lieferant Abk.'
+        col_name_expnd : str, optional
+            the name of the expenditure column, by default 'Umsatz (EUR)'
+        col_name_date : str, optional
+            the name of the date column, by default 'Datum'
+        col_name_expnd_diff : str, optional
+            the name of the column for the monthly difference in the returned
+            frames, by default 'Diff'
+        """
+        self.storage_file_path = storage_file_path
+        self.cube_file_path = sidecar_path(storage_file_path, 'cube', ext='.json')
+        self.col_name_date = col_name_date
+        self.col_name_body = col_name_body
+        self.col_name_expnd = col_name_expnd
+        self.col_name_expnd_diff = col_name_expnd_diff
+        self._cube = self._derive(pd.DataFrame({
+            col_name_date: pd.Series(dtype=object),
+            col_name_body: pd.Series(dtype=object),
+            col_name_expnd: pd.Series(dtype=float),
+            self.col_name_rows: pd.Series(dtype=np.int64)}))
+        self.load()
+
+    def _columns(self):
+        """Returns the names of the columns of the cube."""
+        return [self.col_name_date, self.col_name_body, self.col_name_expnd, self.col_name_rows,
+                self.col_name_year, self.col_name_month, self.col_name_diff,
+                self.col_name_year_end]
+
+    def load(self):
+        """Loads the cube. Builds it from the storage file if it does not exist,
+        is outdated or was built for other columns.
+
+        Returns
+        -------
+        dataframe:
+            with the expenditures per date and body.
+        """
+        content = None
+        if os.path.exists(self.cube_file_path):
+            with open(self.cube_file_path, encoding='utf-8') as f:
+                content = json.load(f)
+
+        if (content is not None
+                and content['version'] == dataset_version(self.storage_file_path)
+                and content['columns'] == self._columns()):
+            self._cube = pd.DataFrame(content['cube'], columns=self._columns())
+            self._cube[self.col_name_expnd] = self._cube[self.col_name_expnd].astype(float)
+            self._cube[self.col_name_diff] = self._cube[self.col_name_diff].astype(float)
+            self._index()
+        elif os.path.exists(self.storage_file_path):
+            self.rebuild()
+            self.save()
+        else:
+            self._index()
+
+        return self._cube
+
+    def rebuild(self):
+        """Builds the cube from the whole storage file.
+
+        Returns
+        -------
+        dataframe:
+            with the expenditures per date and body.
+        """
+        self._cube = self._cube.iloc[0:0]
+
+        return self.update(pd.read_csv(self.storage_file_path,
+                                       usecols=[self.col_name_date, self.col_name_body,
+                                                self.col_name_expnd]))
+
+    def update(self, df):
+        """Adds the expenditures of newly imported rows to the cube.
+
+        Parameters
+        ----------
+        df : dataframe
+            the rows of one import (delta).
+
+        Returns
+        -------
+        dataframe:
+            with the expenditures per date and body.
+        """
+        delta = pd.DataFrame({
+            self.col_name_date: df[self.col_name_date].astype(str).to_numpy(),
+            self.col_name_body: df[self.col_name_body].fillna('').astype(str).to_numpy(),
+            self.col_name_expnd: pd.to_numeric(
+                df[self.col_name_expnd], errors='coerce').fillna(0).to_numpy(dtype=float),
+            self.col_name_rows: 1,
+        })
+        base = [self.col_name_date, self.col_name_body, self.col_name_expnd, self.col_name_rows]
+        # the order of the first appearance is kept, like in the storage file
+        cube = pd.concat([self._cube[base], delta], ignore_index=True).groupby(
+            [self.col_name_date, self.col_name_body], sort=False)[
+            [self.col_name_expnd, self.col_name_rows]].sum().reset_index()
+        self._cube = self._derive(cube)
+        self._index()
+
+        return self._cube
+
+    def save(self):
+        """Saves the cube with the current version of the storage file.
+        """
+        tmp = '{}.{}'.format(self.cube_file_path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': dataset_version(self.storage_file_path),
+                       'columns': self._columns(),
+                       'cube': {col: self._cube[col].tolist() for col in self._columns()}},
+                      f, ensure_ascii=False)
+        os.replace(tmp, self.cube_file_path)
+
+    def _derive(self, cube):
+        """Returns the cube sorted by date with year, month, the monthly
+        difference and the year-end dates (see
+        DataPreparation.get_specific_dates_dataframe)."""
+        cube = cube.sort_values(self.col_name_date, kind='mergesort').reset_index(drop=True)
+        dates = pd.to_datetime(cube[self.col_name_date])
+        cube[self.col_name_year] = dates.dt.year.astype(np.int64)
+        cube[self.col_name_month] = dates.dt.month.astype(np.int64)
+        # the values are accumulated per year, the first month keeps its value
+        cube[self.col_name_diff] = cube.groupby(
+            [self.col_name_body, self.col_name_year])[self.col_name_expnd].diff().fillna(
+            cube[self.col_name_expnd])
+
+        years = get_dates_list()
+        if len(cube.index):
+            date_max = cube[self.col_name_date].max()
+            if date_max not in years:
+                years[-1] = date_max
+        cube[self.col_name_year_end] = cube[self.col_name_date].isin(years)
+
+        return cube
+
+    @staticmethod
+    def _slices(df, col_name):
+        """Returns the frame sorted by a column (stable) and the slice of every
+        value."""
+        df = df.sort_values(col_name, kind='mergesort').reset_index(drop=True)
+        values = df[col_name].to_numpy()
+        starts = np.flatnonzero(np.r_[True, values[1:] != values[:-1]]) if len(values) else []
+        stops = list(starts[1:]) + [len(values)]
+
+        return {values[start]: df.iloc[start:stop] for start, stop in zip(starts, stops)}
+
+    def _index(self):
+        """Prepares the slices and the values of the queries."""
+        cube = self._cube
+        year_end = cube[cube[self.col_name_year_end]]
+        self._years = pd.DataFrame({
+            self.col_name_date: year_end[self.col_name_year].to_numpy(),
+            self.col_name_body: year_end[self.col_name_body].to_numpy(),
+            self.col_name_expnd: year_end[self.col_name_expnd].to_numpy()})
+        self._years_by_body = self._slices(self._years, self.col_name_body)
+
+        by_body = year_end.groupby(self.col_name_body)[
+            [self.col_name_expnd, self.col_name_rows]].sum()
+        self._mean_by_body = (by_body[self.col_name_expnd]
+                              / by_body[self.col_name_rows]).to_dict()
+        self._total = self._years[self.col_name_expnd].sum().round(2)
+
+        current = cube[cube[self.col_name_date] == cube[self.col_name_date].max()]
+        self._current_year = current[self.col_name_expnd].sum()
+        self._current_year_by_body = current.groupby(self.col_name_body)[
+            self.col_name_expnd].sum().round(2).to_dict()
+
+        months = cube[cube[self.col_name_year] == datetime.datetime.now().year]
+        self._months = months[[self.col_name_date, self.col_name_body, self.col_name_expnd,
+                               self.col_name_diff]].rename(
+            columns={self.col_name_diff: self.col_name_expnd_diff}).reset_index(drop=True)
+        self._months_by_body = self._slices(self._months, self.col_name_body)
+
+        # the time axis: the monthly values per date (sorted, ISO strings sort
+        # by time) and body, and their prefix sums over the dates (the first
+        # row is 0, so a range lo:hi sums to prefix[hi] - prefix[lo])
+        matrix = pd.DataFrame(0.0, index=pd.Index([], dtype=object), columns=[])
+        if len(cube.index):
+            matrix = cube.pivot_table(index=self.col_name_date, columns=self.col_name_body,
+                                      values=self.col_name_diff, aggfunc='sum', fill_value=0.0)
+        self._axis = matrix.index.to_numpy(dtype=str)
+        self._axis_bodies = matrix.columns.to_numpy()
+        self._axis_pos = {body: i for i, body in enumerate(self._axis_bodies)}
+        self._axis_values = matrix.to_numpy(dtype=float)
+        self._prefix = np.vstack([np.zeros((1, len(self._axis_bodies))),
+                                  self._axis_values.cumsum(axis=0)])
+
+    def _range(self, start, end):
+        """Returns the positions lo:hi of the dates from start to end
+        (inclusive) on the time axis. The data are monthly stands (the first
+        of a month), so the start is rounded down to the first of its month,
+        e.g. 2020-06-15 includes June."""
+        lo = (0 if start is None
+              else int(np.searchsorted(self._axis, str(start)[:7] + '-01', 'left')))
+        hi = (len(self._axis) if end is None
+              else int(np.searchsorted(self._axis, str(end)[:10], 'right')))
+
+        return lo, max(lo, hi)
+
+    def total_expnd_net(self):
+        """Returns the total expenditures overall, like
+        Expenditures.total_expnd_net.
+
+        Returns
+        -------
+        float:
+            the number of total expenditure overall.
+        """
+        return self._total
+
+    def total_expnd_mean_by_body(self, body='Antiquariat'):
+        """Returns the average of the yearly expenditures for one body, like
+        Expenditures.total_expnd_mean_by_body.
+
+        Parameters
+        ----------
+        body : str, optional
+            the name of the body, e.g. seller, cost center, by default 'Antiquariat'
+
+        Returns
+        -------
+        float:
+            the average of the yearly expenditures (nan for an unknown body).
+        """
+        return self._mean_by_body.get(body, np.nan)
+
+    def total_expnd_net_year_by_body(self, body='Antiquariat'):
+        """Returns a dataframe with the yearly expenditures for one body, like
+        Expenditures.total_expnd_net_year_by_body.
+
+        Parameters
+        ----------
+        body : str, optional
+            the name of the body, e.g. seller, cost center, by default 'Antiquariat'
+
+        Returns
+        -------
+        dataframe:
+            with the year, the body and the expenditures.
+        """
+        return self._years_by_body.get(body, self._years.iloc[0:0])
+
+    def total_expnd_net_current_year(self):
+        """Returns the total expenditures for the current year (the latest
+        date), like Expenditures.total_expnd_net_current_year.
+
+        Returns
+        -------
+        float:
+            the number of total expenditures for the current year.
+        """
+        return self._current_year
+
+    def total_expnd_net_current_year_by_body(self, body='Antiquariat'):
+        """Returns the total expenditures for one body for the current year,
+        like Expenditures.total_expnd_net_current_year_by_body.
+
+        Parameters
+        ----------
+        body : str, optional
+            the name of the body, e.g. seller, cost center, by default 'Antiquariat'
+
+        Returns
+        -------
+        float:
+            the number of total expenditures for the body for the current year.
+        """
+        return self._current_year_by_body.get(body, 0.0)
+
+    def total_expnd_net_years(self):
+        """Returns a dataframe with the yearly expenditures of all bodies, like
+        Expenditures.total_expnd_net_years.
+
+        Returns
+        -------
+        dataframe:
+            with the year, the body and the expenditures.
+        """
+        return self._years
+
+    def total_expnd_net_year(self, body='Antiquariat'):
+        """Returns a dataframe with the monthly expenditures (difference) of
+        the current calendar year, like Expenditures.total_expnd_net_year.
+
+        Parameters
+        ----------
+        body : str or None, optional
+            the name of the body, by default 'Antiquariat'. None returns all
+            bodies.
+
+        Returns
+        -------
+        dataframe:
+            with the date, the body, the expenditures and the monthly difference.
+        """
+        if body is None:
+            return self._months
+        return self._months_by_body.get(body, self._months.iloc[0:0])
+
+    def total_expnd_by_bodies_above_value(self, number=7):
+        """Returns a dataframe with the yearly expenditures summed by the top
+        number bodies and 'Sonstige' for all others, like
+        Expenditures.total_expnd_by_bodies_above_value.
+
+        Parameters
+        ----------
+        number : int, optional
+            top number values, by default 7
+
+        Returns
+        -------
+        dataframe:
+            with top number values.
+        """
+        years = self._years[self._years[self.col_name_body] != '']
+        df = years.groupby(self.col_name_body)[self.col_name_expnd].sum().reset_index()
+        df[self.col_name_body] = bucket_top_values(df[self.col_name_body],
+                                                   df[self.col_name_expnd], number=number)
+
+        return df.groupby(self.col_name_body)[self.col_name_expnd].sum().reset_index()
+
+    def date_range(self):
+        """Returns the first and the latest date of the cube.
+
+        Returns
+        -------
+        tuple:
+            with the dates as str (None, None for an empty cube).
+        """
+        if not len(self._axis):
+            return None, None
+        return self._axis[0], self._axis[-1]
+
+    def time_axis(self):
+        """Returns the time axis of the range queries: the sorted dates, the
+        bodies and the monthly values (difference) per date and body. The
+        arrays are shared and must not be changed.
+
+        Returns
+        -------
+        tuple:
+            with the dates (str), the bodies and the values (dates x bodies).
+        """
+        return self._axis, self._axis_bodies, self._axis_values
+
+    def total_expnd_net_range(self, start=None, end=None, body=None):
+        """Returns the expenditures within a date range, the sum of the
+        monthly values (difference) from start to end. It is the difference of
+        two rows of the prefix sums.
+
+        Parameters
+        ----------
+        start : str, optional
+            the first date (e.g. '2020-07-01', the whole month of it), by
+            default None (the first date)
+        end : str, optional
+            the last date (inclusive), by default None (the latest date)
+        body : str or None, optional
+            the name of the body, by default None (all bodies)
+
+        Returns
+        -------
+        float:
+            the expenditures within the range (0 for an unknown body).
+        """
+        lo, hi = self._range(start, end)
+        sums = self._prefix[hi] - self._prefix[lo]
+        if body is None:
+            return round(float(sums.sum()), 2)
+        if body not in self._axis_pos:
+            return 0.0
+        return round(float(sums[self._axis_pos[body]]), 2)
+
+    def total_expnd_net_months(self, start=None, end=None, body=None):
+        """Returns a dataframe with the monthly expenditures (difference)
+        within a date range, a slice of the time axis.
+
+        Parameters
+        ----------
+        start : str, optional
+            the first date, by default None (the first date)
+        end : str, optional
+            the last date (inclusive), by default None (the latest date)
+        body : str or None, optional
+            the name of the body, by default None (the sum of all bodies)
+
+        Returns
+        -------
+        dataframe:
+            with the date and the monthly difference (0 for months without
+            expenditures of the body).
+        """
+        lo, hi = self._range(start, end)
+        if body is None:
+            values = self._axis_values[lo:hi].sum(axis=1)
+        elif body in self._axis_pos:
+            values = self._axis_values[lo:hi, self._axis_pos[body]]
+        else:
+            values = np.zeros(hi - lo)
+
+        return pd.DataFrame({self.col_name_date: self._axis[lo:hi],
+                             self.col_name_expnd_diff: values})
+
+    def total_expnd_by_bodies_range(self, start=None, end=None, number=7):
+        """Returns a dataframe with the expenditures within a date range
+        summed by the top number bodies and 'Sonstige' for all others, like
+        total_expnd_by_bodies_above_value for the whole history.
+
+        Parameters
+        ----------
+        start : str, optional
+            the first date, by default None (the first date)
+        end : str, optional
+            the last date (inclusive), by default None (the latest date)
+        number : int, optional
+            top number values, by default 7
+
+        Returns
+        -------
+        dataframe:
+            with the bodies and the expenditures within the range.
+        """
+        lo, hi = self._range(start, end)
+        sums = self._prefix[hi] - self._prefix[lo]
+        keep = (self._axis_bodies != '') & (sums.round(2) != 0)
+        df = pd.DataFrame({self.col_name_body: self._axis_bodies[keep],
+                           self.col_name_expnd: sums[keep]})
+        df[self.col_name_body] = bucket_top_values(df[self.col_name_body],
+                                                   df[self.col_name_expnd], number=number)
+
+        return df.groupby(self.col_name_body)[self.col_name_expnd].sum().reset_index()
+
+
+if __name__ == '__main__':
+    pass
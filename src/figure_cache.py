@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module keeps precomputed figures of the dashboard in a JSON file next
+to a storage file. The figures for every value of a dropdown list only change
+with the data, so they are computed once after each import by a warm-up job in
+a pool of worker processes and the callbacks serve the stored JSON. The file
+records the version of the datasets (see cache.dataset_version), the version of
+the code and the settings which change the figures (e.g. CODE_VERSION of
+dashboard/app.py) and the current year, because some figures show the current
+year. An outdated file (new data, a deploy, other settings) is ignored,
+the callbacks compute the figures themselves until the next warm-up.
+It includes the following class:
+    FigureCache
+
+"""
+
+# os func
+import os
+# datetime func
+import datetime
+# json func
+import json
+# process pool
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+# threading func
+import threading
+# serialization of plotly figures and dash components
+from plotly.utils import PlotlyJSONEncoder
+
+from src.cache import dataset_version
+from src.tenants import current_tenant, use_tenant
+from src.utils import sidecar_path
+
+# function and tenant of the running warm-up, inherited by the forked workers,
+# the lock keeps the inputs of concurrent warm-ups apart
+_SHARED = {}
+_SHARED_LOCK = threading.Lock()
+
+
+def _to_json(value):
+    """Computes the figures for one value and returns them as JSON. Runs in a
+    worker process.
+    """
+    with use_tenant(_SHARED['tenant']):
+        return json.dumps(_SHARED['func'](value), cls=PlotlyJSONEncoder)
+
+
+class FigureCache:
+    """The precomputed figures (JSON) for all values of a dropdown list.
+
+    Attributes
+    ----------
+
+    filenames : tuple
+    code_version : str
+    cache_file_path : str
+    _content : tuple
+    _mtime : int
+    _lock : threading.Lock
+
+    Methods
+    -------
+    version(self)
+    get(self, value, default=None)
+    precompute(self, func, values, workers=None)
+
+    """
+
+    def __init__(self, *filenames, name='figures', code_version=''):
+        """Inits FigureCache with:
+
+        Parameters
+        ----------
+        filenames : str
+            the storage files the figures depend on. The cache file is stored
+            next to the first one.
+        name : str, optional
+            the suffix of the cache file, by default 'figures'
+        code_version : str, optional
+            the version of the code and the settings which build the figures,
+            by default ''
+        """
+        self.filenames = filenames
+        self.code_version = code_version
+        self.cache_file_path = sidecar_path(filenames[0], name, ext='.json')
+        # version and values, replaced together
+        self._content = (None, {})
+        self._mtime = None
+        self._lock = threading.Lock()
+
+    def version(self):
+        """Returns the version of the datasets, of the code and the current year."""
+        return '{}:{}:{}'.format(dataset_version(*self.filenames), self.code_version,
+                                 datetime.date.today().year)
+
+    def _load(self):
+        """(Re)loads the cache file if it was changed by a warm-up and returns
+        the version and the values of the same file."""
+        try:
+            mtime = os.stat(self.cache_file_path).st_mtime_ns
+        except OSError:
+            return self._content
+        with self._lock:
+            if mtime != self._mtime:
+                with open(self.cache_file_path, encoding='utf-8') as f:
+                    content = json.load(f)
+                self._content = (content['version'], content['values'])
+                self._mtime = mtime
+            return self._content
+
+    def get(self, value, default=None):
+        """Returns the precomputed figures for the value, if they are up to
+        date.
+
+        Parameters
+        ----------
+        value : str
+            the value of the dropdown list.
+        default : optional
+            returned for a missing or outdated value, by default None
+
+        Returns
+        -------
+        list, dict or default:
+            the decoded JSON of the figures.
+        """
+        version, values = self._load()
+        if version != self.version() or value not in values:
+            return default
+
+        return json.loads(values[value])
+
+    def precompute(self, func, values, workers=None):
+        """Computes the figures for all values in a pool of worker processes
+        and writes them to the cache file.
+
+        Parameters
+        ----------
+        func : function
+            returns the figures (figures, dash components, ...) for one value.
+        values : list
+            the values of the dropdown list.
+        workers : int, optional
+            the number of worker processes, by default None (number of cores)
+
+        Returns
+        -------
+        int:
+            the number of precomputed values.
+        """
+        values = [str(v) for v in values]
+        version = self.version()
+        workers = min(workers or os.cpu_count() or 1, len(values))
+
+        with _SHARED_LOCK:
+            _SHARED['func'] = func
+            _SHARED['tenant'] = current_tenant()
+            try:
+                # the workers inherit the function and the loaded data by fork
+                if workers > 1 and 'fork' in multiprocessing.get_all_start_methods():
+                    with ProcessPoolExecutor(max_workers=workers,
+                                             mp_context=multiprocessing.get_context('fork')) as executor:
+                        results = list(executor.map(_to_json, values, chunksize=4))
+                else:
+                    results = [_to_json(v) for v in values]
+            finally:
+                _SHARED.clear()
+
+        tmp = '{}.{}'.format(self.cache_file_path, os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'version': version, 'values': dict(zip(values, results))}, f)
+        os.replace(tmp, self.cache_file_path)
+
+        return len(values)
+
+
+if __name__ == '__main__':
+    pass
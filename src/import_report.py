@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module reports the stages of an import pipeline (see src/instances).
+Every stage records its duration, the rows before and after (so the rows
+dropped by each CleanPreProcDf step), the rows per second and the peak RSS of
+the process. At the end the report is appended as one JSON line to the
+history next to the storage file (<storage>_imports.jsonl), so the growth of
+the exports and regressions can be followed month over month:
+
+    python -m src.import_report data/storage_folders/umsatz/umsatz_total.csv
+
+It includes the following class and functions:
+    ImportReport
+    peak_rss()
+    history(storage_file_path)
+    print_history(storage_file_path)
+
+"""
+
+# sys func
+import sys
+# time func
+import time
+# json func
+import json
+# datetime func
+import datetime
+# os func
+import os
+# pandas func
+import pandas as pd
+
+from src.utils import sidecar_path
+
+# not available on Windows
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def peak_rss():
+    """Returns the peak resident set size of the process in MB (None if it
+    is not available)."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # bytes on macOS, kilobytes on Linux
+    return round(rss / (1024 ** 2 if sys.platform == 'darwin' else 1024), 1)
+
+
+class ImportReport:
+    """The report of one run of an import pipeline. The stages run in order,
+    the rows before a stage are the rows after the last stage which returned
+    a dataframe.
+
+    Attributes
+    ----------
+
+    name : str
+    storage_file_path : str
+    history_file_path : str
+    files : dict
+    stages : list
+    _rows : int
+    _start : float
+
+    Methods
+    -------
+    add_files(self, found, accepted)
+    stage(self, name, func, *args, **kwargs)
+    to_dict(self)
+    save(self, output=sys.stdout)
+
+    """
+
+    def __init__(self, name, storage_file_path):
+        """Inits ImportReport with:
+
+        Parameters
+        ----------
+        name : str
+            the name of the pipeline, e.g. 'umsatz'.
+        storage_file_path : str
+            the path of the storage file, the history is stored next to it.
+        """
+        self.name = name
+        self.storage_file_path = storage_file_path
+        self.history_file_path = sidecar_path(storage_file_path, 'imports', ext='.jsonl')
+        self.files = {'found': [], 'accepted': [], 'skipped': []}
+        self.stages = []
+        self._rows = None
+        self._start = time.perf_counter()
+
+    def add_files(self, found, accepted):
+        """Records the files found in the import directory and the files
+        with a correct format.
+
+        Parameters
+        ----------
+        found : list
+            the filenames in the import directory.
+        accepted : list
+            the paths of the files which will be imported.
+        """
+        accepted_names = {os.path.basename(f) for f in accepted}
+        self.files = {'found': sorted(found),
+                      'accepted': sorted(accepted_names),
+                      'skipped': sorted(f for f in found if f not in accepted_names)}
+
+    def stage(self, name, func, *args, **kwargs):
+        """Runs a stage and records it.
+
+        Parameters
+        ----------
+        name : str
+            the name of the stage.
+        func : function
+            the function of the stage, its other arguments follow.
+
+        Returns
+        -------
+        object:
+            the result of the function.
+        """
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        seconds = time.perf_counter() - start
+
+        rows_in = self._rows
+        rows_out = len(result.index) if isinstance(result, pd.DataFrame) else None
+        rows = rows_out if rows_out is not None else rows_in
+        self.stages.append({
+            'stage': name,
+            'seconds': round(seconds, 4),
+            'rows_in': rows_in,
+            'rows_out': rows_out,
+            'rows_dropped': rows_in - rows_out
+            if rows_in is not None and rows_out is not None else None,
+            'rows_per_second': round(rows / seconds) if rows and seconds > 0 else None,
+            'peak_rss_mb': peak_rss()})
+        if rows_out is not None:
+            self._rows = rows_out
+
+        return result
+
+    def to_dict(self):
+        """Returns the report as dictionary."""
+        seconds = time.perf_counter() - self._start
+        read = next((s['rows_out'] for s in self.stages if s['rows_out'] is not None), None)
+
+        return {'import': self.name,
+                'date': datetime.datetime.now().isoformat(timespec='seconds'),
+                'files_found': len(self.files['found']),
+                'files_skipped': len(self.files['skipped']),
+                'files': self.files,
+                'rows_read': read,
+                'rows_imported': self._rows,
+                'seconds': round(seconds, 4),
+                'rows_per_second': round(self._rows / seconds) if self._rows else None,
+                'peak_rss_mb': peak_rss(),
+                'stages': self.stages}
+
+    def save(self, output=None):
+        """Appends the report as one JSON line to the history.
+
+        Parameters
+        ----------
+        output : file, optional
+            where the JSON line is written as well, e.g. sys.stdout, by
+            default None (only the history)
+
+        Returns
+        -------
+        dict:
+            the report.
+        """
+        report = self.to_dict()
+        line = json.dumps(report, ensure_ascii=False)
+        if output is not None:
+            print(line, file=output)
+        if os.path.isdir(os.path.dirname(self.history_file_path)):
+            with open(self.history_file_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+        return report
+
+
+def history(storage_file_path):
+    """Returns the reports of all imports into a storage file.
+
+    Parameters
+    ----------
+    storage_file_path : str
+        the path of the storage file.
+
+    Returns
+    -------
+    list:
+        with the reports, the oldest first.
+    """
+    history_file_path = sidecar_path(storage_file_path, 'imports', ext='.jsonl')
+    if not os.path.exists(history_file_path):
+        return []
+    with open(history_file_path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def print_history(storage_file_path):
+    """Prints the history of the imports into a storage file as table."""
+    print('{:<20} {:>6} {:>8} {:>10} {:>10} {:>9} {:>10} {:>8}'.format(
+        'date', 'files', 'skipped', 'rows read', 'imported', 's', 'rows/s', 'RSS MB'))
+    for r in history(storage_file_path):
+        print('{:<20} {:>6} {:>8} {:>10} {:>10} {:>9.2f} {:>10} {:>8}'.format(
+            r['date'], r['files_found'], r['files_skipped'], str(r['rows_read']),
+            str(r['rows_imported']), r['seconds'], str(r['rows_per_second']),
+            str(r['peak_rss_mb'])))
+
+
+if __name__ == '__main__':
+    for path in sys.argv[1:]:
+        print_history(path)
@@ -7,11 +7,19 @@ and it's classes:
     FileImport,
     CleanPreProcDf,
     SaveDfToCSV
+After saving, the expenditure cube (ExpenditureCube) and the index of the
+cost centres (DistinctValues) are updated with the imported rows.
+Every run writes a report of its stages (ImportReport), which is kept as
+history next to the storage file.
 Necessary file/path/directory are defined in the configuration.py.
 """
 
 import os
 from src.data_import import FilenameValidation, FileImport, CleanPreProcDf, SaveDfToCSV
+from src.distinct_values import DistinctValues
+from src.expenditure_cube import ExpenditureCube
+from src.profiling import report
+from src.import_report import ImportReport
 
 from configuration import FILEPATH_BUDGET_IMP, FILEPATH_BUDGET_STOR, HELPER_FILE_KOST
 
@@ -25,25 +33,50 @@ def main():
         remove_whitespaces_col_headers() from cls CleanPreProcDf
         create_new_column_by_dict_value() from cls CleanPreProcDf
         add_df_existing_csv_file() or create_new_csv_file_df() from cls SaveDfToCSV
+        update() and save() from cls ExpenditureCube
+        update() and save() from cls DistinctValues
+    The stages are reported by ImportReport.
     """
-    d = FilenameValidation(FILEPATH_BUDGET_IMP).filename_format_corr()
+    r = ImportReport('budget', FILEPATH_BUDGET_STOR)
 
-    e = FileImport(d).load_txt_to_df(skiprows=6, skipfooter=3)
+    c = FilenameValidation(FILEPATH_BUDGET_IMP)
+    d = r.stage('filename_format_corr', c.filename_format_corr)
+    r.add_files(c.file_list(), d)
 
-    g = CleanPreProcDf(e).remove_rows_with_special_char()
+    e = r.stage('load_txt_to_df', FileImport(d).load_txt_to_df, skiprows=6, skipfooter=3)
 
-    h = CleanPreProcDf(g).remove_whitespaces_col_headers()
+    g = r.stage('remove_rows_with_special_char',
+                CleanPreProcDf(e).remove_rows_with_special_char)
 
-    h = CleanPreProcDf(h).create_new_column_by_dict_value(
-        col_name_map_new='Bezeichnung', col_name_map='S Bezeichnung',
-        filename=HELPER_FILE_KOST)
+    h = r.stage('remove_whitespaces_col_headers',
+                CleanPreProcDf(g).remove_whitespaces_col_headers)
+
+    h = r.stage('create_new_column_by_dict_value',
+                CleanPreProcDf(h).create_new_column_by_dict_value,
+                col_name_map_new='Bezeichnung', col_name_map='S Bezeichnung',
+                filename=HELPER_FILE_KOST)
+
+    # load the cube and the index before saving, so a missing cube or index is
+    # built from the storage file without the new rows
+    x = ExpenditureCube(FILEPATH_BUDGET_STOR, 'Bezeichnung', 'Ausg. ges.')
+    v = DistinctValues(FILEPATH_BUDGET_STOR, ['Bezeichnung'])
 
     if os.path.exists(FILEPATH_BUDGET_STOR):
-        f = SaveDfToCSV(FILEPATH_BUDGET_STOR, h).add_df_existing_csv_file()
+        r.stage('add_df_existing_csv_file',
+                SaveDfToCSV(FILEPATH_BUDGET_STOR, h).add_df_existing_csv_file)
     else:
-        f = SaveDfToCSV(FILEPATH_BUDGET_STOR, h).create_new_csv_file_df()
+        r.stage('create_new_csv_file_df',
+                SaveDfToCSV(FILEPATH_BUDGET_STOR, h).create_new_csv_file_df)
+
+    x.update(h)
+    r.stage('expenditure_cube', x.save)
+    v.update(h)
+    r.stage('distinct_values', v.save)
 
     print('Der Import wurde erfolgreich durchgeführt.')
+    r.save()
     
 if __name__ == '__main__':
-    main()
+    # the profile of the import (DASHBOARD_PROFILING=1)
+    with report('budget_import'):
+        main()
@@ -7,11 +7,18 @@ and it's classes:
     FileImport,
     CleanPreProcDf,
     SaveDfToCSV
+After saving, the index of the years and RVK groups (DistinctValues) is
+updated with the imported rows.
+Every run writes a report of its stages (ImportReport), which is kept as
+history next to the storage file.
 Necessary file/path/directory are defined in the configuration.py.
 """
 
 import os
 from src.data_import import FilenameValidation, FileImport, CleanPreProcDf, SaveDfToCSV
+from src.distinct_values import DistinctValues
+from src.profiling import report
+from src.import_report import ImportReport
 
 from configuration import FILEPATH_LOAN_IMP, FILEPATH_LOAN_STOR, FILEPATH_HELPER_RVK
 
@@ -25,34 +32,53 @@ def main():
         create_new_column_for_rvk_benennung() from cls CleanPreProcDf.
         fill_rows_value_by_column() from cls CleanPreProcDf.
         add_df_existing_csv_file() or create_new_csv_file_df() from cls SaveDfToCSV.
+        update() and save() from cls DistinctValues.
+    The stages are reported by ImportReport.
     """
-    h = FilenameValidation(FILEPATH_LOAN_IMP).filename_format_corr()
+    r = ImportReport('loan', FILEPATH_LOAN_STOR)
 
-    i = FileImport(h).load_excel_to_df(sheet_name=2, ignore_index=True)
+    f = FilenameValidation(FILEPATH_LOAN_IMP)
+    h = r.stage('filename_format_corr', f.filename_format_corr)
+    r.add_files(f.file_list(), h)
 
-    i = CleanPreProcDf(i).create_new_column_for_rvk_benennung(
-        'shelfmark', 'Systematikstelle', 'RVK-Bez-SysStelle',
-        FILEPATH_HELPER_RVK, r'([A-Z]{1,2}\s\d{2,5})')
+    i = r.stage('load_excel_to_df', FileImport(h).load_excel_to_df,
+                sheet_name=2, ignore_index=True)
 
-    i = CleanPreProcDf(i).create_new_column_for_rvk_benennung(
-        'shelfmark', 'Systematikgruppe', 'RVK-Bez-SysGruppe',
-        FILEPATH_HELPER_RVK, r'(^[A-Z]{1,2})')
+    i = r.stage('create_new_column_for_rvk_benennung (Systematikstelle)',
+                CleanPreProcDf(i).create_new_column_for_rvk_benennung,
+                'shelfmark', 'Systematikstelle', 'RVK-Bez-SysStelle',
+                FILEPATH_HELPER_RVK, r'([A-Z]{1,2}\s\d{2,5})')
 
-    i = CleanPreProcDf(i).fill_rows_value_by_column(
-        'shelfmark', '099', 'Systematikgruppe', 'Buchservice')
+    i = r.stage('create_new_column_for_rvk_benennung (Systematikgruppe)',
+                CleanPreProcDf(i).create_new_column_for_rvk_benennung,
+                'shelfmark', 'Systematikgruppe', 'RVK-Bez-SysGruppe',
+                FILEPATH_HELPER_RVK, r'(^[A-Z]{1,2})')
 
-    i = CleanPreProcDf(i).precalc_column(
-        'cum_loans', 'Systematikgruppe', 'Buchservice')
+    i = r.stage('fill_rows_value_by_column', CleanPreProcDf(i).fill_rows_value_by_column,
+                'shelfmark', '099', 'Systematikgruppe', 'Buchservice')
+
+    i = r.stage('precalc_column', CleanPreProcDf(i).precalc_column,
+                'cum_loans', 'Systematikgruppe', 'Buchservice')
+
+    # load the index before saving, so a missing index is built from the
+    # storage file without the new rows
+    v = DistinctValues(FILEPATH_LOAN_STOR, ['year', 'Systematikgruppe'])
 
     if os.path.exists(FILEPATH_LOAN_STOR):
-        i = SaveDfToCSV(FILEPATH_LOAN_STOR,
-                        i).add_df_existing_csv_file()
+        r.stage('add_df_existing_csv_file',
+                SaveDfToCSV(FILEPATH_LOAN_STOR, i).add_df_existing_csv_file)
     else:
-        i = SaveDfToCSV(FILEPATH_LOAN_STOR,
-                        i).create_new_csv_file_df()
+        r.stage('create_new_csv_file_df',
+                SaveDfToCSV(FILEPATH_LOAN_STOR, i).create_new_csv_file_df)
+
+    v.update(i)
+    r.stage('distinct_values', v.save)
 
     print('Der Import wurde erfolgreich durchgeführt.')
+    r.save()
 
 
 if __name__ == '__main__':
-    main()
+    # the profile of the import (DASHBOARD_PROFILING=1)
+    with report('loan_import'):
+        main()
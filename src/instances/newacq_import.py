@@ -7,11 +7,19 @@ and it's classes:
     FileImport,
     CleanPreProcDf,
     SaveDfToCSV
+After saving, the counters of the collection growth (CollectionCounter) are
+updated with the imported rows, like the index of the RVK groups (DistinctValues).
+Every run writes a report of its stages (ImportReport), which is kept as
+history next to the storage file.
 Necessary file/path/directory are defined in the configuration.py.
 """
 
 import os
 from src.data_import import FilenameValidation, FileImport, CleanPreProcDf, SaveDfToCSV
+from src.collection_counter import CollectionCounter
+from src.distinct_values import DistinctValues
+from src.profiling import report
+from src.import_report import ImportReport
 
 from configuration import FILEPATH_NEWACQ_IMP, FILEPATH_NEWACQ_STOR, FILEPATH_HELPER_RVK
 
@@ -25,31 +33,58 @@ def main():
         remove_whitespaces_col_headers() from cls CleanPreProcDf
         2 x create_new_column_for_rvk_benennung() from cls CleanPreProcDf
         add_df_existing_csv_file() or create_new_csv_file_df() from cls SaveDfToCSV
+        update() and save() from cls CollectionCounter
+        update() and save() from cls DistinctValues
+    The stages are reported by ImportReport.
     """
-    h = FilenameValidation(FILEPATH_NEWACQ_IMP).filename_format_corr()
+    r = ImportReport('newacq', FILEPATH_NEWACQ_STOR)
 
-    i = FileImport(h).load_tsv_to_df()
+    f = FilenameValidation(FILEPATH_NEWACQ_IMP)
+    h = r.stage('filename_format_corr', f.filename_format_corr)
+    r.add_files(f.file_list(), h)
 
-    i = CleanPreProcDf(i).remove_rows_with_special_char()
+    i = r.stage('load_tsv_to_df', FileImport(h).load_tsv_to_df)
 
-    i = CleanPreProcDf(i).remove_whitespaces_col_headers()
-    
-    i = CleanPreProcDf(i).setting_value_column(col_name_set='Ex', value_set=1)
+    i = r.stage('remove_rows_with_special_char',
+                CleanPreProcDf(i).remove_rows_with_special_char)
 
-    i = CleanPreProcDf(i).create_new_column_for_rvk_benennung(
-        'Signatur', 'Systematikstelle', 'RVK-Bez-SysStelle',
-        FILEPATH_HELPER_RVK, r'([A-Z]{1,2}\s\d{2,5})')
+    i = r.stage('remove_whitespaces_col_headers',
+                CleanPreProcDf(i).remove_whitespaces_col_headers)
 
-    i = CleanPreProcDf(i).create_new_column_for_rvk_benennung(
-        'Signatur', 'Systematikgruppe', 'RVK-Bez-SysGruppe',
-        FILEPATH_HELPER_RVK, r'(^[A-Z]{1,2})')
+    i = r.stage('setting_value_column', CleanPreProcDf(i).setting_value_column,
+                col_name_set='Ex', value_set=1)
+
+    i = r.stage('create_new_column_for_rvk_benennung (Systematikstelle)',
+                CleanPreProcDf(i).create_new_column_for_rvk_benennung,
+                'Signatur', 'Systematikstelle', 'RVK-Bez-SysStelle',
+                FILEPATH_HELPER_RVK, r'([A-Z]{1,2}\s\d{2,5})')
+
+    i = r.stage('create_new_column_for_rvk_benennung (Systematikgruppe)',
+                CleanPreProcDf(i).create_new_column_for_rvk_benennung,
+                'Signatur', 'Systematikgruppe', 'RVK-Bez-SysGruppe',
+                FILEPATH_HELPER_RVK, r'(^[A-Z]{1,2})')
+
+    # load the counters before saving, so a missing counter file is built
+    # from the storage file without the new rows
+    c = CollectionCounter(FILEPATH_NEWACQ_STOR)
+    v = DistinctValues(FILEPATH_NEWACQ_STOR, ['Systematikgruppe'])
 
     if os.path.exists(FILEPATH_NEWACQ_STOR):
-        i = SaveDfToCSV(FILEPATH_NEWACQ_STOR, i).add_df_existing_csv_file()
+        r.stage('add_df_existing_csv_file',
+                SaveDfToCSV(FILEPATH_NEWACQ_STOR, i).add_df_existing_csv_file)
     else:
-        i = SaveDfToCSV(FILEPATH_NEWACQ_STOR, i).create_new_csv_file_df()
+        r.stage('create_new_csv_file_df',
+                SaveDfToCSV(FILEPATH_NEWACQ_STOR, i).create_new_csv_file_df)
+
+    c.update(i)
+    r.stage('collection_counter', c.save)
+    v.update(i)
+    r.stage('distinct_values', v.save)
 
     print('Der Import wurde erfolgreich durchgeführt.')
+    r.save()
 
 if __name__ == '__main__':
-    main()
+    # the profile of the import (DASHBOARD_PROFILING=1)
+    with report('newacq_import'):
+        main()
@@ -6,11 +6,18 @@ and it's classes:
     FilenameValidation,
     FileImport,
     SaveDfToCSV
+After saving, the index of the years (DistinctValues) is updated with the
+imported rows.
+Every run writes a report of its stages (ImportReport), which is kept as
+history next to the storage file.
 Necessary file/path/directory are defined in the configuration.py.
 """
 
 import os
 from src.data_import import FilenameValidation, FileImport, SaveDfToCSV
+from src.distinct_values import DistinctValues
+from src.profiling import report
+from src.import_report import ImportReport
 
 from configuration import FILEPATH_READING_IMP, FILEPATH_READING_STOR
 
@@ -21,17 +28,35 @@ def main():
         filename_format_corr() from cls FilenameValidation.
         load_excel_to_df() from cls FileImport.
         add_df_existing_csv_file() or create_new_csv_file_df() from cls SaveDfToCSV
+        update() and save() from cls DistinctValues
+    The stages are reported by ImportReport.
     """
-    h = FilenameValidation(FILEPATH_READING_IMP).filename_format_corr()
+    r = ImportReport('readingroom', FILEPATH_READING_STOR)
 
-    i = FileImport(h).load_excel_to_df()
+    f = FilenameValidation(FILEPATH_READING_IMP)
+    h = r.stage('filename_format_corr', f.filename_format_corr)
+    r.add_files(f.file_list(), h)
+
+    i = r.stage('load_excel_to_df', FileImport(h).load_excel_to_df)
+
+    # load the index before saving, so a missing index is built from the
+    # storage file without the new rows
+    v = DistinctValues(FILEPATH_READING_STOR, ['Jahr'])
 
     if os.path.exists(FILEPATH_READING_STOR):
-        i = SaveDfToCSV(FILEPATH_READING_STOR, i).add_df_existing_csv_file()
+        r.stage('add_df_existing_csv_file',
+                SaveDfToCSV(FILEPATH_READING_STOR, i).add_df_existing_csv_file)
     else:
-        i = SaveDfToCSV(FILEPATH_READING_STOR, i).create_new_csv_file_df()
+        r.stage('create_new_csv_file_df',
+                SaveDfToCSV(FILEPATH_READING_STOR, i).create_new_csv_file_df)
+
+    v.update(i)
+    r.stage('distinct_values', v.save)
 
     print('Der Import wurde erfolgreich durchgeführt.')
+    r.save()
     
 if __name__ == '__main__':
-    main()
+    # the profile of the import (DASHBOARD_PROFILING=1)
+    with report('readingroom_import'):
+        main()
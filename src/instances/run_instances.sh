@@ -10,3 +10,6 @@ PYTHONPATH="${PYTHONPATH}:/usr/src/app"
 "$SCRIPTPATH/loan_import.py"
 "$SCRIPTPATH/newacq_import.py"
 "$SCRIPTPATH/readingroom.py"
+
+# precomputing the figures of the dashboard with the new data
+python "$SCRIPTPATH/../../dashboard/warm_up_figures.py"
@@ -7,11 +7,19 @@ and it's classes:
     FileImport,
     CleanPreProcDf,
     SaveDfToCSV
+After saving, the expenditure cube (ExpenditureCube) and the index of the
+suppliers (DistinctValues) are updated with the imported rows.
+Every run writes a report of its stages (ImportReport), which is kept as
+history next to the storage file.
 Necessary file/path/directory are defined in the configuration.py.
 """
 
 import os
 from src.data_import import FilenameValidation, FileImport, CleanPreProcDf, SaveDfToCSV
+from src.distinct_values import DistinctValues
+from src.expenditure_cube import ExpenditureCube
+from src.profiling import report
+from src.import_report import ImportReport
 
 from configuration import FILEPATH_UMSATZ_IMP, FILEPATH_UMSATZ_STOR, HELPER_FILE_LIEF
 
@@ -27,27 +35,51 @@ def main():
         create_new_column_by_dict_value(col_name_map_new='Lieferant Abk.',
             col_name_map='Lieferant',filename=HELPER_FILE_LIEF) from cls CleanPreProcDf.
         add_df_existing_csv_file() or create_new_csv_file_df() from cls SaveDfToCSV.
+        update() and save() from cls ExpenditureCube.
+        update() and save() from cls DistinctValues.
+    The stages are reported by ImportReport.
     """
-    h = FilenameValidation(FILEPATH_UMSATZ_IMP).filename_format_corr()
+    r = ImportReport('umsatz', FILEPATH_UMSATZ_STOR)
 
+    f = FilenameValidation(FILEPATH_UMSATZ_IMP)
+    h = r.stage('filename_format_corr', f.filename_format_corr)
+    r.add_files(f.file_list(), h)
 
-    i = FileImport(h).load_txt_to_df(skiprows=5, skipfooter=3)
+    i = r.stage('load_txt_to_df', FileImport(h).load_txt_to_df, skiprows=5, skipfooter=3)
 
-    j = CleanPreProcDf(i).remove_rows_with_special_char()
+    j = r.stage('remove_rows_with_special_char',
+                CleanPreProcDf(i).remove_rows_with_special_char)
 
-    k = CleanPreProcDf(j).remove_whitespaces_col_headers()
-    
-    k = CleanPreProcDf(k).create_new_column_by_dict_value(
-        col_name_map_new='Lieferant Abk.', col_name_map='Lieferant',
-        filename=HELPER_FILE_LIEF)
+    k = r.stage('remove_whitespaces_col_headers',
+                CleanPreProcDf(j).remove_whitespaces_col_headers)
+
+    k = r.stage('create_new_column_by_dict_value',
+                CleanPreProcDf(k).create_new_column_by_dict_value,
+                col_name_map_new='Lieferant Abk.', col_name_map='Lieferant',
+                filename=HELPER_FILE_LIEF)
+
+    # load the cube and the index before saving, so a missing cube or index is
+    # built from the storage file without the new rows
+    e = ExpenditureCube(FILEPATH_UMSATZ_STOR, 'Lieferant Abk.', 'Umsatz (EUR)')
+    v = DistinctValues(FILEPATH_UMSATZ_STOR, ['Lieferant Abk.'])
 
     if os.path.exists(FILEPATH_UMSATZ_STOR):
-        l = SaveDfToCSV(FILEPATH_UMSATZ_STOR, k).add_df_existing_csv_file()
+        r.stage('add_df_existing_csv_file',
+                SaveDfToCSV(FILEPATH_UMSATZ_STOR, k).add_df_existing_csv_file)
     else:
-        m = SaveDfToCSV(FILEPATH_UMSATZ_STOR, k).create_new_csv_file_df()
+        r.stage('create_new_csv_file_df',
+                SaveDfToCSV(FILEPATH_UMSATZ_STOR, k).create_new_csv_file_df)
+
+    e.update(k)
+    r.stage('expenditure_cube', e.save)
+    v.update(k)
+    r.stage('distinct_values', v.save)
 
     print('Der Import wurde erfolgreich durchgeführt.')
+    r.save()
 
 
 if __name__ == '__main__':
-    main()
+    # the profile of the import (DASHBOARD_PROFILING=1)
+    with report('umsatz_import'):
+        main()
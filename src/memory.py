@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module accounts the memory of the dashboard process: the deep size of
+the frames and other objects held by the memoized functions (caches), by the
+globals of the tab modules (e.g. the figure caches) and by the living
+DataPreparation instances, with totals per tab, per dataset and per tenant
+(the partitions of the caches, see src/tenants.py). On demand it
+compares tracemalloc snapshots, to find the lines which allocate the memory
+between two calls. The numbers are served by the admin endpoints (see
+init_app) and printed by dashboard/memory_report.py. The memory is accounted
+per process, with several workers (gunicorn) every worker reports its own.
+It includes the following functions:
+    deep_size(obj, seen=None)
+    find_frames(obj, path, seen=None)
+    track_instance(obj)
+    current_rss()
+    memory_report(top=20)
+    tracemalloc_diff(limit=10)
+    stop_tracemalloc()
+    init_app(server, token=None)
+
+"""
+
+# os func
+import os
+# constant time comparison of the token
+import hmac
+# sys func
+import sys
+# types func
+import types
+# weak references func
+import weakref
+# threading func
+import threading
+# tracemalloc func
+import tracemalloc
+
+from src.cache import MEMOIZED
+
+# the living DataPreparation instances (see track_instance)
+_INSTANCES = weakref.WeakSet()
+_INSTANCES_LOCK = threading.Lock()
+# the last tracemalloc snapshot
+_TRACE = {'snapshot': None}
+# objects which are not followed by deep_size
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+               types.MethodType)
+# the packages of the app objects imported by the tab modules
+_APP_MODULES = ('dash', 'flask', 'werkzeug')
+
+
+def deep_size(obj, seen=None):
+    """Returns the size of an object with all objects it refers to, frames and
+    arrays with their content (memory_usage(deep=True)). Objects in seen are
+    not counted again.
+
+    Parameters
+    ----------
+    obj : object
+        the object.
+    seen : set, optional
+        the ids of the objects already counted, by default None
+
+    Returns
+    -------
+    int:
+        the size in bytes.
+    """
+    # imported here, the app starts without pandas (deferred loading)
+    import numpy as np
+    import pandas as pd
+
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, _SKIP_TYPES):
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=True))
+    if isinstance(obj, pd.Index):
+        return int(obj.memory_usage(deep=True))
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in list(obj.items()))
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(i, seen) for i in list(obj))
+    elif hasattr(obj, '__dict__'):
+        size += deep_size(vars(obj), seen)
+
+    return size
+
+
+def find_frames(obj, path, seen=None):
+    """Yields the frames and series within an object (dictionaries, lists,
+    tuples and attributes).
+
+    Parameters
+    ----------
+    obj : object
+        the object.
+    path : str
+        the name of the object, e.g. 'tabs.expenditures_tab.load_data()'.
+    seen : set, optional
+        the ids of the objects already searched, by default None
+
+    Yields
+    ------
+    tuple:
+        the path and the frame or series.
+    """
+    import pandas as pd
+
+    if seen is None:
+        seen = set()
+    if id(obj) in seen or isinstance(obj, _SKIP_TYPES):
+        return
+    seen.add(id(obj))
+
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        yield path, obj
+    elif isinstance(obj, dict):
+        for k, v in list(obj.items()):
+            yield from find_frames(v, '{}[{!r}]'.format(path, k), seen)
+    elif isinstance(obj, (list, tuple)):
+        for i, v in enumerate(list(obj)):
+            yield from find_frames(v, '{}[{}]'.format(path, i), seen)
+    elif hasattr(obj, '__dict__') and not isinstance(obj, (str, bytes)):
+        for k, v in list(vars(obj).items()):
+            yield from find_frames(v, '{}.{}'.format(path, k), seen)
+
+
+def track_instance(obj):
+    """Registers a DataPreparation instance for the accounting, as long as it
+    lives."""
+    with _INSTANCES_LOCK:
+        _INSTANCES.add(obj)
+
+
+def current_rss():
+    """Returns the current resident set size of the process in MB (None if
+    /proc is not available)."""
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return round(pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2, 1)
+
+
+def _datasets(filenames):
+    """Returns the label of the datasets, e.g. 'umsatz_total.csv'."""
+    return '+'.join(os.path.basename(f) for f in filenames) if filenames else '-'
+
+
+def _owners():
+    """Yields the owners of memory: name, tab, datasets, tenant, object and
+    entries."""
+    for name, f in list(MEMOIZED.items()):
+        module = name.rsplit('.', 1)[0]
+        tab = module.split('.', 1)[1] if module.startswith('tabs.') else '-'
+        for tenant, cache in sorted(list(f.caches.items())):
+            with cache._lock:
+                values = list(cache._data.values())
+            yield ('{}()[{}]'.format(name, tenant), tab, _datasets(getattr(f, 'filenames', ())),
+                   tenant, values, len(values))
+
+    for module_name, module in list(sys.modules.items()):
+        if not module_name.startswith('tabs.') or module is None:
+            continue
+        for attr, value in list(vars(module).items()):
+            # the app and the server are not data of the tab
+            if attr.startswith('__') or isinstance(value, _SKIP_TYPES) \
+                    or type(value).__module__.split('.')[0] in _APP_MODULES:
+                continue
+            yield ('{}.{}'.format(module_name, attr), module_name.split('.', 1)[1],
+                   _datasets(getattr(value, 'filenames', ())), '-', value, None)
+
+    with _INSTANCES_LOCK:
+        instances = list(_INSTANCES)
+    for obj in instances:
+        filename = getattr(obj, 'filename', None)
+        yield ('{}({!r})'.format(type(obj).__name__, os.path.basename(filename or '')),
+               '-', _datasets([filename] if filename else ()), '-', obj, None)
+
+
+def memory_report(top=20):
+    """Returns the memory accounting of the process. Objects shared by
+    several owners are counted once, for the first owner (caches, tab
+    modules, instances).
+
+    Parameters
+    ----------
+    top : int, optional
+        the number of the largest frames, by default 20
+
+    Returns
+    -------
+    dict:
+        with the owners, the totals per tab, dataset and tenant and the
+        largest frames.
+    """
+    # keeps the lists of the cache entries alive, the ids in seen stay unique
+    found = list(_owners())
+    seen = set()
+    owners = []
+    tabs = {}
+    datasets = {}
+    tenants = {}
+    for name, tab, dataset, tenant, value, entries in found:
+        size = deep_size(value, seen)
+        if size == 0:
+            continue
+        owners.append({'owner': name, 'tab': tab, 'datasets': dataset, 'tenant': tenant,
+                       'entries': entries, 'bytes': size})
+        tabs[tab] = tabs.get(tab, 0) + size
+        datasets[dataset] = datasets.get(dataset, 0) + size
+        tenants[tenant] = tenants.get(tenant, 0) + size
+
+    frames = []
+    seen = set()
+    for name, tab, dataset, tenant, value, entries in found:
+        for path, frame in find_frames(value, name, seen):
+            frames.append({'frame': path, 'rows': len(frame.index),
+                           'columns': frame.shape[1] if frame.ndim == 2 else 1,
+                           'bytes': deep_size(frame)})
+    frames.sort(key=lambda f: -f['bytes'])
+
+    return {'pid': os.getpid(),
+            'rss_mb': current_rss(),
+            'accounted_bytes': sum(o['bytes'] for o in owners),
+            'tabs': tabs,
+            'datasets': datasets,
+            'tenants': tenants,
+            'owners': sorted(owners, key=lambda o: -o['bytes']),
+            'frames': frames[:top]}
+
+
+def tracemalloc_diff(limit=10):
+    """Takes a tracemalloc snapshot and returns the lines with the largest
+    differences to the last snapshot. The first call starts the tracing
+    (which slows down the process until stop_tracemalloc).
+
+    Parameters
+    ----------
+    limit : int, optional
+        the number of lines, by default 10
+
+    Returns
+    -------
+    dict:
+        with the differences (bytes and number of blocks) per line.
+    """
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+        _TRACE['snapshot'] = None
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(
+        (tracemalloc.Filter(False, tracemalloc.__file__),))
+    previous, _TRACE['snapshot'] = _TRACE['snapshot'], snapshot
+    if previous is None:
+        return {'tracing': True, 'started': True, 'diff': []}
+
+    return {'tracing': True, 'started': False,
+            'diff': [{'line': str(s.traceback), 'size_diff': s.size_diff, 'size': s.size,
+                      'count_diff': s.count_diff}
+                     for s in snapshot.compare_to(previous, 'lineno')[:limit]]}
+
+
+def stop_tracemalloc():
+    """Stops the tracing and drops the last snapshot."""
+    tracemalloc.stop()
+    _TRACE['snapshot'] = None
+
+    return {'tracing': False}
+
+
+def init_app(server, token=None):
+    """Adds the admin endpoints to the Flask server of the Dash app:
+
+        GET    /admin/memory              the memory accounting (?top=N)
+        GET    /admin/memory/tracemalloc  the differences to the last call
+                                          (the first call starts the tracing)
+        DELETE /admin/memory/tracemalloc  stops the tracing
+
+    Parameters
+    ----------
+    server : flask app
+        the server of the Dash app.
+    token : str, optional
+        the token expected in the header X-Admin-Token, by default None (then
+        the endpoints are switched off and answer 404)
+    """
+    from flask import abort, jsonify, request
+
+    def check_access():
+        """Answers 404 without a configured token and 403 with a wrong token.
+        Behind a reverse proxy every request comes from localhost, so the
+        address is not checked."""
+        if not token:
+            abort(404)
+        sent = request.headers.get('X-Admin-Token', '')
+        if not hmac.compare_digest(sent.encode('utf-8'), token.encode('utf-8')):
+            abort(403)
+
+    @server.route('/admin/memory')
+    def admin_memory():
+        check_access()
+        return jsonify(memory_report(top=request.args.get('top', 20, type=int)))
+
+    @server.route('/admin/memory/tracemalloc', methods=['GET', 'DELETE'])
+    def admin_tracemalloc():
+        check_access()
+        if request.method == 'DELETE':
+            return jsonify(stop_tracemalloc())
+        return jsonify(tracemalloc_diff(limit=request.args.get('limit', 10, type=int)))
+
+
+if __name__ == '__main__':
+    pass
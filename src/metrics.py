@@ -0,0 +1,245 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module collects metrics of the dashboard and renders them in the text
+format of Prometheus for the endpoint /metrics: latency histograms per route
+and callback, the payload sizes, the latency of the tab layouts, the load
+times of the datasets, the counters of the memoized functions (cache) and
+their memory per tenant. The
+metrics are kept per process, with several workers (gunicorn) every worker
+reports its own numbers. Every series is labelled with the pid of the process,
+so the scrapes of different workers are separate series (and not read as
+counter resets); sum them by the other labels in the queries. Observing a
+value costs a lock and a bisection.
+It includes the following class and functions:
+    Histogram
+    render()
+    init_app(server, app)
+
+"""
+
+# os func
+import os
+# time func
+import time
+# threading func
+import threading
+# bisection of the buckets
+from bisect import bisect_left
+
+from src.cache import cache_stats, budget_stats
+
+# buckets in seconds and bytes
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SIZE_BUCKETS = (1000, 5000, 10000, 50000, 100000, 500000, 1000000, 5000000)
+
+
+def _escape(value):
+    """Escapes a label value for the text format."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    """Returns the label set with the pid of the process, e.g.
+    {pid="42",route="/",le="0.5"}."""
+    pairs = [('pid', os.getpid())] + list(zip(names, values)) + list(extra)
+    return '{' + ','.join('{}="{}"'.format(n, _escape(v)) for n, v in pairs) + '}'
+
+
+class Histogram:
+    """A histogram with fixed buckets and a series per label set, like the
+    histogram of the Prometheus client.
+
+    Attributes
+    ----------
+
+    name : str
+    documentation : str
+    labelnames : tuple
+    buckets : tuple
+    _series : dict
+    _lock : threading.Lock
+
+    Methods
+    -------
+    observe(self, value, *labelvalues)
+    time(self, *labelvalues)
+    render(self)
+
+    """
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        """Inits Histogram with:
+
+        Parameters
+        ----------
+        name : str
+            the name of the metric.
+        documentation : str
+            the help text.
+        labelnames : tuple, optional
+            the names of the labels, by default ()
+        buckets : tuple, optional
+            the upper bounds of the buckets, by default LATENCY_BUCKETS
+        """
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labelvalues):
+        """Adds a value to the series of the label values."""
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labelvalues)
+            if series is None:
+                series = self._series[labelvalues] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def time(self, *labelvalues):
+        """Returns a context manager which observes the duration of its block."""
+        return _Timer(self, labelvalues)
+
+    def render(self):
+        """Returns the histogram in the text format of Prometheus."""
+        lines = ['# HELP {} {}'.format(self.name, self.documentation),
+                 '# TYPE {} histogram'.format(self.name)]
+        with self._lock:
+            series = {k: (list(v[0]), v[1]) for k, v in self._series.items()}
+        for labelvalues, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append('{}_bucket{} {}'.format(
+                    self.name, _labels(self.labelnames, labelvalues, [('le', bound)]), cumulative))
+            lines.append('{}_sum{} {}'.format(
+                self.name, _labels(self.labelnames, labelvalues), total))
+            lines.append('{}_count{} {}'.format(
+                self.name, _labels(self.labelnames, labelvalues), cumulative))
+
+        return '\n'.join(lines)
+
+
+class _Timer:
+    """Context manager of Histogram.time."""
+
+    def __init__(self, histogram, labelvalues):
+        self.histogram = histogram
+        self.labelvalues = labelvalues
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labelvalues)
+
+
+REQUEST_SECONDS = Histogram(
+    'dashboard_request_duration_seconds',
+    'Latency of the requests by route and callback.', ('route', 'callback'))
+RESPONSE_BYTES = Histogram(
+    'dashboard_response_size_bytes',
+    'Size of the responses (as sent, maybe compressed) by route and callback.',
+    ('route', 'callback'), buckets=SIZE_BUCKETS)
+LAYOUT_SECONDS = Histogram(
+    'dashboard_layout_duration_seconds',
+    'Latency of the tab layouts by tab.', ('tab',))
+DATASET_LOAD_SECONDS = Histogram(
+    'dashboard_dataset_load_seconds',
+    'Time for loading a dataset (storage file) into a dataframe.', ('dataset',))
+
+HISTOGRAMS = (REQUEST_SECONDS, RESPONSE_BYTES, LAYOUT_SECONDS, DATASET_LOAD_SECONDS)
+
+# counters of the memoized functions (see cache.cache_stats)
+CACHE_COUNTERS = (
+    ('hits', 'dashboard_cache_hits_total', 'counter', 'Results served from the cache in memory.'),
+    ('misses', 'dashboard_cache_misses_total', 'counter', 'Calls not found in the cache in memory.'),
+    ('computations', 'dashboard_cache_computations_total', 'counter', 'Computations of a result.'),
+    ('coalesced', 'dashboard_cache_coalesced_total', 'counter',
+     'Computations saved by waiting for an identical running computation.'),
+    ('size', 'dashboard_cache_entries', 'gauge', 'Entries in the cache in memory.'),
+)
+
+# memory of the memoized results per tenant (see cache.budget_stats)
+BUDGET_COUNTERS = (
+    ('bytes', 'dashboard_tenant_cache_bytes', 'gauge',
+     'Memory of the cached results of a tenant (measured with TENANT_CACHE_MB).'),
+    ('evictions', 'dashboard_tenant_cache_evictions_total', 'counter',
+     'Results dropped to keep the memory bound of a tenant.'),
+)
+
+
+def render():
+    """Returns all metrics in the text format of Prometheus.
+
+    Returns
+    -------
+    str:
+        the metrics.
+    """
+    parts = [h.render() for h in HISTOGRAMS]
+    stats = cache_stats()
+    for key, name, kind, documentation in CACHE_COUNTERS:
+        lines = ['# HELP {} {}'.format(name, documentation), '# TYPE {} {}'.format(name, kind)]
+        lines += ['{}{} {}'.format(name, _labels(('function',), (function,)), s[key])
+                  for function, s in sorted(stats.items())]
+        parts.append('\n'.join(lines))
+    budgets = budget_stats()
+    for key, name, kind, documentation in BUDGET_COUNTERS:
+        lines = ['# HELP {} {}'.format(name, documentation), '# TYPE {} {}'.format(name, kind)]
+        lines += ['{}{} {}'.format(name, _labels(('tenant',), (tenant,)), b[key])
+                  for tenant, b in sorted(budgets.items())]
+        parts.append('\n'.join(lines))
+
+    return '\n'.join(parts) + '\n'
+
+
+def init_app(server, app):
+    """Measures the requests of the Flask server of the Dash app and adds the
+    endpoint /metrics. It has to be called before other after_request
+    functions are registered (e.g. Flask-Compress), so the size is measured
+    as sent.
+
+    Parameters
+    ----------
+    server : flask app
+        the server of the Dash app.
+    app : dash app
+        the Dash app, for the names of the callbacks.
+    """
+    from flask import g, request
+
+    def callback_name():
+        """Returns the name of the callback of a _dash-update-component request."""
+        body = request.get_json(silent=True) or {}
+        callback = app.callback_map.get(body.get('output'), {}).get('callback')
+        if callback is None:
+            return body.get('output', '')
+        return '{}.{}'.format(callback.__module__, callback.__name__)
+
+    @server.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @server.after_request
+    def observe(response):
+        start = g.pop('metrics_start', None)
+        if start is None or request.path == '/metrics':
+            return response
+        route = request.url_rule.rule if request.url_rule is not None else 'other'
+        callback = callback_name() if request.path.endswith('_dash-update-component') else ''
+        REQUEST_SECONDS.observe(time.perf_counter() - start, route, callback)
+        if not response.direct_passthrough and response.content_length is not None:
+            RESPONSE_BYTES.observe(response.content_length, route, callback)
+        return response
+
+    @server.route('/metrics')
+    def metrics():
+        return server.response_class(render(), mimetype='text/plain; version=0.0.4')
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module provides a partitioned group-by summation which runs in a pool
+of worker processes. The pool is started once by start_pool, at the start of
+the process before any threads run (dashboard/index.py at import time), so no
+process is ever forked from a threaded server (a forked child could inherit
+locks held by other threads, e.g. of logging or the memoization). The rows are
+split by a partition key (e.g. the year), every worker sums a chunk of
+partitions and the small partial results are merged in the parent. Below a
+threshold of rows, without a pool or in another process than the one which
+started it (e.g. the forked gunicorn workers) the summation stays
+single-threaded in pandas. It is used by the classes Collection and LoanColl in
+data_prep (switched on by DATA_PREP_PARALLEL, the number of processes is
+DATA_PREP_WORKERS in configuration.py).
+
+    start_pool(workers=0)
+    stop_pool()
+    partitioned_groupby_sum(df, by, value_cols, partition, threshold=None)
+
+"""
+
+# os func
+import os
+# process pool
+import multiprocessing
+# numpy func
+import numpy as np
+# pandas func
+import pandas as pd
+
+# below this number of rows the aggregation stays single-threaded
+PARALLEL_THRESHOLD = 200000
+
+# the pool of worker processes, the process which started it and its size
+_POOL = {'pool': None, 'pid': None, 'workers': 0}
+
+
+def start_pool(workers=0):
+    """Starts the pool of worker processes (only once). Call it before any
+    threads are started, all workers are forked at once.
+
+    Parameters
+    ----------
+    workers : int, optional
+        the number of worker processes, by default 0 (one per core)
+
+    Returns
+    -------
+    int:
+        the number of worker processes, 0 if the pool is not available (one
+        core or no fork start method).
+    """
+    if _POOL['pool'] is not None:
+        return _POOL['workers']
+
+    workers = workers or os.cpu_count() or 1
+    if workers < 2 or 'fork' not in multiprocessing.get_all_start_methods():
+        return 0
+
+    _POOL.update(pool=multiprocessing.get_context('fork').Pool(workers),
+                 pid=os.getpid(), workers=workers)
+
+    return workers
+
+
+def stop_pool():
+    """Stops the pool of worker processes."""
+    if _POOL['pool'] is not None and _POOL['pid'] == os.getpid():
+        _POOL['pool'].terminate()
+        _POOL['pool'].join()
+    _POOL.update(pool=None, pid=None, workers=0)
+
+
+def _sum_chunk(df, keys, value_cols):
+    """Sums the rows of a chunk of partitions, runs in a worker process.
+
+    Returns
+    -------
+    dataframe or series:
+        the partial sums indexed by the group keys.
+    """
+    return df.groupby(keys)[value_cols].sum()
+
+
+def partitioned_groupby_sum(df, by, value_cols, partition, threshold=None):
+    """Returns the sum of the value columns grouped by the keys, like
+    df.groupby(by)[value_cols].sum(). Frames with at least threshold rows are
+    split by the partition key and summed in the pool of worker processes (if
+    it was started by this process).
+
+    Parameters
+    ----------
+    df : dataframe
+        the data which will be grouped.
+    by : str, array or list
+        the group keys, column names or arrays (e.g. df.index.year).
+    value_cols : str or list
+        the column(s) which will be summed. A str returns a series.
+    partition : array
+        the partition key for every row, e.g. the year.
+    threshold : int, optional
+        the minimal number of rows for the parallel mode, by default None
+        (PARALLEL_THRESHOLD)
+
+    Returns
+    -------
+    dataframe or series:
+        with the sums indexed by the group keys.
+    """
+    pool = _POOL['pool'] if _POOL['pid'] == os.getpid() else None
+    threshold = PARALLEL_THRESHOLD if threshold is None else threshold
+    if pool is None or len(df.index) < threshold:
+        return df.groupby(by)[value_cols].sum()
+
+    by = by if isinstance(by, list) else [by]
+    keys = [key if isinstance(key, str) else pd.Index(key) for key in by]
+    # only the needed columns are sent to the workers
+    cols = [key for key in keys if isinstance(key, str)]
+    cols += [col for col in ([value_cols] if isinstance(value_cols, str) else value_cols)
+             if col not in cols]
+    data = df[cols]
+
+    # row positions sorted by partition, every partition is a contiguous range
+    partition_codes = pd.factorize(np.asarray(partition), sort=True)[0]
+    positions = np.argsort(partition_codes, kind='mergesort')
+    bounds = np.flatnonzero(np.diff(partition_codes[positions])) + 1
+    bounds = np.concatenate([[0], bounds, [len(positions)]])
+    # contiguous chunks of partitions, a few per worker for a balanced load
+    chunks = np.array_split(np.arange(len(bounds) - 1), _POOL['workers'] * 2)
+    tasks = []
+    for chunk in chunks:
+        if len(chunk):
+            rows = positions[bounds[chunk[0]]:bounds[chunk[-1] + 1]]
+            tasks.append((data.iloc[rows],
+                          [key if isinstance(key, str) else key[rows] for key in keys],
+                          value_cols))
+    partials = pool.starmap(_sum_chunk, tasks)
+
+    # merge the partial results, a key may occur in several partitions
+    result = pd.concat(partials)
+    result = result.groupby(level=list(range(result.index.nlevels))).sum()
+    # same index names as a plain groupby
+    result.index.names = [key if isinstance(key, str) else key.name for key in keys]
+
+    return result
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module provides opt-in profiling hooks for the public methods of the
+classes DataPreparation (and its subclasses) and CleanPreProcDf. Every call
+within a report records the wall time, the rows of the frame before and after
+the call, the memory of the frame (shallow, without the content of object
+columns) and how often the frame attribute was rebound to a new frame (a
+copy). The calls are aggregated per method into a report per request (see
+dashboard/app.py) or per import (the scripts in src/instances).
+
+Profiling is off by default. It is switched on by the environment variable
+DASHBOARD_PROFILING=1, by enable() or at runtime without a restart by creating
+the flag file PROFILING_FLAG_FILE (checked at most once per second). Without
+profiling a hooked method costs one extra function call and a flag check.
+It includes the following class and functions:
+    Report
+    is_enabled()
+    enable()
+    disable()
+    report(name)
+    profile_methods(frame_attr='_df')
+
+"""
+
+# os func
+import os
+# inspect func
+import inspect
+# sys func
+import sys
+# time func
+import time
+# json func
+import json
+# threading func
+import threading
+# context managers and decorators
+from contextlib import contextmanager
+from functools import wraps
+
+# the flag file which switches profiling on at runtime
+PROFILING_FLAG_FILE = os.environ.get(
+    'DASHBOARD_PROFILING_FLAG', os.path.join(os.path.expanduser('~'), '.dashboard_profiling'))
+
+_STATE = {'enabled': os.environ.get('DASHBOARD_PROFILING', '0') == '1',
+          'flag': False, 'checked': 0.0}
+# the active report and the stack of running calls per thread
+_LOCAL = threading.local()
+
+
+def is_enabled():
+    """Returns True if profiling is switched on (environment variable,
+    enable() or flag file)."""
+    if _STATE['enabled']:
+        return True
+    now = time.monotonic()
+    if now - _STATE['checked'] > 1.0:
+        _STATE['checked'] = now
+        _STATE['flag'] = os.path.exists(PROFILING_FLAG_FILE)
+    return _STATE['flag']
+
+
+def enable():
+    """Switches profiling on."""
+    _STATE['enabled'] = True
+
+
+def disable():
+    """Switches profiling off (unless the flag file exists)."""
+    _STATE['enabled'] = False
+
+
+class Report:
+    """The aggregated calls of the hooked methods per method.
+
+    Attributes
+    ----------
+
+    name : str
+    methods : dict
+    start : float
+    wall_time : float
+
+    Methods
+    -------
+    add(self, method, seconds, rows_in, rows_out, memory, rebinds)
+    to_dict(self)
+    to_text(self)
+
+    """
+
+    def __init__(self, name):
+        """Inits Report with:
+
+        Parameters
+        ----------
+        name : str
+            the name of the request or import.
+        """
+        self.name = name
+        self.methods = {}
+        self.start = time.perf_counter()
+        self.wall_time = None
+
+    def add(self, method, seconds, rows_in, rows_out, memory, rebinds):
+        """Adds one call of a method."""
+        m = self.methods.setdefault(method, {
+            'calls': 0, 'seconds': 0.0, 'rows_in': 0, 'rows_out': 0,
+            'max_memory_bytes': 0, 'rebinds': 0})
+        m['calls'] += 1
+        m['seconds'] += seconds
+        m['rows_in'] += rows_in or 0
+        m['rows_out'] += rows_out or 0
+        m['max_memory_bytes'] = max(m['max_memory_bytes'], memory or 0)
+        m['rebinds'] += rebinds
+
+    def to_dict(self):
+        """Returns the report as dictionary, the slowest methods first."""
+        methods = sorted(self.methods.items(), key=lambda m: -m[1]['seconds'])
+        return {'report': self.name, 'wall_time': self.wall_time,
+                'methods': dict(methods)}
+
+    def to_text(self):
+        """Returns the report as table."""
+        lines = ['profile {} ({:.1f} ms)'.format(self.name, (self.wall_time or 0) * 1000),
+                 '    {:<55} {:>6} {:>10} {:>10} {:>10} {:>10} {:>8}'.format(
+                     'method', 'calls', 'ms', 'rows in', 'rows out', 'MB', 'rebinds')]
+        for method, m in self.to_dict()['methods'].items():
+            lines.append('    {:<55} {:>6} {:>10.1f} {:>10} {:>10} {:>10.1f} {:>8}'.format(
+                method, m['calls'], m['seconds'] * 1000, m['rows_in'], m['rows_out'],
+                m['max_memory_bytes'] / 1e6, m['rebinds']))
+        return '\n'.join(lines)
+
+
+@contextmanager
+def report(name, output=sys.stderr, as_json=True):
+    """Collects the calls of the hooked methods in this thread into a report
+    and writes it at the end (if profiling is switched on).
+
+    Parameters
+    ----------
+    name : str
+        the name of the request or import.
+    output : file, optional
+        where the report is written, by default sys.stderr (None = not written)
+    as_json : bool, optional
+        one JSON line instead of a table, by default True
+
+    Yields
+    ------
+    Report or None:
+        the report, None if profiling is off.
+    """
+    if not is_enabled() or getattr(_LOCAL, 'report', None) is not None:
+        yield None
+        return
+    _LOCAL.report = Report(name)
+    _LOCAL.stack = []
+    try:
+        yield _LOCAL.report
+    finally:
+        r = _LOCAL.report
+        r.wall_time = time.perf_counter() - r.start
+        _LOCAL.report = None
+        if output is not None and r.methods:
+            print(json.dumps(r.to_dict()) if as_json else r.to_text(), file=output)
+
+
+def _rows(obj):
+    """Returns the rows of a frame or series, otherwise None."""
+    # imported here, the app starts without pandas (deferred loading)
+    import pandas as pd
+    if isinstance(obj, (pd.DataFrame, pd.Series)):
+        return len(obj.index)
+    return None
+
+
+def _memory(obj):
+    """Returns the shallow memory of a frame or series, otherwise None."""
+    import pandas as pd
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(index=True, deep=False).sum())
+    if isinstance(obj, pd.Series):
+        return int(obj.memory_usage(index=True, deep=False))
+    return None
+
+
+def _hook(cls, name, func, frame_attr):
+    """Returns the profiled version of a method."""
+    method = '{}.{}'.format(cls.__name__, name)
+
+    @wraps(func)
+    def wrapper(self, *args, **kwargs):
+        r = getattr(_LOCAL, 'report', None)
+        if r is None:
+            return func(self, *args, **kwargs)
+
+        rows_in = _rows(self.__dict__.get(frame_attr))
+        # counts the rebinds of the frame attribute during this call
+        call = {'rebinds': 0, 'obj': self}
+        _LOCAL.stack.append(call)
+        start = time.perf_counter()
+        try:
+            result = func(self, *args, **kwargs)
+        finally:
+            seconds = time.perf_counter() - start
+            _LOCAL.stack.pop()
+        frame = result if _rows(result) is not None else self.__dict__.get(frame_attr)
+        r.add(method, seconds, rows_in, _rows(frame), _memory(frame), call['rebinds'])
+        # the rebinds also count for the calling method
+        if _LOCAL.stack:
+            _LOCAL.stack[-1]['rebinds'] += call['rebinds']
+
+        return result
+
+    return wrapper
+
+
+def profile_methods(frame_attr='_df'):
+    """Returns a class decorator which hooks the public methods defined in the
+    class (not the inherited ones, their class is decorated itself).
+
+    Parameters
+    ----------
+    frame_attr : str, optional
+        the name of the attribute with the frame, by default '_df'
+
+    Returns
+    -------
+    function:
+        the class decorator.
+    """
+    def decorator(cls):
+        for name, func in list(vars(cls).items()):
+            if not name.startswith('_') and inspect.isfunction(func):
+                setattr(cls, name, _hook(cls, name, func, frame_attr))
+
+        if not getattr(cls, '_profiling_setattr', False):
+            base_setattr = cls.__setattr__
+
+            def __setattr__(self, name, value):
+                if name == frame_attr:
+                    stack = getattr(_LOCAL, 'stack', None)
+                    if stack and getattr(_LOCAL, 'report', None) is not None \
+                            and self.__dict__.get(frame_attr) is not value:
+                        stack[-1]['rebinds'] += 1
+                base_setattr(self, name, value)
+
+            cls.__setattr__ = __setattr__
+            cls._profiling_setattr = True
+
+        return cls
+
+    return decorator
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,642 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module provides an optional in-process SQL backend for the classes of
+data_prep. The storage files are registered as tables (SQLite) or as views
+directly over the csv files (DuckDB, if installed) and the aggregations are
+pushed down as SQL queries. The pandas classes stay the default, the SQL
+classes return the same results. The tabs use them with DATA_BACKEND = 'sql'
+(see configuration.py). It includes the following classes:
+    SqlBackend
+    SqlExpenditures
+    SqlCollection
+    SqlReadingRoom
+    SqlLoanColl
+
+and the function compare_backends(cls_pandas, cls_sql, filename, method, **kwargs)
+which checks both backends for identical results (see tests/test_sql_backend.py).
+
+All public methods of Expenditures, Collection, ReadingRoom and LoanColl run as
+queries. The generic methods of DataPreparation (change_col_val,
+get_specific_dates_dataframe, top_number_values, groupby_sum) change the frame
+step by step, they load the storage file into pandas on first use.
+
+"""
+
+# os func
+import os
+# regex func
+import re
+# hash func
+import hashlib
+# datetime func
+import datetime
+# sqlite
+import sqlite3
+# threading func
+import threading
+# numpy func
+import numpy as np
+# pandas func
+import pandas as pd
+
+from src.data_prep import DataPreparation, Expenditures, Collection, ReadingRoom, LoanColl
+from src.utils import get_dates_list, read_csv_file_in_dict
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+
+def quote(name):
+    """Returns a quoted SQL identifier, e.g. for 'Umsatz (EUR)'."""
+    return '"{}"'.format(name.replace('"', '""'))
+
+
+def _type_kind(sql_type):
+    """Returns 'integer', 'float' or 'other' for the type of a column, e.g.
+    'BIGINT' (DuckDB) or 'REAL' (SQLite)."""
+    sql_type = sql_type.upper()
+    if sql_type == 'INTEGER' or sql_type.endswith('INT'):
+        return 'integer'
+    if sql_type in ('REAL', 'DOUBLE', 'FLOAT') or sql_type.startswith(('DECIMAL', 'NUMERIC')):
+        return 'float'
+    return 'other'
+
+
+class SqlBackend:
+    """Registers storage files in an embedded database (no server) and runs
+    queries on them. DuckDB creates views over the csv files, SQLite loads them
+    into in-memory tables which are reloaded when the file changes. Every
+    process has its own backend, a connection is not used across a fork.
+
+    Attributes
+    ----------
+
+    engine : str
+    pid : int
+    _con : connection
+    _tables : dict
+    _lock : threading.Lock
+
+    Methods
+    -------
+    register(self, filename)
+    query(self, sql, params=())
+    column_types(self, filename)
+    default(cls)
+
+    """
+    _default = None
+
+    def __init__(self, engine='auto'):
+        """Inits SqlBackend with an in-memory database.
+
+        Parameters
+        ----------
+        engine : str, optional
+            'duckdb', 'sqlite' or 'auto' (duckdb if installed), by default 'auto'
+        """
+        if engine == 'auto':
+            engine = 'duckdb' if duckdb is not None else 'sqlite'
+        if engine == 'duckdb' and duckdb is None:
+            raise ImportError('duckdb is not installed.')
+        self.engine = engine
+        self.pid = os.getpid()
+        if engine == 'duckdb':
+            self._con = duckdb.connect(':memory:')
+        else:
+            self._con = sqlite3.connect(':memory:', check_same_thread=False)
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """Returns the backend which is shared by the SQL classes of this process."""
+        if cls._default is None or cls._default.pid != os.getpid():
+            cls._default = cls()
+        return cls._default
+
+    def register(self, filename):
+        """Registers a storage file as a table or view and returns its name.
+        Every table has a column _row with the row number of the file. The
+        name contains a hash of the path, the files of several tenants have
+        the same names.
+
+        Parameters
+        ----------
+        filename : str
+            the path of the storage file.
+
+        Returns
+        -------
+        str:
+            the name of the table.
+        """
+        mtime = os.path.getmtime(filename)
+        with self._lock:
+            name, registered = self._tables.get(filename, (None, None))
+            if name is not None and (self.engine == 'duckdb' or registered == mtime):
+                return name
+
+            name = '{}_{}'.format(
+                re.sub(r'\W', '_', os.path.splitext(os.path.basename(filename))[0]),
+                hashlib.sha1(os.path.abspath(filename).encode('utf-8')).hexdigest()[:8])
+            if self.engine == 'duckdb':
+                self._con.execute(
+                    "CREATE OR REPLACE VIEW {} AS SELECT row_number() OVER () - 1 AS _row, * "
+                    "FROM read_csv_auto('{}', header=True)".format(
+                        quote(name), filename.replace("'", "''")))
+            else:
+                df = pd.read_csv(filename)
+                df.insert(0, '_row', np.arange(len(df.index)))
+                df.to_sql(name, self._con, if_exists='replace', index=False)
+            self._tables[filename] = (name, mtime)
+
+        return name
+
+    def query(self, sql, params=()):
+        """Runs a query and returns the result as a dataframe.
+
+        Parameters
+        ----------
+        sql : str
+            the query, parameters as '?'.
+        params : tuple, optional
+            the parameters of the query, by default ()
+
+        Returns
+        -------
+        dataframe:
+            with the result of the query.
+        """
+        with self._lock:
+            if self.engine == 'duckdb':
+                return self._con.execute(sql, list(params)).df()
+            return pd.read_sql_query(sql, self._con, params=list(params))
+
+    def column_types(self, filename):
+        """Returns the types of the columns of a storage file, taken from the
+        schema of the whole table (not from a sample of the rows).
+
+        Parameters
+        ----------
+        filename : str
+            the path of the storage file.
+
+        Returns
+        -------
+        dict:
+            with 'integer', 'float' or 'other' by column, in the order of the file.
+        """
+        name = quote(self.register(filename))
+        if self.engine == 'duckdb':
+            schema = self.query('DESCRIBE SELECT * FROM {}'.format(name))
+            types = zip(schema['column_name'], schema['column_type'])
+        else:
+            schema = self.query('PRAGMA table_info({})'.format(name))
+            types = zip(schema['name'], schema['type'])
+
+        return {col: _type_kind(t) for col, t in types if col != '_row'}
+
+
+class _SqlMixin:
+    """Runs the methods of a data_prep class as SQL queries. The dataframe of
+    the pandas class is only loaded if a method without SQL is called.
+    """
+
+    def __init__(self, filename, backend=None, **kwargs):
+        """Inits the SQL class with the backend and registers the file.
+
+        Parameters
+        ----------
+        filename : str
+            the name of the file.
+        backend : SqlBackend, optional
+            the backend, by default None (the shared default backend)
+        """
+        self._frame = None
+        self._sql = backend or SqlBackend.default()
+        super().__init__(filename, **kwargs)
+        self._table = quote(self._sql.register(filename))
+
+    @property
+    def _df(self):
+        """The dataframe of the pandas class, loaded on first use."""
+        if self._frame is None:
+            DataPreparation.create_dataframe(self, self.filename)
+        return self._frame
+
+    @_df.setter
+    def _df(self, value):
+        self._frame = value
+
+    def create_dataframe(self, filename, encoding='utf-8'):
+        """Checks the file, but defers loading the dataframe."""
+        if not os.path.exists(filename):
+            raise FileNotFoundError('File does not exists.')
+        return None
+
+    def _rows(self, sql, params=()):
+        """Returns the rows of a query (with the column _row) like read_csv
+        does: indexed by the row number, dates as strings."""
+        df = self._sql.query(sql, params).set_index('_row')
+        df.index.name = None
+        for col in df.select_dtypes('datetime').columns:
+            df[col] = df[col].dt.strftime('%Y-%m-%d')
+
+        return df
+
+    def _specific_dates(self, col_name_date):
+        """Returns the dates of get_specific_dates_dataframe as a SQL condition
+        and its parameters."""
+        dates = get_dates_list()
+        date_max = self._sql.query('SELECT CAST(MAX({0}) AS VARCHAR) AS m FROM {1}'.format(
+            quote(col_name_date), self._table))['m'][0]
+        if date_max not in dates:
+            dates[-1] = date_max
+
+        return 'CAST({} AS VARCHAR) IN ({})'.format(
+            quote(col_name_date), ', '.join('?' * len(dates))), tuple(dates)
+
+    def _specific_dates_rows(self, col_name_date, where='1 = 1', params=()):
+        """Returns the rows of the specific dates, like
+        get_specific_dates_dataframe."""
+        dates, dates_params = self._specific_dates(col_name_date)
+        df = self._rows('SELECT * FROM {} WHERE {} AND {} ORDER BY CAST({} AS VARCHAR), _row'.format(
+            self._table, dates, where, quote(col_name_date)), dates_params + params)
+        df = df.set_index(col_name_date)
+        df[col_name_date] = pd.to_datetime(df.index.astype(str).str.split('-').str[0]).year
+
+        return df
+
+    @staticmethod
+    def _year(col_name_date):
+        """Returns the year of a date column as SQL expression."""
+        return 'CAST(SUBSTR(CAST({} AS VARCHAR), 1, 4) AS INTEGER)'.format(quote(col_name_date))
+
+    def _first_shelfmarks(self, col_name_shelfmark, where='1 = 1'):
+        """Returns a subquery with the first row of every shelfmark and all the
+        rows of the shelfmarks '/' and 'Signatur', like the filter of the
+        duplicates in Collection."""
+        return '''(
+            SELECT * FROM (
+                SELECT *, ROW_NUMBER() OVER (PARTITION BY {s} ORDER BY _row) AS _rn
+                FROM {t} WHERE {w}) AS numbered
+            WHERE {s} IN ('/', 'Signatur') OR _rn = 1) AS first_rows'''.format(
+            s=quote(col_name_shelfmark), t=self._table, w=where)
+
+    def _sum_numeric(self, exclude):
+        """Returns the SQL sums of all numeric columns except the excluded ones
+        (like groupby().sum()) and the names of the integer columns."""
+        types = self._sql.column_types(self.filename)
+        numeric = [col for col, kind in types.items()
+                   if kind != 'other' and col not in exclude]
+        integer = [col for col in numeric if types[col] == 'integer']
+        sums = ', '.join('COALESCE(SUM({0}), 0) AS {0}'.format(quote(col)) for col in numeric)
+
+        return sums, integer
+
+    def _top_values(self, source, where, params, col_name_class, col_name_value, new_value, number):
+        """Returns the sum of a column by class with the not top number classes
+        replaced by a new value, like top_number_values."""
+        sql = '''
+            WITH sums AS (
+                SELECT {c} AS c, COALESCE(SUM({v}), 0) AS s FROM {t}
+                WHERE {w} AND {c} IS NOT NULL GROUP BY {c}),
+            ranked AS (
+                SELECT c, s, ROW_NUMBER() OVER (ORDER BY s DESC, c) AS rn FROM sums)
+            SELECT CASE WHEN rn <= ? THEN c ELSE ? END AS {c}, SUM(s) AS {v}
+            FROM ranked GROUP BY 1 ORDER BY 1
+        '''.format(c=quote(col_name_class), v=quote(col_name_value), t=source, w=where)
+
+        return self._sql.query(sql, params + (number, new_value))
+
+
+class SqlExpenditures(_SqlMixin, Expenditures):
+    """Expenditures with the aggregations pushed down to SQL.
+
+    Methods
+    -------
+    total_expnd_net(self, col_name_date, col_name_expnd)
+    total_expnd_mean_by_body(self, col_name_date, col_name_expnd, col_name_body, body='Antiquariat')
+    total_expnd_net_year_by_body(self, col_name_date, col_name_body, body='Antiquariat')
+    total_expnd_net_current_year(self, col_name_date, col_name_expnd)
+    total_expnd_net_current_year_by_body(self, col_name_date, col_name_expnd, col_name_body, body='Antiquariat')
+    total_expnd_net_years(self, col_name_date)
+    total_expnd_net_year(self, col_name_date, col_name_body, col_name_expnd, col_name_expnd_diff, body='Antiquariat')
+    total_expnd_by_bodies_above_value(self, col_name_date, col_name_body, col_name_expnd, number=7)
+    """
+
+    def total_expnd_net(self, col_name_date, col_name_expnd):
+        """Returns the total expenditures overall, see Expenditures."""
+        where, params = self._specific_dates(col_name_date)
+        total = self._sql.query('SELECT SUM({}) AS s FROM {} WHERE {}'.format(
+            quote(col_name_expnd), self._table, where), params)['s'][0]
+
+        return np.float64(total or 0).round(2)
+
+    def total_expnd_mean_by_body(self, col_name_date, col_name_expnd, col_name_body, body='Antiquariat'):
+        """Returns the average of expenditures for one body, see Expenditures."""
+        where, params = self._specific_dates(col_name_date)
+        mean = self._sql.query('SELECT AVG(COALESCE({}, 0)) AS m FROM {} WHERE {} AND {} = ?'.format(
+            quote(col_name_expnd), self._table, where, quote(col_name_body)), params + (body,))['m'][0]
+
+        return np.float64(np.nan if mean is None else mean)
+
+    def total_expnd_net_year_by_body(self, col_name_date, col_name_body, body='Antiquariat'):
+        """Returns the rows of the specific dates for one body, see Expenditures."""
+        return self._specific_dates_rows(col_name_date, '{} = ?'.format(quote(col_name_body)),
+                                         (body,))
+
+    def _current_year_sum(self, col_name_date, col_name_expnd, where='1 = 1', params=()):
+        """Returns the sum of the expenditures for the max date."""
+        total = self._sql.query(
+            'SELECT SUM({e}) AS s FROM {t} WHERE {d} = (SELECT MAX({d}) FROM {t}) AND {w}'.format(
+                e=quote(col_name_expnd), t=self._table, d=quote(col_name_date), w=where),
+            params)['s'][0]
+
+        return np.float64(total or 0)
+
+    def total_expnd_net_current_year(self, col_name_date, col_name_expnd):
+        """Returns total expenditures for the current year, see Expenditures."""
+        return self._current_year_sum(col_name_date, col_name_expnd)
+
+    def total_expnd_net_current_year_by_body(self, col_name_date, col_name_expnd, col_name_body, body='Antiquariat'):
+        """Returns the total expenditure for one body for the current year, see Expenditures."""
+        return self._current_year_sum(col_name_date, col_name_expnd,
+                                      '{} = ?'.format(quote(col_name_body)), (body,)).round(2)
+
+    def total_expnd_net_years(self, col_name_date):
+        """Returns the rows of the specific dates, see Expenditures."""
+        return self._specific_dates_rows(col_name_date)
+
+    def total_expnd_net_year(self, col_name_date, col_name_body, col_name_expnd, col_name_expnd_diff, body='Antiquariat'):
+        """Returns the rows of the current year with the monthly difference, see
+        Expenditures."""
+        self._curr_year = datetime.datetime.now().year
+        where, params = 'CAST({} AS VARCHAR) LIKE ?'.format(quote(col_name_date)), (
+            '%{}%'.format(self._curr_year),)
+        if body is not None:
+            where, params = where + ' AND {} = ?'.format(quote(col_name_body)), params + (body,)
+        df = self._rows('SELECT * FROM {} WHERE {} ORDER BY CAST({} AS VARCHAR), _row'.format(
+            self._table, where, quote(col_name_date)), params)
+
+        if body is not None:
+            df[col_name_expnd_diff] = df[col_name_expnd].diff().fillna(df[col_name_expnd])
+        else:
+            df[col_name_expnd_diff] = df.groupby(col_name_body)[
+                col_name_expnd].diff().fillna(df[col_name_expnd])
+
+        return df
+
+    def total_expnd_by_bodies_above_value(self, col_name_date, col_name_body, col_name_expnd, number=7):
+        """Returns a dataframe with just top n values grouped and sum by a column, see Expenditures."""
+        where, params = self._specific_dates(col_name_date)
+
+        return self._top_values(self._table, where, params, col_name_body, col_name_expnd,
+                                'Sonstige', number)
+
+
+class SqlCollection(_SqlMixin, Collection):
+    """Collection with the aggregations pushed down to SQL.
+
+    Methods
+    -------
+    total_collection_years(self, col_name_date, col_name_shelfmark, col_name_cum_sum='Gesamt')
+    development_collection_current_year(self, col_name_date, col_name_shelfmark)
+    development_media_type_years(self, file, col_name_media_type,
+        col_name_shelfmark, col_name_date, col_name_year, col_name_copy)
+    development_by_classification(self, col_name_date, col_name_year, col_name_class, body)
+    development_cumsum(self, col_name_shelfmark, col_name_date, col_name_copy,
+        col_name_year='Jahr', col_name_month='Monat', col_name_cum='cum_s')
+    development_collection_top_class_years(self, col_name_class,
+        col_name_shelfmark, col_name_date, col_name_copy)
+    development_collection_class_overall_top(self, col_name_date, col_name_shelfmark,
+        col_name_class, col_name_copy, number=9)
+    """
+
+    def total_collection_years(self, col_name_date, col_name_shelfmark, col_name_cum_sum='Gesamt'):
+        """Returns the collection numbers by year and the cumulated sum, see Collection."""
+        sums, integer = self._sum_numeric(exclude=[col_name_date])
+        sql = 'SELECT {y} AS {d}, {sums} FROM {f} WHERE {d} IS NOT NULL GROUP BY 1 ORDER BY 1'.format(
+            y=self._year(col_name_date), d=quote(col_name_date), sums=sums,
+            f=self._first_shelfmarks(col_name_shelfmark))
+        df = self._sql.query(sql).set_index(col_name_date)
+        df[integer] = df[integer].astype(np.int64)
+        df[col_name_cum_sum] = df.cumsum()
+
+        return df
+
+    def development_collection_current_year(self, col_name_date, col_name_shelfmark):
+        """Returns the new shelfmarks per month of the current year, see Collection."""
+        self._curr_year = datetime.datetime.now().year
+        sql = '''
+            SELECT SUBSTR(CAST({d} AS VARCHAR), 1, 7) AS m, COUNT({s}) AS n FROM {f}
+            WHERE {s} IS NOT NULL GROUP BY 1 ORDER BY 1
+        '''.format(d=quote(col_name_date), s=quote(col_name_shelfmark),
+                   f=self._first_shelfmarks(
+                       col_name_shelfmark, 'CAST({} AS VARCHAR) LIKE ?'.format(quote(col_name_date))))
+        df = self._sql.query(sql, ('%{}%'.format(self._curr_year),))
+        counts = pd.Series(df['n'].to_numpy(dtype=np.int64), name=col_name_shelfmark,
+                           index=pd.DatetimeIndex(pd.to_datetime(df['m'] + '-01'), name=col_name_date))
+        # the months without new shelfmarks count 0, indexed by the month end
+        counts = counts.resample('M').sum()
+
+        return counts.groupby(counts.index).sum()
+
+    def development_media_type_years(self, file, col_name_media_type, col_name_shelfmark, col_name_date, col_name_year, col_name_copy):
+        """Returns the copies by year and media type, see Collection."""
+        sql = '''
+            SELECT {y} AS {d}, {m} AS {m}, COALESCE(SUM({c}), 0) AS {c} FROM {f}
+            WHERE {d} IS NOT NULL GROUP BY 1, 2
+        '''.format(y=self._year(col_name_date), d=quote(col_name_date), m=quote(col_name_media_type),
+                   c=quote(col_name_copy), f=self._first_shelfmarks(col_name_shelfmark))
+        df = self._sql.query(sql)
+        # the media types of the helper file, the unknown ones are left out
+        self._media_types = read_csv_file_in_dict(file)
+        df[col_name_media_type] = df[col_name_media_type].map(self._media_types)
+
+        return df.groupby([col_name_date, col_name_media_type])[col_name_copy].sum().reset_index()
+
+    def development_by_classification(self, col_name_date, col_name_year, col_name_class, body):
+        """Returns the rows of one RVK main class indexed by year, see Collection."""
+        df = self._rows('SELECT * FROM {} WHERE {} = ? ORDER BY _row'.format(
+            self._table, quote(col_name_class)), (body,))
+        df[col_name_date] = pd.to_datetime(df[col_name_date])
+        df[col_name_year] = df[col_name_date].dt.year
+
+        return df.set_index(col_name_year)
+
+    def development_cumsum(self, col_name_shelfmark, col_name_date, col_name_copy, col_name_year='Jahr', col_name_month='Monat', col_name_cum='cum_s'):
+        """Returns the copies by date with the cumulated sum per year, see Collection."""
+        sql = '''
+            SELECT CAST({d} AS VARCHAR) AS {d}, COALESCE(SUM({c}), 0) AS {c} FROM {f}
+            WHERE {d} IS NOT NULL GROUP BY 1 ORDER BY 1
+        '''.format(d=quote(col_name_date), c=quote(col_name_copy),
+                   f=self._first_shelfmarks(col_name_shelfmark))
+        df = self._sql.query(sql)
+        df[col_name_date] = pd.to_datetime(df[col_name_date])
+        df = df.set_index(col_name_date)
+        df[col_name_year] = df.index.year
+        df[col_name_month] = df.index.month
+        df[col_name_cum] = df[col_name_copy].groupby(df[col_name_year]).cumsum()
+
+        return df
+
+    def development_collection_top_class_years(self, col_name_class, col_name_shelfmark, col_name_date, col_name_copy):
+        """Returns the top ten classes by year, see Collection."""
+        sql = '''
+            SELECT {y} AS {d}, {cl} AS {cl}, COALESCE(SUM({c}), 0) AS {c} FROM {f}
+            WHERE {d} IS NOT NULL AND {cl} IS NOT NULL GROUP BY 1, 2 ORDER BY 1, 2
+        '''.format(y=self._year(col_name_date), d=quote(col_name_date), cl=quote(col_name_class),
+                   c=quote(col_name_copy), f=self._first_shelfmarks(col_name_shelfmark))
+        df = self._sql.query(sql)
+
+        return df.sort_values([col_name_copy, col_name_class],
+                              ascending=False).groupby(col_name_date).head(10)
+
+    def development_collection_class_overall_top(self, col_name_date, col_name_shelfmark, col_name_class, col_name_copy, number=9):
+        """Returns the copies of the top n classes, see Collection."""
+        return self._top_values(self._first_shelfmarks(col_name_shelfmark), '1 = 1', (),
+                                col_name_class, col_name_copy, 'Sonstige', number)
+
+
+class SqlReadingRoom(_SqlMixin, ReadingRoom):
+    """ReadingRoom with the aggregations pushed down to SQL.
+
+    Methods
+    -------
+    use_by_years(self, col_name_year)
+    use_by_months(self, col_name_year, col_name_date, col_name_month, year=2017)
+    """
+
+    def use_by_years(self, col_name_year):
+        """Returns the use of the reading room indexed by years, see ReadingRoom."""
+        sums, integer = self._sum_numeric(exclude=[col_name_year])
+        df = self._sql.query('SELECT {y}, {sums} FROM {t} GROUP BY {y} ORDER BY {y}'.format(
+            y=quote(col_name_year), sums=sums, t=self._table)).set_index(col_name_year)
+        df[integer] = df[integer].astype(np.int64)
+
+        return df
+
+    def use_by_months(self, col_name_year, col_name_date, col_name_month, year=2017):
+        """Returns the monthly use of the reading room, see ReadingRoom."""
+        sums, integer = self._sum_numeric(exclude=[col_name_year])
+        where, params = '1 = 1', ()
+        if year is not None:
+            where, params = '{} = ?'.format(quote(col_name_year)), (year,)
+        # like the pandas class the month column is summed as well
+        df = self._sql.query('SELECT {y}, {m} AS _month, {sums} FROM {t} WHERE {w} '
+                             'GROUP BY 1, 2 ORDER BY 1, 2'.format(
+                                 y=quote(col_name_year), m=quote(col_name_month), sums=sums,
+                                 t=self._table, w=where), params)
+        df[integer] = df[integer].astype(np.int64)
+        df.insert(0, col_name_date, pd.to_datetime(
+            df[col_name_year].astype(str) + '/' + df.pop('_month').astype(str) + '/01'))
+
+        return df.set_index(col_name_date)
+
+
+class SqlLoanColl(_SqlMixin, LoanColl):
+    """LoanColl with the aggregations pushed down to SQL.
+
+    Methods
+    -------
+    total_loans(self, col_name_year, col_name_loan, col_name_class,
+        new_value='Sonstige', number=9, per_year=False)
+    top_loans_by_title(self, col_name_year, col_name_loan, number=5, keep='first')
+    library_loan_class(self, col_name_year, col_name_class, exclude_value,
+        col_name_loan, new_value='Sonstige', number=9)
+    """
+
+    def total_loans(self, col_name_year, col_name_loan, col_name_class, new_value='Sonstige', number=9, per_year=False):
+        """Returns the loans by year and top n class, see LoanColl."""
+        sums, integer = self._sum_numeric(exclude=[col_name_year])
+        if per_year:
+            # the rows without year are not ranked (and not returned)
+            ranked = '''
+                SELECT y, c, ROW_NUMBER() OVER (PARTITION BY y ORDER BY {l} DESC, c) AS rn
+                FROM sums WHERE y IS NOT NULL'''
+        else:
+            ranked = '''
+                SELECT c, ROW_NUMBER() OVER (ORDER BY SUM({l}) DESC, c) AS rn
+                FROM sums GROUP BY c'''
+        sql = '''
+            WITH sums AS (
+                SELECT {y} AS y, {c} AS c, {sums} FROM {t}
+                WHERE {c} IS NOT NULL GROUP BY 1, 2),
+            ranked AS ({ranked})
+            SELECT sums.y AS {y}, CASE WHEN rn <= ? THEN sums.c ELSE ? END AS {c}, {sums}
+            FROM sums JOIN ranked ON {on}
+            WHERE sums.y IS NOT NULL GROUP BY 1, 2 ORDER BY 1, 2
+        '''.format(y=quote(col_name_year), c=quote(col_name_class), sums=sums, t=self._table,
+                   ranked=ranked.format(l=quote(col_name_loan)),
+                   on='sums.y = ranked.y AND sums.c = ranked.c' if per_year else 'sums.c = ranked.c')
+        df = self._sql.query(sql, (number, new_value)).set_index(col_name_year)
+        df[integer] = df[integer].astype(np.int64)
+
+        return df
+
+    def top_loans_by_title(self, col_name_year, col_name_loan, number=5, keep='first'):
+        """Returns the rows with the top number of loans per year, see LoanColl."""
+        if keep == 'all':
+            rank = 'RANK() OVER (PARTITION BY {y} ORDER BY {l} DESC)'
+        else:
+            rank = 'ROW_NUMBER() OVER (PARTITION BY {y} ORDER BY {l} DESC, _row)'
+        sql = '''
+            SELECT * FROM (
+                SELECT *, {rank} AS _rank FROM {t}
+                WHERE {l} IS NOT NULL AND {y} IS NOT NULL) AS ranked
+            WHERE _rank <= ? ORDER BY {y}, {l} DESC, _row
+        '''.format(rank=rank.format(y=quote(col_name_year), l=quote(col_name_loan)),
+                   t=self._table, y=quote(col_name_year), l=quote(col_name_loan))
+        df = self._rows(sql, (number,)).drop(columns='_rank')
+        df.index = pd.MultiIndex.from_arrays(
+            [df[col_name_year], df.index], names=[col_name_year, None])
+
+        return df
+
+    def library_loan_class(self, col_name_year, col_name_class, exclude_value, col_name_loan, new_value='Sonstige', number=9):
+        """Returns the top n classes of the loans without a class, see LoanColl."""
+        where = '{} <> ?'.format(quote(col_name_class))
+
+        return self._top_values(self._table, where, (exclude_value,), col_name_class,
+                                col_name_loan, new_value, number)
+
+
+def compare_backends(cls_pandas, cls_sql, filename, method, **kwargs):
+    """Runs a method with the pandas and the SQL class and checks the results.
+    Floats are compared with a tolerance of 1e-9 (different order of summation).
+
+    Parameters
+    ----------
+    cls_pandas : cls
+        the pandas class, e.g. Expenditures.
+    cls_sql : cls
+        the SQL class, e.g. SqlExpenditures.
+    filename : str
+        the name of the file.
+    method : str
+        the name of the method.
+
+    Raises
+    ------
+    AssertionError:
+        if the results differ.
+    """
+    expected = getattr(cls_pandas(filename), method)(**kwargs)
+    result = getattr(cls_sql(filename), method)(**kwargs)
+
+    if isinstance(expected, pd.DataFrame):
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False,
+                                      check_index_type=False, rtol=1e-9)
+    elif isinstance(expected, pd.Series):
+        pd.testing.assert_series_equal(result, expected, check_dtype=False,
+                                       check_index_type=False, rtol=1e-9)
+    else:
+        assert np.isclose(result, expected, rtol=1e-9, equal_nan=True), (result, expected)
+
+
+if __name__ == '__main__':
+    pass
@@ -0,0 +1,679 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module generates synthetic but statistically realistic data for the
+five datasets of the dashboard. The data is written as raw files into the
+import folders, in the formats read by the import scripts (src/instances),
+and as storage files, as the import scripts would write them (the import
+scripts read the files sorted by name, i.e. by date, and write the same
+storage files):
+
+    umsatz       cumulative monthly snapshots of the turnover per supplier,
+                 Zipf distributed shares, most is spent at the end of the year
+                 (fixed width txt)
+    budget       cumulative monthly snapshots of the cost centres (fixed
+                 width txt)
+    newacq       cumulative monthly snapshots of the new items of the year
+                 with RVK-shaped shelfmarks (tsv)
+    readingroom  visitors per opening day and service time with exam,
+                 semester break and holiday seasons (xlsx, a sheet per year)
+    loan         loans per title and year, heavy tailed (Zipf) and decreasing
+                 with the age of the title (xlsx, the titles on the 3rd sheet)
+
+The scale factor multiplies the suppliers, cost centres, new items, titles
+and visitors, the seed makes the data reproducible. The helper files
+(suppliers, cost centres, RVK notations and media types) do not depend on
+the seed. Existing files (storage, helper and the raw files of an import
+folder) are kept unless --force is given, --force replaces the raw files of
+the import folder.
+
+    python -m src.synthetic_data [--scale 1] [--seed 0] [--years 6] [--target DIR]
+
+Writing the excel files needs openpyxl, without it they are skipped.
+It includes the following class and functions:
+    SyntheticData
+    rvk_notations()
+    media_types()
+    dataset_paths(target=PROJECT_ROOT)
+
+"""
+
+# argparse func
+import argparse
+# datetime func
+import datetime
+# os func
+import os
+# numpy func
+import numpy as np
+# pandas func
+import pandas as pd
+
+from configuration import PROJECT_ROOT, DIRPATH_IMP, STOR_DIRPATH, HELPER_DIRPATH
+from configuration import UMSATZ_IMP, BUDGET_IMP, NEWACQ_IMP, READING_IMP, LOAN_IMP
+from configuration import UMSATZ_STOR, BUDGET_STOR, NEWACQ_STOR, READING_STOR, LOAN_STOR
+from configuration import FILE_LIEF, FILE_KOST, FILE_RVK, FILE_MAT
+
+# only needed for writing the excel files
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+# the datasets in the order of the import scripts
+DATASETS = ('umsatz', 'budget', 'newacq', 'readingroom', 'loan')
+
+# service times of the reading room and the mean visitors per opening day
+SERVICE_TIMES = ['10.00 - 12.30', '12.30 - 15.00', '15.00 - 17.00', '17.00 - 18.30']
+SERVICE_VISITORS = [6, 11, 9, 4]
+
+# seasons per month (1 = average): exams in February and July, semester break
+# in August and September, closed between Christmas and New Year
+READINGROOM_SEASON = [1.1, 1.4, 0.8, 0.9, 1.0, 1.1, 1.4, 0.6, 0.7, 1.0, 1.1, 0.8]
+# share of the annual turnover per month, the budget is spent at the year end
+SPENDING_SEASON = [0.04, 0.06, 0.08, 0.07, 0.07, 0.07, 0.06, 0.05, 0.09, 0.11, 0.14, 0.16]
+# new items per month (1 = average)
+ACQUISITION_SEASON = [0.6, 0.9, 1.1, 1.0, 1.0, 1.0, 0.8, 0.7, 1.0, 1.2, 1.3, 1.4]
+
+# RVK groups by their share of the collection (most first), with the main
+# class and the topics of the short titles
+RVK_GROUPS = [
+    ('LH', 'L', ['Kunstgeschichte', 'Malerei', 'Bildende Kunst']),
+    ('LP', 'L', ['Musikgeschichte', 'Musikästhetik', 'Oper']),
+    ('CP', 'C', ['Wahrnehmung', 'Emotion', 'Kognition']),
+    ('AP', 'A', ['Medien', 'Film', 'Kommunikation']),
+    ('LR', 'L', ['Musiktheorie', 'Harmonielehre', 'Komposition']),
+    ('CC', 'C', ['Ästhetik', 'Philosophie', 'Erkenntnistheorie']),
+    ('EC', 'E', ['Poetik', 'Rhetorik', 'Literaturtheorie']),
+    ('GN', 'G', ['Romantik', 'Lyrik', 'Goethezeit']),
+    ('MS', 'M', ['Kultursoziologie', 'Gesellschaft', 'Kunstmarkt']),
+    ('LK', 'L', ['Architektur', 'Kunsthandwerk', 'Design']),
+    ('CV', 'C', ['Psychologie', 'Persönlichkeit', 'Entwicklung']),
+    ('ES', 'E', ['Linguistik', 'Prosodie', 'Sprache']),
+    ('NK', 'N', ['Kulturgeschichte', 'Neuzeit', 'Aufklärung']),
+    ('SK', 'S', ['Statistik', 'Wahrscheinlichkeit', 'Datenanalyse']),
+    ('ST', 'S', ['Informatik', 'Programmierung', 'Maschinelles Lernen']),
+    ('WW', 'W', ['Neurobiologie', 'Gehirn', 'Evolution']),
+    ('AN', 'A', ['Bibliothekswesen', 'Informationswissenschaft', 'Buchgeschichte']),
+    ('DK', 'D', ['Musikpädagogik', 'Didaktik', 'Bildung']),
+    ('HL', 'H', ['Shakespeare', 'Moderne', 'Drama']),
+    ('IG', 'I', ['Chanson', 'Commedia', 'Renaissance']),
+    ('QP', 'Q', ['Kulturmanagement', 'Marketing', 'Organisation']),
+    ('XD', 'X', ['Neurologie', 'Psychiatrie', 'Hören']),
+]
+# the names of the RVK main classes
+RVK_CLASSES = {
+    'A': 'Allgemeines',
+    'C': 'Philosophie, Psychologie',
+    'D': 'Pädagogik',
+    'E': 'Allgemeine und vergleichende Sprach- und Literaturwissenschaft',
+    'G': 'Germanistik, Niederlandistik, Skandinavistik',
+    'H': 'Anglistik, Amerikanistik',
+    'I': 'Romanistik',
+    'L': 'Ethnologie, Kunstgeschichte, Musikwissenschaft',
+    'M': 'Politologie, Soziologie',
+    'N': 'Geschichte',
+    'Q': 'Wirtschaftswissenschaften',
+    'S': 'Mathematik, Informatik',
+    'W': 'Biologie',
+    'X': 'Medizin',
+}
+# notations per RVK group
+RVK_NOTATIONS_PER_GROUP = 25
+# templates of the short titles
+TITLE_TEMPLATES = ['Handbuch {}', '{}: eine Einführung', '{} im Überblick', 'Studien zu {}',
+                   'Lexikon {}', '{} heute', 'Beiträge zu {}', 'Perspektiven der {}']
+# media types (category 0500 of PICA) by share of the new items, online
+# resources have no shelfmark ('/')
+MEDIA_TYPES = [('Aau', 'Buch', 0.70), ('Afu', 'Band einer Reihe', 0.08),
+               ('Oau', 'E-Book', 0.12), ('Gau', 'Tonträger', 0.04), ('Mau', 'Noten', 0.06)]
+
+# names of the suppliers and cost centres
+SURNAMES = ['Albrecht', 'Becker', 'Brandt', 'Busch', 'Engel', 'Fischer', 'Franke', 'Graf',
+            'Haas', 'Hartmann', 'Herrmann', 'Keller', 'Krause', 'Lange', 'Lorenz', 'Meier',
+            'Neumann', 'Otto', 'Peters', 'Richter', 'Roth', 'Schubert', 'Schulze', 'Seidel',
+            'Simon', 'Vogel', 'Walter', 'Winkler', 'Wolf', 'Ziegler']
+SUPPLIER_KINDS = [('Buchhandlung', 'GmbH'), ('Antiquariat', ''), ('Musikalienhandlung', 'KG'),
+                  ('Verlag', 'GmbH & Co. KG'), ('Zeitschriftenagentur', 'GmbH'),
+                  ('Medienservice', 'AG')]
+COST_CENTRES = ['Monographien', 'Zeitschriften', 'Datenbanken', 'E-Books', 'Musikalien',
+                'Tonträger', 'Einband', 'Fernleihe', 'Open Access', 'Sondersammlung']
+
+
+def rvk_notations():
+    """Returns the RVK notations (groups and their notations) with their
+    names, in the format of the csv file of src/rvk_xml_to_csv.py. It does
+    not depend on the seed.
+
+    Returns
+    -------
+    dataframe:
+        with the columns notation and benennung.
+    """
+    rng = np.random.default_rng(0)
+    rows = []
+    for group, main, topics in RVK_GROUPS:
+        name = '{} ({})'.format(RVK_CLASSES[main], group)
+        rows.append((group, name))
+        numbers = np.sort(rng.choice(np.arange(10, 10000) * 10, 3 * RVK_NOTATIONS_PER_GROUP,
+                                     replace=False))
+        # '099' marks the book service in the shelfmarks of the loans
+        numbers = [n for n in numbers if '099' not in str(n)][:RVK_NOTATIONS_PER_GROUP]
+        for i, n in enumerate(numbers):
+            rows.append(('{} {}'.format(group, n),
+                         '{}: {}'.format(topics[i % len(topics)], n)))
+
+    return pd.DataFrame(rows, columns=['notation', 'benennung'])
+
+
+def media_types():
+    """Returns the media types (category 0500) with their names."""
+    return pd.DataFrame([(code, name) for code, name, _ in MEDIA_TYPES],
+                        columns=['code', 'medientyp'])
+
+
+def dataset_paths(target=PROJECT_ROOT):
+    """Returns the import folders, storage files and helper files below a
+    target directory, in the layout of the configuration.py.
+
+    Parameters
+    ----------
+    target : str, optional
+        the directory which contains the data folder, by default PROJECT_ROOT
+
+    Returns
+    -------
+    dict:
+        with the paths of the import folders, the storage files and the
+        helper files by dataset.
+    """
+    imports = dict(zip(DATASETS, (UMSATZ_IMP, BUDGET_IMP, NEWACQ_IMP, READING_IMP, LOAN_IMP)))
+    storage = dict(zip(DATASETS, (UMSATZ_STOR, BUDGET_STOR, NEWACQ_STOR, READING_STOR,
+                                  LOAN_STOR)))
+    helper = {'lieferanten': FILE_LIEF, 'kostenstellen': FILE_KOST, 'rvk': FILE_RVK,
+              'medientypen': FILE_MAT}
+
+    return {'import': {k: os.path.join(target, DIRPATH_IMP, v) for k, v in imports.items()},
+            'storage': {k: os.path.join(target, STOR_DIRPATH, v) for k, v in storage.items()},
+            'helper': {k: os.path.join(target, HELPER_DIRPATH, v) for k, v in helper.items()}}
+
+
+def _fixed_width(df, preamble, total, right):
+    """Returns a report with fixed width columns like the exports of the
+    library system: the preamble lines, the header, a line of dashes, the
+    rows and a footer of 3 lines with the total. Every column is separated by
+    one space, the dashes fill the columns (so the columns are detected by
+    read_fwf even with spaces in the values).
+    """
+    values = df.astype(str)
+    header = list(df.columns)
+    footer = ['Summe'] + [total.get(c, '') for c in header[1:]]
+    widths = [max(len(c), values[c].str.len().max(), len(f)) for c, f in zip(header, footer)]
+
+    def line(cells):
+        return ' '.join(str(v).rjust(w) if c in right else str(v).ljust(w)
+                        for c, v, w in zip(header, cells, widths)).rstrip()
+
+    dashes = ' '.join('-' * w for w in widths)
+    lines = preamble + [line(header), dashes]
+    lines += [line(row) for row in values.itertuples(index=False)]
+    lines += [dashes, line(footer), ' '.join('=' * w for w in widths)]
+
+    return '\n'.join(lines) + '\n'
+
+
+class SyntheticData:
+    """Generates the datasets. Every dataset has its own random generator
+    (derived from the seed), so a dataset is the same whether it is generated
+    alone or with the others.
+
+    Attributes
+    ----------
+
+    scale : float
+    seed : int
+    end : date
+    months : DatetimeIndex
+
+    Methods
+    -------
+    suppliers(self)
+    cost_centres(self)
+    umsatz(self)
+    budget(self)
+    newacq(self)
+    readingroom(self)
+    loan(self)
+    write_raw(self, name, df, directory, force=False)
+    write_storage(self, df, storage_file_path)
+    write_helper_files(self, paths, force=False)
+    write(self, target=PROJECT_ROOT, datasets=DATASETS, raw=True, storage=True, force=False)
+
+    """
+
+    def __init__(self, scale=1, seed=0, years=6, end=None):
+        """Inits SyntheticData with:
+
+        Parameters
+        ----------
+        scale : float, optional
+            the factor of the suppliers, cost centres, items, titles and
+            visitors, by default 1
+        seed : int, optional
+            seed for the random generators, by default 0
+        years : int, optional
+            the number of years up to the end (the last one is the current
+            year until the end), by default 6
+        end : date, optional
+            the last day of the data, by default today
+        """
+        self.scale = scale
+        self.seed = seed
+        self.end = end or datetime.date.today()
+        self.months = pd.date_range(start='{}-01-01'.format(self.end.year - years + 1),
+                                    end=self.end.replace(day=1), freq='MS')
+
+    def _rng(self, name):
+        """Returns the random generator of a dataset."""
+        return np.random.default_rng([self.seed, DATASETS.index(name)])
+
+    def _size(self, n):
+        """Returns n scaled (at least 1)."""
+        return max(1, int(round(n * self.scale)))
+
+    def _dates(self):
+        """Returns the dates (strings) of the monthly snapshots by year."""
+        return {year: list(months.strftime('%Y-%m-%d'))
+                for year, months in self.months.groupby(self.months.year).items()}
+
+    def suppliers(self):
+        """Returns the suppliers with their abbreviations (helper file of the
+        umsatz import), the largest suppliers first. It does not depend on the
+        seed."""
+        rows = []
+        for i in range(self._size(40)):
+            a, b = divmod(i, len(SURNAMES))
+            kind, legal = SUPPLIER_KINDS[(a + b) % len(SUPPLIER_KINDS)]
+            surname = SURNAMES[b] if i < len(SURNAMES) * len(SUPPLIER_KINDS) else \
+                '{} {}'.format(SURNAMES[b], i // (len(SURNAMES) * len(SUPPLIER_KINDS)) + 1)
+            abbreviation = '{} {}'.format(surname, kind)
+            rows.append(('{} {}'.format(abbreviation, legal).strip(), abbreviation))
+
+        return pd.DataFrame(rows, columns=['Lieferant', 'Lieferant Abk.'])
+
+    def cost_centres(self):
+        """Returns the cost centres with their names (helper file of the budget
+        import). It does not depend on the seed."""
+        rows = []
+        for i in range(self._size(8)):
+            a, b = divmod(i, len(COST_CENTRES))
+            name = COST_CENTRES[b] if a == 0 else '{} {}'.format(COST_CENTRES[b], a + 1)
+            rows.append(('kos{:02d} x 20  {}'.format(i + 1, name), name))
+
+        return pd.DataFrame(rows, columns=['S Bezeichnung', 'Bezeichnung'])
+
+    def umsatz(self):
+        """Returns the umsatz storage frame: per month the turnover of the
+        year so far (cumulative) for every supplier with turnover.
+        """
+        rng = self._rng('umsatz')
+        suppliers = self.suppliers()
+        n = len(suppliers.index)
+        # Zipf distributed shares, the largest suppliers first
+        share = 1 / np.arange(1, n + 1) ** 1.1
+        frames = []
+        for year, dates in self._dates().items():
+            year_share = share * rng.lognormal(0, 0.3, n)
+            # the small suppliers are not used every year
+            year_share[(np.arange(n) > 5) & (rng.random(n) < 0.15)] = 0
+            total = 250000 * self.scale * 1.03 ** (year - self.months[0].year)
+            months = total * (year_share / year_share.sum())[:, None] \
+                * np.array(SPENDING_SEASON)[None, :] * rng.gamma(4, 0.25, (n, 12))
+            cumulative = months.cumsum(axis=1)[:, :len(dates)]
+            frames.append(pd.DataFrame({
+                'Lieferant': np.tile(suppliers['Lieferant'].values, len(dates)),
+                'Umsatz (EUR)': cumulative.T.ravel().round(2),
+                'Datum': np.repeat(dates, n),
+                'Lieferant Abk.': np.tile(suppliers['Lieferant Abk.'].values, len(dates))}))
+        df = pd.concat(frames, ignore_index=True)
+
+        return df[df['Umsatz (EUR)'] > 0].reset_index(drop=True)
+
+    def budget(self):
+        """Returns the budget storage frame: per month the budget (Ansatz), the
+        commitments, the expenditures of the year so far (cumulative) and the
+        rest (Bestellvol.) of every cost centre.
+        """
+        rng = self._rng('budget')
+        centres = self.cost_centres()
+        n = len(centres.index)
+        share = 1 / np.arange(1, n + 1) ** 0.8
+        frames = []
+        for year, dates in self._dates().items():
+            total = 300000 * self.scale * 1.02 ** (year - self.months[0].year)
+            ansatz = (total * share / share.sum()).round(-2)
+            # some cost centres are overspent
+            spent = ansatz[:, None] * rng.uniform(0.85, 1.05, n)[:, None] \
+                * (np.array(SPENDING_SEASON)[None, :] * rng.gamma(8, 0.125, (n, 12))).cumsum(axis=1)
+            month = np.arange(1, len(dates) + 1)
+            spent = spent[:, :len(dates)]
+            # open orders, paid until the end of the year
+            commitments = ansatz[:, None] * rng.uniform(0, 0.1, (n, len(dates))) \
+                * (1 - month / 12)[None, :]
+            frames.append(pd.DataFrame({
+                'S Bezeichnung': np.tile(centres['S Bezeichnung'].values, len(dates)),
+                'Ansatz': np.tile(ansatz, len(dates)),
+                'Bindungen': commitments.T.ravel().round(2),
+                'Ausg. ges.': spent.T.ravel().round(2),
+                'Bestellvol.': (np.tile(ansatz, len(dates)) - spent.T.ravel()
+                                - commitments.T.ravel()).round(2),
+                'Datum': np.repeat(dates, n),
+                'Bezeichnung': np.tile(centres['Bezeichnung'].values, len(dates))}))
+
+        return pd.concat(frames, ignore_index=True)
+
+    def _shelfmarks(self, rng, n):
+        """Returns n RVK-shaped shelfmarks (notation and cutter, e.g.
+        'LH 61230 M214'), the groups by their share of the collection."""
+        notations = rvk_notations()
+        notations = notations[notations['notation'].str.contains(' ')]['notation'].values
+        weights = 1 / np.arange(1, len(RVK_GROUPS) + 1) ** 0.9
+        group = rng.choice(len(RVK_GROUPS), n, p=weights / weights.sum())
+        notation = notations[group * RVK_NOTATIONS_PER_GROUP
+                             + rng.integers(0, RVK_NOTATIONS_PER_GROUP, n)]
+        cutter = pd.Series(rng.choice(list('ABDEFGHKLMNPRSTWZ'), n)) \
+            + pd.Series(rng.integers(10, 1000, n)).astype(str)
+        shelfmarks = pd.Series(notation) + ' ' + cutter
+        # copies of the same shelfmark get a number
+        copy = shelfmarks.groupby(shelfmarks).cumcount()
+        shelfmarks[copy > 0] = shelfmarks[copy > 0] + '+' + (copy[copy > 0] + 1).astype(str)
+
+        return shelfmarks.values, group
+
+    def _add_rvk_columns(self, df, col_name_shelfmark):
+        """Adds the RVK columns of the import (create_new_column_for_rvk_benennung)."""
+        names = rvk_notations().set_index('notation')['benennung']
+        df['Systematikstelle'] = df[col_name_shelfmark].str.extract(r'([A-Z]{1,2}\s\d{2,5})')
+        df['RVK-Bez-SysStelle'] = df['Systematikstelle'].map(names)
+        df['Systematikgruppe'] = df[col_name_shelfmark].str.extract(r'(^[A-Z]{1,2})')
+        df['RVK-Bez-SysGruppe'] = df['Systematikgruppe'].map(names)
+
+        return df
+
+    def newacq(self):
+        """Returns the new acquisitions storage frame: per month all new items
+        of the year so far (cumulative snapshots), online resources without
+        shelfmark ('/').
+        """
+        rng = self._rng('newacq')
+        codes = [code for code, _, _ in MEDIA_TYPES]
+        p = np.array([share for _, _, share in MEDIA_TYPES])
+        frames = []
+        for year, dates in self._dates().items():
+            items = rng.poisson(25 * self.scale * np.array(ACQUISITION_SEASON[:len(dates)]))
+            n = items.sum()
+            shelfmarks, _ = self._shelfmarks(rng, n)
+            media = rng.choice(codes, n, p=p / p.sum())
+            shelfmarks[media == 'Oau'] = '/'
+            # PPN: 9 digits and a check digit (or X)
+            ppn = (pd.Series(rng.integers(100000000, 999999999, n)).astype(str)
+                   + rng.choice(list('0123456789X'), n)).values
+            month = np.repeat(np.arange(len(dates)), items)
+            for i, date in enumerate(dates):
+                snapshot = month <= i
+                frames.append(pd.DataFrame({'PPN': ppn[snapshot], '0500': media[snapshot],
+                                            'Signatur': shelfmarks[snapshot], 'Datum': date}))
+        df = pd.concat(frames, ignore_index=True)
+        df['Ex'] = 1
+
+        return self._add_rvk_columns(df, 'Signatur')
+
+    def readingroom(self):
+        """Returns the readingroom storage frame: per opening day (Monday to
+        Friday, closed between Christmas and New Year) the visitors per service
+        time.
+        """
+        rng = self._rng('readingroom')
+        days = pd.date_range(self.months[0], self.end, freq='B')
+        days = days[~(((days.month == 12) & (days.day >= 24)) | ((days.month == 1) & (days.day == 1)))]
+        # the end of the week is quieter, the use grows slowly
+        factor = np.array(READINGROOM_SEASON)[days.month - 1] \
+            * np.array([1.0, 1.05, 1.05, 1.0, 0.8])[days.dayofweek] \
+            * 1.02 ** (days.year - days.year.min()) * self.scale
+        df = pd.DataFrame({'Jahr': days.year, 'Monat': days.month})
+        for col, visitors in zip(SERVICE_TIMES, SERVICE_VISITORS):
+            df[col] = rng.poisson(visitors * factor)
+
+        return df
+
+    def loan(self):
+        """Returns the loan storage frame: per year the titles with loans.
+        The popularity of the titles is Pareto distributed, so the loans per
+        title are heavy tailed (Zipf), and decreases with the age of the title.
+        About 5 % of the titles are from the book service (shelfmark '099/...',
+        Systematikgruppe 'Buchservice').
+        """
+        rng = self._rng('loan')
+        n = self._size(1500)
+        first, last = self.months[0].year, self.end.year
+        shelfmarks, group = self._shelfmarks(rng, n)
+        topics = np.array([rng.choice(RVK_GROUPS[g][2]) for g in group])
+        templates = rng.choice(TITLE_TEMPLATES, n)
+        titles = np.array([t.format(topic) for t, topic in zip(templates, topics)])
+        service = rng.random(n) < 0.05
+        shelfmarks[service] = ['099/{:05d}'.format(i) for i in rng.choice(100000, service.sum(),
+                                                                          replace=False)]
+        acquired = rng.integers(first - 20, last + 1, n)
+        popularity = 0.4 * (rng.pareto(1.3, n) + 1)
+
+        frames = []
+        for year in range(first, last + 1):
+            active = acquired <= year
+            # the current year is not over yet
+            elapsed = (self.end.timetuple().tm_yday / 365) if year == last else 1
+            rate = popularity * 0.85 ** np.clip(year - acquired, 0, None) * elapsed
+            loans = rng.poisson(np.clip(rate, 0, 200))
+            keep = active & (loans > 0)
+            frames.append(pd.DataFrame({'year': year, 'shelfmark': shelfmarks[keep],
+                                        'shorttitle': titles[keep], 'cum_loans': loans[keep]}))
+        df = self._add_rvk_columns(pd.concat(frames, ignore_index=True), 'shelfmark')
+        df.loc[df['shelfmark'].str.contains('099'), 'Systematikgruppe'] = 'Buchservice'
+
+        return df
+
+    def write_raw(self, name, df, directory, force=False):
+        """Writes the raw files of a dataset, as they are exported by the
+        library systems, into its import folder. Files of an earlier run
+        would be imported as well, so a folder with files is kept unless
+        force, then its files are removed first.
+
+        Parameters
+        ----------
+        name : str
+            the name of the dataset.
+        df : dataframe
+            the storage frame of the dataset.
+        directory : str
+            the import folder.
+        force : bool, optional
+            replace the files in the import folder, by default False
+
+        Returns
+        -------
+        list:
+            the paths of the written files (empty if the folder is kept).
+        """
+        os.makedirs(directory, exist_ok=True)
+        existing = [os.path.join(directory, f) for f in os.listdir(directory)
+                    if os.path.isfile(os.path.join(directory, f))]
+        if existing and not force:
+            print('{} contains {} file(s), it is kept.'.format(directory, len(existing)))
+            return []
+        for path in existing:
+            os.remove(path)
+        written = []
+        if name in ('umsatz', 'budget', 'newacq'):
+            for date, snapshot in df.groupby('Datum', sort=True):
+                stamp = datetime.datetime.strptime(date, '%Y-%m-%d')
+                if name == 'newacq':
+                    path = os.path.join(directory, stamp.strftime('%Y_%m_%d') + '.tsv')
+                    snapshot[['PPN', '0500', 'Signatur']].to_csv(path, sep='\t', index=False)
+                else:
+                    path = os.path.join(directory, stamp.strftime('%Y_%m_%d') + '.txt')
+                    with open(path, 'w', encoding='utf-8') as f:
+                        f.write(self._report(name, snapshot, stamp))
+                written.append(path)
+            return written
+
+        if openpyxl is None:
+            print('openpyxl is not installed, the excel files of {} are skipped.'.format(name))
+            return written
+        path = os.path.join(directory, self.end.strftime('%Y_%m_%d') + '.xlsx')
+        with pd.ExcelWriter(path, engine='openpyxl') as writer:
+            if name == 'readingroom':
+                # one sheet per year
+                for year, sheet in df.groupby('Jahr'):
+                    sheet.to_excel(writer, sheet_name=str(year), index=False)
+            else:
+                # the export counts one loan more (the loan of the processing),
+                # which the import subtracts (precalc_column)
+                titles = df[['year', 'shelfmark', 'shorttitle', 'cum_loans']].copy()
+                titles.loc[df['Systematikgruppe'] != 'Buchservice', 'cum_loans'] += 1
+                df.groupby('year', as_index=False)['cum_loans'].sum().to_excel(
+                    writer, sheet_name='Übersicht', index=False)
+                df.groupby(['year', 'Systematikgruppe'], as_index=False)['cum_loans'].sum(
+                    ).to_excel(writer, sheet_name='Systematik', index=False)
+                titles.to_excel(writer, sheet_name='Titel', index=False)
+        written.append(path)
+
+        return written
+
+    def _report(self, name, snapshot, stamp):
+        """Returns the fixed width report of a snapshot (umsatz or budget)."""
+        if name == 'umsatz':
+            df = snapshot[['Lieferant', 'Umsatz (EUR)']].rename(
+                columns={'Umsatz (EUR)': 'Umsatz  (EUR)'})
+            df['Umsatz  (EUR)'] = df['Umsatz  (EUR)'].map('{:.2f}'.format)
+            preamble = ['Umsatzstatistik nach Lieferanten',
+                        'Haushaltsjahr {}'.format(stamp.year),
+                        'Stichtag {:%d.%m.%Y}'.format(stamp),
+                        'Bibliothek, Erwerbung',
+                        '=' * 40]
+            total = {'Umsatz  (EUR)': '{:.2f}'.format(snapshot['Umsatz (EUR)'].sum())}
+            return _fixed_width(df, preamble, total, right=['Umsatz  (EUR)'])
+
+        columns = ['S Bezeichnung', 'Ansatz', 'Bindungen', 'Ausg. ges.', 'Bestellvol.']
+        df = snapshot[columns].rename(columns={'Ausg. ges.': 'Ausg.  ges.'})
+        for col in df.columns[1:]:
+            df[col] = df[col].map('{:.2f}'.format)
+        preamble = ['Mittelbewirtschaftung',
+                    'Haushaltsjahr {}'.format(stamp.year),
+                    'Stichtag {:%d.%m.%Y}'.format(stamp),
+                    'Kapitel 0815, Titel 51101',
+                    'Beträge in EUR',
+                    '=' * 40]
+        total = {('Ausg.  ges.' if c == 'Ausg. ges.' else c):
+                 '{:.2f}'.format(snapshot[c].sum()) for c in columns[1:]}
+        return _fixed_width(df, preamble, total, right=list(df.columns[1:]))
+
+    def write_storage(self, df, storage_file_path):
+        """Writes a storage frame like the import scripts (SaveDfToCSV). The
+        amounts (floats) are written with two decimals, as they are read from
+        the reports."""
+        os.makedirs(os.path.dirname(storage_file_path), exist_ok=True)
+        df.to_csv(storage_file_path, index=False, encoding='utf-8', float_format='%.2f')
+
+    def write_helper_files(self, paths, force=False):
+        """Writes the helper files of the imports (existing files are kept
+        unless force).
+
+        Parameters
+        ----------
+        paths : dict
+            the paths of the helper files (see dataset_paths).
+        force : bool, optional
+            overwrite existing files, by default False
+
+        Returns
+        -------
+        list:
+            the paths of the written files.
+        """
+        frames = {'lieferanten': self.suppliers(), 'kostenstellen': self.cost_centres(),
+                  'rvk': rvk_notations(), 'medientypen': media_types()}
+        written = []
+        for key, df in frames.items():
+            if os.path.exists(paths[key]) and not force:
+                print('{} exists, it is kept.'.format(paths[key]))
+                continue
+            os.makedirs(os.path.dirname(paths[key]), exist_ok=True)
+            df.to_csv(paths[key], index=False, encoding='utf-8')
+            written.append(paths[key])
+
+        return written
+
+    def write(self, target=PROJECT_ROOT, datasets=DATASETS, raw=True, storage=True, force=False):
+        """Generates the datasets and writes the raw files, the storage files
+        and the helper files below a target directory.
+
+        Parameters
+        ----------
+        target : str, optional
+            the directory which contains the data folder, by default PROJECT_ROOT
+        datasets : tuple, optional
+            the names of the datasets, by default all
+        raw : bool, optional
+            write the raw files into the import folders, by default True
+        storage : bool, optional
+            write the storage files, by default True
+        force : bool, optional
+            overwrite existing storage and helper files and replace the raw
+            files in the import folders, by default False
+
+        Returns
+        -------
+        dict:
+            with the paths of the storage and helper files (see dataset_paths).
+        """
+        paths = dataset_paths(target)
+        self.write_helper_files(paths['helper'], force)
+        for name in datasets:
+            df = getattr(self, name)()
+            if raw:
+                files = self.write_raw(name, df, paths['import'][name], force)
+                if files:
+                    print('{}: {} raw file(s) in {}'.format(name, len(files),
+                                                            paths['import'][name]))
+            if storage:
+                if os.path.exists(paths['storage'][name]) and not force:
+                    print('{} exists, it is kept.'.format(paths['storage'][name]))
+                    continue
+                self.write_storage(df, paths['storage'][name])
+                print('{}: {} rows in {}'.format(name, len(df.index), paths['storage'][name]))
+
+        return paths
+
+
+def main():
+    """Writes the synthetic data as given on the command line."""
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=1, help='factor of the data volume')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the random generators')
+    parser.add_argument('--years', type=int, default=6, help='years up to today')
+    parser.add_argument('--target', default=PROJECT_ROOT,
+                        help='directory which contains the data folder')
+    parser.add_argument('--datasets', nargs='+', choices=DATASETS, default=list(DATASETS))
+    parser.add_argument('--no-raw', action='store_true', help='no files in the import folders')
+    parser.add_argument('--no-storage', action='store_true', help='no storage files')
+    parser.add_argument('--force', action='store_true',
+                        help='overwrite existing storage and helper files and '
+                             'replace the raw files in the import folders')
+    args = parser.parse_args()
+
+    SyntheticData(args.scale, args.seed, args.years).write(
+        args.target, args.datasets, raw=not args.no_raw, storage=not args.no_storage,
+        force=args.force)
+
+
+if __name__ == '__main__':
+    main()
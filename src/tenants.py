@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""This module lets one process serve the dashboard for several libraries
+(tenants, see TENANTS in configuration.py). Every tenant has its own data
+folder, the paths of configuration.py point to the data of the process tenant
+and are mapped to the data of the current tenant by tenant_path. The tenant of
+a request is chosen by the first part of the url (TenantMiddleware), e.g.
+/institut-a/_dash-layout, requests without a tenant prefix are served for the
+process tenant. The memoized functions keep a partition per tenant (see
+cache.memoize), other objects with data of a tenant are kept by TenantLocal.
+It includes the following classes and functions:
+    TenantLocal
+    TenantMiddleware
+    current_tenant()
+    use_tenant(tenant)
+    tenant_path(path, tenant=None)
+    init_app(server)
+
+"""
+
+# os func
+import os
+# context of the current tenant
+import contextvars
+from contextlib import contextmanager
+# threading func
+import threading
+
+from configuration import TENANTS, PROCESS_TENANT, DATA_ROOT
+
+# the tenant of the running request (or of use_tenant), new threads start
+# with the process tenant
+_CURRENT = contextvars.ContextVar('tenant', default=PROCESS_TENANT)
+# the data folder of the process tenant, the prefix of the paths which are mapped
+_DATA_DIR = os.path.join(DATA_ROOT, 'data')
+
+
+def current_tenant():
+    """Returns the name of the current tenant."""
+    return _CURRENT.get()
+
+
+@contextmanager
+def use_tenant(tenant):
+    """Makes a tenant the current tenant within the with block, e.g. in the
+    warm-up.
+
+    Parameters
+    ----------
+    tenant : str
+        the name of the tenant (see TENANTS in configuration.py).
+
+    Raises
+    ------
+    KeyError
+        if the tenant is not configured.
+    """
+    if tenant not in TENANTS:
+        raise KeyError('Unknown tenant: {}'.format(tenant))
+    token = _CURRENT.set(tenant)
+    try:
+        yield tenant
+    finally:
+        _CURRENT.reset(token)
+
+
+def tenant_path(path, tenant=None):
+    """Returns the path of a file in the data folder of a tenant, e.g. the
+    storage file of the umsatz data. Paths outside the data folder are
+    returned unchanged.
+
+    Parameters
+    ----------
+    path : str
+        the path in the data folder of the process tenant (configuration.py).
+    tenant : str, optional
+        the name of the tenant, by default None (the current tenant)
+
+    Returns
+    -------
+    str:
+        the path in the data folder of the tenant.
+    """
+    root = TENANTS[tenant or current_tenant()]
+    if root == DATA_ROOT:
+        return path
+    relpath = os.path.relpath(path, _DATA_DIR)
+    if relpath == os.pardir or relpath.startswith(os.pardir + os.sep):
+        return path
+
+    return os.path.join(root, 'data', relpath)
+
+
+class TenantLocal:
+    """Keeps one object per tenant, created by a factory on the first use
+    within the tenant (e.g. the figure cache next to the storage file of the
+    tenant).
+
+    Attributes
+    ----------
+
+    factory : function
+    _objects : dict
+    _lock : threading.Lock
+
+    Methods
+    -------
+    __call__(self)
+
+    """
+
+    def __init__(self, factory):
+        """Inits TenantLocal with:
+
+        Parameters
+        ----------
+        factory : function
+            returns the object for the current tenant, called without arguments.
+        """
+        self.factory = factory
+        self._objects = {}
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        """Returns the object of the current tenant."""
+        tenant = current_tenant()
+        with self._lock:
+            if tenant not in self._objects:
+                self._objects[tenant] = self.factory()
+            return self._objects[tenant]
+
+
+class TenantMiddleware:
+    """WSGI middleware which chooses the tenant by the first part of the url.
+    The prefix is moved from PATH_INFO to SCRIPT_NAME, so the routes of the
+    app stay the same for all tenants.
+
+    Attributes
+    ----------
+
+    app : WSGI app
+    tenants : dict
+
+    Methods
+    -------
+    __call__(self, environ, start_response)
+
+    """
+
+    def __init__(self, app, tenants=TENANTS):
+        """Inits TenantMiddleware with:
+
+        Parameters
+        ----------
+        app : WSGI app
+            the wrapped app, e.g. the wsgi_app of the Flask server.
+        tenants : dict, optional
+            the tenants by name, by default TENANTS of configuration.py
+        """
+        self.app = app
+        self.tenants = tenants
+
+    def __call__(self, environ, start_response):
+        """Handles the request within the tenant of its url."""
+        path = environ.get('PATH_INFO', '')
+        name = path.split('/', 2)[1] if path.startswith('/') else ''
+        tenant = PROCESS_TENANT
+        if name in self.tenants:
+            tenant = name
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '') + '/' + name
+            environ['PATH_INFO'] = path[len(name) + 1:]
+        environ['dashboard.tenant'] = tenant
+
+        with use_tenant(tenant):
+            return self.app(environ, start_response)
+
+
+def init_app(server):
+    """Wraps the Flask server of the Dash app in the TenantMiddleware.
+
+    Parameters
+    ----------
+    server : flask app
+        the server of the Dash app.
+    """
+    server.wsgi_app = TenantMiddleware(server.wsgi_app)
+
+
+if __name__ == '__main__':
+    pass
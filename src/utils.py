@@ -9,9 +9,16 @@ used in data_import and data_prep.
     read_txt_file_in_list(file):
     transform_actual_month():
     get_dates_list(start_date='2014-12-31'):
+    date_from_filename(filename):
+    sidecar_path(storage_file_path, suffix, ext='.csv'):
+    bucket_top_values(values, weights, new_value='Sonstige', number=9, groups=None):
 """
+# os func
+import os
 # datetime func
 from datetime import datetime
+# numpy func
+import numpy as np
 # pandas func
 import pandas as pd
 
@@ -130,6 +137,97 @@ def date_from_filename(filename):
     return date_from_file
 
 
+def sidecar_path(storage_file_path, suffix, ext='.csv'):
+    """Returns the path of a file which is stored next to a storage file, e.g.
+    'umsatz_total_counter.csv' next to 'umsatz_total.csv'.
+
+    Parameters
+    ----------
+    storage_file_path : str
+        the path of the storage file.
+    suffix : str
+        the suffix which is added to the name of the storage file.
+    ext : str, optional
+        the extension of the new file, by default '.csv'
+
+    Returns
+    -------
+    str:
+        the path of the file next to the storage file.
+    """
+    root = os.path.splitext(storage_file_path)[0]
+
+    return '{}_{}{}'.format(root, suffix, ext)
+
+
+def bucket_top_values(values, weights, new_value='Sonstige', number=9, groups=None):
+    """Returns the values with everything outside the top number values
+    replaced by a new value. The values are ranked by the sum of their weights,
+    either overall or within each group (e.g. per year). The ranking and the
+    remapping work on the integer codes of the values, so only the given column
+    is touched. Missing values stay missing, rows without group are not ranked
+    and keep their value (like a groupby, which leaves them out).
+
+    Parameters
+    ----------
+    values : Series
+        the values which will be ranked and bucketed, e.g. a class column.
+    weights : Series
+        the weights which are summed per value, e.g. loans or copies.
+    new_value : str, optional
+        the value for the not top number values, by default 'Sonstige'
+    number : int, optional
+        how many values are kept (per group), by default 9
+    groups : Series, optional
+        rank the values within each group instead of overall, by default None
+
+    Returns
+    -------
+    ndarray:
+        with the top number values and the new value for all others.
+    """
+    # integer codes for the values, sorted like groupby does, nan gets -1
+    codes, uniques = pd.factorize(values, sort=True)
+    weights = pd.to_numeric(weights, errors='coerce').fillna(0).to_numpy(dtype=float)
+    valid = codes >= 0
+
+    if groups is None:
+        # one sum per value and a stable descending ranking
+        sums = np.bincount(codes[valid], weights=weights[valid],
+                           minlength=len(uniques))
+        ranking = np.argsort(-sums, kind='mergesort')
+        keep = np.zeros(len(uniques), dtype=bool)
+        keep[ranking[:number]] = True
+        keep_rows = valid & keep[np.where(valid, codes, 0)]
+    else:
+        group_codes, group_uniques = pd.factorize(groups, sort=True)
+        # rows without group keep their value
+        outside = group_codes < 0
+        valid &= ~outside
+        # one sum per pair of group and value
+        pairs = group_codes[valid].astype(np.int64) * len(uniques) + codes[valid]
+        pair_keys, pair_codes = np.unique(pairs, return_inverse=True)
+        sums = np.bincount(pair_codes, weights=weights[valid])
+        # sort by group and descending sum, then count the position per group
+        order = np.lexsort((-sums, pair_keys // len(uniques)))
+        pair_groups = (pair_keys // len(uniques))[order]
+        starts = np.searchsorted(pair_groups, np.arange(len(group_uniques)))
+        position = np.arange(len(order)) - starts[pair_groups]
+        keep = np.zeros(len(pair_keys), dtype=bool)
+        keep[order[position < number]] = True
+        keep_rows = outside.copy()
+        keep_rows[valid] = keep[pair_codes]
+
+    # remap the codes: kept values stay, all others point to the new value
+    categories = np.append(uniques.astype(object), new_value)
+    new_codes = np.where(keep_rows, codes, len(uniques))
+    new_codes[codes < 0] = -1
+    bucketed = categories[new_codes].astype(object)
+    bucketed[codes < 0] = np.nan
+
+    return bucketed
+
+
 if __name__ == '__main__':
     print(transform_actual_month())
     print(get_dates_list('2014-12-01'))
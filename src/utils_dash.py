@@ -4,12 +4,33 @@
 """ These module contains functions which do not affect objects (self). Nevertheless
 they will be needed for doing some basic jobs, e.g. making a dict from file, making a
 list of from file. Find below a list of functions within this module. They will be
-used for the dashboard app to not overload the dasboard app files."""
+used for the dashboard app to not overload the dasboard app files.
+The function minimize_figure trims the JSON of the figures which are sent to
+the browser. Typed arrays (base64 encoded numpy arrays) would shrink the
+payload further, but they are not supported by plotly 4.14 / plotly.js 1.58."""
 
 
+import numpy as np
+import plotly.graph_objects as go
+import plotly.io as pio
 import dash_html_components as html
 import dash_bootstrap_components as dbc
 
+from configuration import MINIMIZE_FIGURES, FIGURE_DECIMALS
+
+
+# the parts of the template 'simple_white' which are used by the figures
+# of the dashboard (2d axes, bars, lines, pies and tables)
+_template = pio.templates['simple_white']
+SLIM_TEMPLATE = go.layout.Template(
+    layout={key: _template.layout[key] for key in
+            ('autotypenumbers', 'colorway', 'font', 'hovermode', 'hoverlabel',
+             'paper_bgcolor', 'plot_bgcolor', 'xaxis', 'yaxis', 'title')},
+    data={key: _template.data[key] for key in ('bar', 'scatter', 'pie', 'table')})
+
+# numeric attributes of the traces which are rounded
+ROUNDED_ATTRIBUTES = ('x', 'y', 'values')
+
 
 def get_list_from_df(df, column_name):
     """getting a list from column with unique values
@@ -23,13 +44,16 @@ def get_list_from_df(df, column_name):
     return df[column_name].unique()
 
 
-def create_dropdown_list(lst):
+def create_dropdown_list(lst, sort=True):
     """Returns a list of dictionaries.
 
     Parameters
     ----------
     lst :
         with values
+    sort : bool, optional
+        sorts the values, by default True (False for already sorted values,
+        e.g. from DistinctValues)
 
     Returns
     -------
@@ -37,7 +61,7 @@ def create_dropdown_list(lst):
         of dictionaries
     """
     dropdown_list = [{'label': label, 'value': label}
-                     for label in sorted(lst)]
+                     for label in (sorted(lst) if sort else lst)]
 
     return dropdown_list
 
@@ -71,5 +95,42 @@ def generate_card_content(card_header, card_value):
     return card
 
 
+def minimize_figure(fig, decimals=FIGURE_DECIMALS):
+    """Returns the figure with a smaller JSON payload: the floats of the
+    traces are rounded, the template is replaced by the shared SLIM_TEMPLATE
+    and the default axis references of the traces are removed. Does nothing
+    if MINIMIZE_FIGURES is off (configuration.py).
+
+    Parameters
+    ----------
+    fig : plotly graph object
+        the figure, e.g. made by plotly express.
+    decimals : int, optional
+        the number of decimals of the floats, by default FIGURE_DECIMALS
+
+    Returns
+    -------
+    plotly graph object:
+        the same figure, changed in place.
+    """
+    if not MINIMIZE_FIGURES:
+        return fig
+
+    for trace in fig.data:
+        for attr in ROUNDED_ATTRIBUTES:
+            values = trace[attr] if attr in trace else None
+            if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+                trace[attr] = np.round(values, decimals)
+        # 'x' and 'y' are the default axes
+        if 'xaxis' in trace and trace.xaxis == 'x':
+            trace.xaxis = None
+        if 'yaxis' in trace and trace.yaxis == 'y':
+            trace.yaxis = None
+
+    fig.layout.template = SLIM_TEMPLATE
+
+    return fig
+
+
 if __name__ == '__main__':
     pass
@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""The fixtures of the tests: the storage files of the synthetic data
+generator (src/synthetic_data.py).
+
+"""
+
+import pytest
+
+from src.synthetic_data import SyntheticData, DATASETS, dataset_paths
+
+
+@pytest.fixture(scope='session')
+def synthetic_paths(tmp_path_factory):
+    """Writes the storage and helper files of three synthetic years and
+    returns their paths (see dataset_paths). The files are shared by the
+    tests and must not be changed, a test which changes them works on a
+    copy."""
+    directory = str(tmp_path_factory.mktemp('data'))
+    generator = SyntheticData(1, 0, 3)
+    paths = dataset_paths(directory)
+    generator.write_helper_files(paths['helper'])
+    for name in DATASETS:
+        generator.write_storage(getattr(generator, name)(), paths['storage'][name])
+
+    return paths
+
+
+@pytest.fixture(scope='session')
+def storage(synthetic_paths):
+    """Returns the paths of the synthetic storage files by dataset."""
+    return synthetic_paths['storage']
+
+
+@pytest.fixture(scope='session')
+def helper(synthetic_paths):
+    """Returns the paths of the synthetic helper files."""
+    return synthetic_paths['helper']
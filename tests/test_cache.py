@@ -0,0 +1,195 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Checks the caches of src/cache.py: the LRU cache in memory, the cache on
+disk (shared by several processes), the memory budget of several caches and
+the memoization, where concurrent calls with the same key are computed once
+(single-flight), also for a call which missed the result just before the
+running computation stored it.
+
+    python -m pytest tests
+"""
+
+import os
+import threading
+import time
+
+import pytest
+
+from src.cache import LRUCache, DiskCache, MemoryBudget, memoize
+from src.tenants import current_tenant
+
+# a value of about 1 KB (see memory.deep_size)
+KB = b'x' * 1000
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    """Returns the path of a storage file the memoized functions depend on."""
+    path = tmp_path / 'data.csv'
+    path.write_text('a,b\n1,2\n')
+
+    return str(path)
+
+
+def test_lru_drops_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert len(cache) == 2
+    assert (cache.hits, cache.misses) == (3, 1)
+
+
+def test_lru_get_without_counting():
+    cache = LRUCache()
+    cache.set('a', 1)
+
+    assert cache.get('a', count=False) == 1
+    assert cache.get('b', 'missing', count=False) == 'missing'
+    assert (cache.hits, cache.misses) == (0, 0)
+
+
+def test_disk_cache_shared_by_instances(tmp_path):
+    DiskCache(str(tmp_path)).set('key', {'a': [1, 2]}, 'f|default', 'v1')
+    # e.g. another worker process
+    other = DiskCache(str(tmp_path))
+
+    assert other.get('key', None, 'f|default', 'v1') == {'a': [1, 2]}
+    assert other.get('key', 'missing', 'f|default', 'v2') == 'missing'
+    assert other.get('key', 'missing', 'g|default', 'v1') == 'missing'
+
+
+def test_disk_cache_removes_older_versions(tmp_path):
+    cache = DiskCache(str(tmp_path))
+    cache.set('key', 1, 'f|default', 'v1')
+    cache.set('key', 1, 'g|default', 'v1')
+    cache.set('key', 2, 'f|default', 'v2')
+
+    assert cache.get('key', None, 'f|default', 'v1') is None
+    assert cache.get('key', None, 'f|default', 'v2') == 2
+    # other namespaces keep their entries
+    assert cache.get('key', None, 'g|default', 'v1') == 1
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+def test_budget_drops_oldest_of_all_caches():
+    budget = MemoryBudget(maxbytes=2500)
+    first = LRUCache(budget=budget)
+    second = LRUCache(budget=budget)
+    first.set('a', KB)
+    second.set('b', KB)
+    first.set('c', KB)
+
+    # 'a' is the least recently used of both caches
+    assert first.get('a') is None
+    assert (first.get('c'), second.get('b')) == (KB, KB)
+    assert budget.evictions == 1
+    assert budget.bytes == budget.sizeof(KB) * 2
+
+    first.clear()
+    assert budget.bytes == budget.sizeof(KB)
+
+
+def test_budget_keeps_newest_entry():
+    budget = MemoryBudget(maxbytes=500)
+    cache = LRUCache(budget=budget)
+    cache.set('a', KB)
+    cache.set('b', KB)
+
+    assert cache.get('a') is None
+    assert cache.get('b') == KB
+    assert budget.bytes > budget.maxbytes
+
+
+def test_budget_without_bound_does_not_measure():
+    budget = MemoryBudget()
+    cache = LRUCache(budget=budget)
+    cache.set('a', KB)
+
+    assert budget.sizeof(KB) == 0
+    assert budget.bytes == 0
+
+
+def test_recomputed_after_dataset_changed(dataset):
+    calls = []
+
+    @memoize(dataset)
+    def double(x):
+        calls.append(x)
+        return 2 * x
+
+    assert double(21) == 42
+    assert double(21) == 42
+    with open(dataset, 'a') as f:
+        f.write('3,4\n')
+    assert double(21) == 42
+
+    assert calls == [21, 21]
+
+
+def test_memoized_on_disk(dataset, tmp_path):
+    calls = []
+
+    def double(x):
+        calls.append(x)
+        return 2 * x
+
+    disk_dir = str(tmp_path / 'cache')
+    assert memoize(dataset, disk_dir=disk_dir)(double)(21) == 42
+    # a new process finds the result on disk
+    assert memoize(dataset, disk_dir=disk_dir)(double)(21) == 42
+
+    assert calls == [21]
+
+
+def test_concurrent_calls_computed_once(dataset):
+    n = 8
+    calls = []
+    results = []
+
+    @memoize(dataset)
+    def double(x):
+        # the computation runs until the other calls wait for it
+        deadline = time.monotonic() + 10
+        while double.flights.coalesced < n - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        calls.append(x)
+        return 2 * x
+
+    threads = [threading.Thread(target=lambda: results.append(double(21))) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [42] * n
+    assert calls == [21]
+    assert double.flights.computations == 1
+    assert double.flights.coalesced == n - 1
+
+
+def test_call_after_flight_finds_result(dataset, monkeypatch):
+    calls = []
+
+    @memoize(dataset)
+    def double(x):
+        calls.append(x)
+        return 2 * x
+
+    assert double(21) == 42
+    memory = double.caches[current_tenant()]
+    get = memory.get
+    # the next call misses the result, as if it was stored just after the lookup
+    stale = iter([True])
+    monkeypatch.setattr(memory, 'get', lambda key, default=None, count=True: (
+        default if next(stale, False) else get(key, default, count)))
+
+    assert double(21) == 42
+    assert calls == [21]
+    assert double.flights.computations == 1
+    assert double.flights.coalesced == 1
+    assert (memory.hits, memory.misses) == (0, 1)
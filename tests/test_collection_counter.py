@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Checks the counters of the collection growth (src/collection_counter.py)
+against the class Collection of data_prep, also after the storage file was
+changed without updating the counters.
+
+    python -m pytest tests
+"""
+
+import os
+import shutil
+
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from src.data_prep import Collection
+from src.collection_counter import CollectionCounter
+
+
+def collection_total(storage_file_path):
+    """Returns the copies per year of the class Collection."""
+    df = Collection(storage_file_path).total_collection_years('Datum', 'Signatur')
+
+    return df['Gesamt'].astype(float)
+
+
+def counter_total(storage_file_path):
+    """Returns the copies per year of the counters."""
+    df = CollectionCounter(storage_file_path).total_collection_years()
+
+    return df['Gesamt'].astype(float)
+
+
+@pytest.fixture
+def newacq(storage, tmp_path):
+    """Returns a copy of the storage file of the new acquisitions."""
+    path = str(tmp_path / os.path.basename(storage['newacq']))
+    shutil.copyfile(storage['newacq'], path)
+
+    return path
+
+
+def test_identical_to_collection(newacq):
+    pdt.assert_series_equal(counter_total(newacq), collection_total(newacq),
+                            check_names=False, check_index_type=False)
+
+
+def test_rebuilt_after_storage_changed(newacq):
+    full = counter_total(newacq)
+    assert os.path.exists(CollectionCounter(newacq).counter_file_path)
+
+    # e.g. corrected by hand, the counters are not updated
+    pd.read_csv(newacq).head(100).to_csv(newacq, index=False)
+    truncated = counter_total(newacq)
+
+    assert truncated.iloc[-1] < full.iloc[-1]
+    pdt.assert_series_equal(truncated, collection_total(newacq),
+                            check_names=False, check_index_type=False)
+
+
+def test_loaded_while_storage_unchanged(newacq):
+    counter = CollectionCounter(newacq)
+    mtime = os.stat(counter.counter_file_path).st_mtime_ns
+
+    pdt.assert_frame_equal(CollectionCounter(newacq)._counts, counter._counts)
+    assert os.stat(counter.counter_file_path).st_mtime_ns == mtime
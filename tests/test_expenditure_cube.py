@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Checks the expenditure cube (src/expenditure_cube.py): its methods give the
+same results as the methods of Expenditures (data_prep) on the synthetic umsatz
+and budget data, also after an update with the delta of an import. The range
+queries are checked for the positions of a date range on the time axis (the
+start rounded down to the first of its month) and the sums as differences of
+the prefix sums, against a small hand-made storage file and against sums over
+the monthly values of the synthetic umsatz data.
+
+    python -m pytest tests
+"""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from src.data_prep import Expenditures
+from src.expenditure_cube import ExpenditureCube
+
+# the columns of the datasets
+COLUMNS = {'umsatz': dict(col_name_date='Datum', col_name_body='Lieferant Abk.',
+                          col_name_expnd='Umsatz (EUR)'),
+           'budget': dict(col_name_date='Datum', col_name_body='Bezeichnung',
+                          col_name_expnd='Ausg. ges.')}
+
+# accumulated per year like the storage files, the monthly values are
+# A: 2019-11 10, 2019-12 20, 2020-01 5, 2020-02 0, 2020-03 7
+# B: 2020-01 100, 2020-03 50
+ROWS = [('2019-11-01', 'A', 10), ('2019-12-01', 'A', 30), ('2020-01-01', 'A', 5),
+        ('2020-01-01', 'B', 100), ('2020-02-01', 'A', 5), ('2020-03-01', 'A', 12),
+        ('2020-03-01', 'B', 150)]
+
+
+def bodies(path, col_name_body):
+    """Returns some bodies of the storage file and an unknown body."""
+    values = pd.read_csv(path)[col_name_body].dropna().unique()
+
+    return [values[0], values[len(values) // 2], values[-1], 'unknown']
+
+
+def assert_same_rows(result, expected):
+    """The cube returns the same rows, without the other columns and index of
+    the frame of Expenditures."""
+    pdt.assert_frame_equal(result.reset_index(drop=True),
+                           expected[list(result.columns)].reset_index(drop=True),
+                           check_dtype=False)
+
+
+@pytest.mark.parametrize('dataset', ['umsatz', 'budget'])
+def test_identical_to_expenditures(storage, dataset):
+    path = storage[dataset]
+    cols = COLUMNS[dataset]
+    date, body_col, expnd = cols['col_name_date'], cols['col_name_body'], cols['col_name_expnd']
+    cube = ExpenditureCube(path, col_name_body=body_col, col_name_expnd=expnd,
+                           col_name_expnd_diff='Diff')
+
+    assert np.isclose(cube.total_expnd_net(), Expenditures(path).total_expnd_net(date, expnd))
+    assert np.isclose(cube.total_expnd_net_current_year(),
+                      Expenditures(path).total_expnd_net_current_year(date, expnd))
+    assert_same_rows(cube.total_expnd_net_years(),
+                     Expenditures(path).total_expnd_net_years(date))
+    for number in (0, 4, 9):
+        pdt.assert_frame_equal(cube.total_expnd_by_bodies_above_value(number),
+                               Expenditures(path).total_expnd_by_bodies_above_value(
+                                   date, body_col, expnd, number=number))
+
+    for body in bodies(path, body_col):
+        assert np.allclose(cube.total_expnd_mean_by_body(body),
+                           Expenditures(path).total_expnd_mean_by_body(
+                               date, expnd, body_col, body=body), equal_nan=True)
+        assert np.isclose(cube.total_expnd_net_current_year_by_body(body),
+                          Expenditures(path).total_expnd_net_current_year_by_body(
+                              date, expnd, body_col, body=body))
+        assert_same_rows(cube.total_expnd_net_year_by_body(body),
+                         Expenditures(path).total_expnd_net_year_by_body(
+                             date, body_col, body=body))
+        assert_same_rows(cube.total_expnd_net_year(body),
+                         Expenditures(path).total_expnd_net_year(
+                             date, body_col, expnd, 'Diff', body=body))
+
+
+def test_update_identical_to_rebuild(storage, tmp_path):
+    df = pd.read_csv(storage['umsatz'])
+    path = str(tmp_path / 'umsatz_total.csv')
+    half = len(df.index) // 2
+    df.iloc[:half].to_csv(path, index=False)
+    cube = ExpenditureCube(path)
+
+    # the import appends the delta to the storage file and updates the cube
+    df.to_csv(path, index=False)
+    cube.update(df.iloc[half:])
+    cube.save()
+
+    rebuilt = ExpenditureCube(storage['umsatz'])
+    pdt.assert_frame_equal(cube._cube, rebuilt._cube)
+    assert cube.total_expnd_net_range() == rebuilt.total_expnd_net_range()
+    # the saved cube belongs to the new version of the storage file
+    pdt.assert_frame_equal(ExpenditureCube(path)._cube, rebuilt._cube)
+
+
+@pytest.fixture
+def cube(tmp_path):
+    """Returns the cube of the hand-made storage file."""
+    path = str(tmp_path / 'umsatz_total.csv')
+    pd.DataFrame(ROWS, columns=['Datum', 'Lieferant Abk.', 'Umsatz (EUR)']).to_csv(
+        path, index=False)
+
+    return ExpenditureCube(path, col_name_expnd_diff='Umsatz Diff')
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    (None, None, (0, 5)),
+    ('2019-12-01', '2020-01-01', (1, 3)),
+    # the start includes its month, the end is inclusive
+    ('2019-12-15', '2020-01-31', (1, 3)),
+    ('2020-01-31', '2020-01-31', (2, 3)),
+    ('2020-01-01', None, (2, 5)),
+    (None, '2019-10-31', (0, 0)),
+    ('2020-04-01', None, (5, 5)),
+    # an end before the start is an empty range
+    ('2020-03-01', '2019-12-01', (4, 4)),
+])
+def test_range(cube, start, end, expected):
+    assert cube._range(start, end) == expected
+
+
+@pytest.mark.parametrize('start, end, body, expected', [
+    (None, None, None, 192.0),
+    (None, None, 'A', 42.0),
+    (None, None, 'B', 150.0),
+    ('2019-12-15', '2020-01-31', 'A', 25.0),
+    ('2019-12-15', '2020-01-31', None, 125.0),
+    ('2020-02-01', '2020-02-29', 'B', 0.0),
+    ('2020-03-01', '2019-12-01', None, 0.0),
+    (None, None, 'unknown', 0.0),
+])
+def test_total_expnd_net_range(cube, start, end, body, expected):
+    assert cube.total_expnd_net_range(start, end, body) == expected
+
+
+def test_total_expnd_net_months(cube):
+    result = cube.total_expnd_net_months('2019-12-15', '2020-03-01', 'B')
+
+    pdt.assert_frame_equal(result, pd.DataFrame({
+        'Datum': ['2019-12-01', '2020-01-01', '2020-02-01', '2020-03-01'],
+        'Umsatz Diff': [0.0, 100.0, 0.0, 50.0]}))
+    assert cube.total_expnd_net_months(body='unknown')['Umsatz Diff'].tolist() == [0.0] * 5
+    assert cube.total_expnd_net_months(body=None)['Umsatz Diff'].tolist() == [
+        10.0, 20.0, 105.0, 0.0, 57.0]
+
+
+def test_total_expnd_by_bodies_range(cube):
+    result = cube.total_expnd_by_bodies_range('2020-01-01', None, number=1)
+
+    pdt.assert_frame_equal(result, pd.DataFrame({'Lieferant Abk.': ['B', 'Sonstige'],
+                                                 'Umsatz (EUR)': [150.0, 12.0]}))
+
+
+def test_ranges_of_synthetic_data(storage):
+    cube = ExpenditureCube(storage['umsatz'])
+    months = cube._cube
+    dates = sorted(months['Datum'].unique())
+    starts = [None] + dates[::5] + ['{}-15'.format(dates[3][:7])]
+    ends = [None] + dates[2::5]
+
+    for start, end in itertools.product(starts, ends):
+        first = '' if start is None else start[:7] + '-01'
+        last = '9999' if end is None else end
+        selected = months[(months['Datum'] >= first) & (months['Datum'] <= last)]
+        sums = selected.groupby('Lieferant Abk.')['Differenz'].sum()
+
+        assert np.isclose(cube.total_expnd_net_range(start, end), selected['Differenz'].sum())
+        for body in ('Antiquariat', 'Buchhandlung Klee'):
+            assert np.isclose(cube.total_expnd_net_range(start, end, body), sums.get(body, 0.0))
@@ -0,0 +1,26 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Checks that every series of the metrics (src/metrics.py) is labelled with
+the pid of the process, so the workers of gunicorn report separate series.
+
+    python -m pytest tests
+"""
+
+import os
+
+from src import metrics
+
+
+def test_every_series_has_pid():
+    histogram = metrics.Histogram('test_seconds', 'Test.', ('route',))
+    histogram.observe(0.1, '/')
+    unlabelled = metrics.Histogram('test_total_seconds', 'Test.')
+    unlabelled.observe(0.1)
+
+    lines = [line for line in '\n'.join([histogram.render(), unlabelled.render(),
+                                         metrics.render()]).splitlines()
+             if line and not line.startswith('#')]
+
+    assert lines
+    pid = 'pid="{}"'.format(os.getpid())
+    assert all(line.split(' ')[0].split('{')[1].startswith(pid) for line in lines)
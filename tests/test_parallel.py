@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Checks that the partitioned summation in the worker processes of
+src/parallel.py returns the same results as the single-threaded groupby, also
+for the methods of Collection and LoanColl in the parallel mode.
+
+    python -m pytest tests
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from src import parallel
+from src.data_prep import Collection, LoanColl
+
+NEWACQ_COPY = dict(col_name_date='Datum', col_name_shelfmark='Signatur', col_name_copy='Ex')
+
+CHECKS = [
+    (Collection, 'newacq', 'total_collection_years',
+     dict(col_name_date='Datum', col_name_shelfmark='Signatur')),
+    (Collection, 'newacq', 'development_cumsum', NEWACQ_COPY),
+    (Collection, 'newacq', 'development_collection_top_class_years',
+     dict(NEWACQ_COPY, col_name_class='Systematikgruppe')),
+    (Collection, 'newacq', 'development_collection_class_overall_top',
+     dict(NEWACQ_COPY, col_name_class='Systematikgruppe')),
+    (LoanColl, 'loan', 'total_loans',
+     dict(col_name_year='year', col_name_loan='cum_loans', col_name_class='Systematikgruppe',
+          number=5, per_year=True)),
+    (LoanColl, 'loan', 'library_loan_class',
+     dict(col_name_year='year', col_name_class='Systematikgruppe',
+          exclude_value='Buchservice', col_name_loan='cum_loans')),
+]
+
+
+@pytest.fixture(scope='module')
+def pool():
+    """Starts a pool of two worker processes for the tests of this module."""
+    if parallel.start_pool(2) != 2:
+        pytest.skip('no fork start method')
+    yield
+    parallel.stop_pool()
+
+
+@pytest.fixture
+def frame():
+    """A frame with a date index over several years."""
+    rng = np.random.RandomState(0)
+    index = pd.to_datetime('2015-01-01') + pd.to_timedelta(rng.randint(0, 2500, 5000), unit='D')
+
+    return pd.DataFrame({'class': rng.choice(list('ABCDE'), 5000),
+                         'loans': rng.randint(0, 50, 5000),
+                         'copies': rng.rand(5000)}, index=index)
+
+
+@pytest.mark.parametrize('value_cols', ['loans', ['loans', 'copies']])
+def test_partitioned_equal_to_groupby(pool, frame, value_cols):
+    by = [frame.index.year, 'class']
+    expected = frame.groupby(by)[value_cols].sum()
+    result = parallel.partitioned_groupby_sum(frame, by, value_cols, frame.index.year,
+                                              threshold=0)
+
+    if isinstance(value_cols, str):
+        pdt.assert_series_equal(result, expected)
+    else:
+        pdt.assert_frame_equal(result, expected)
+
+
+def test_serial_in_other_process(pool, frame, monkeypatch):
+    # e.g. a forked gunicorn worker, which must not use the pool of the master
+    monkeypatch.setitem(parallel._POOL, 'pid', os.getpid() + 1)
+    monkeypatch.setattr(parallel, '_sum_chunk', None)
+
+    result = parallel.partitioned_groupby_sum(frame, 'class', 'loans', frame.index.year,
+                                              threshold=0)
+    pdt.assert_series_equal(result, frame.groupby('class')['loans'].sum())
+
+
+@pytest.mark.parametrize('cls, dataset, method, kwargs', CHECKS,
+                         ids=['{}.{}'.format(c[0].__name__, c[2]) for c in CHECKS])
+def test_parallel_equal_to_serial(pool, storage, monkeypatch, cls, dataset, method, kwargs):
+    monkeypatch.setattr(parallel, 'PARALLEL_THRESHOLD', 0)
+    serial = getattr(cls(storage[dataset]), method)(**kwargs)
+    result = getattr(cls(storage[dataset], parallel=True), method)(**kwargs)
+
+    if isinstance(serial, pd.Series):
+        pdt.assert_series_equal(result, serial)
+    else:
+        pdt.assert_frame_equal(result, serial)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Checks that the SQL classes of src/sql_backend.py return the same results
+as the pandas classes of data_prep, on the storage files of the synthetic data
+generator (src/synthetic_data.py, see conftest.py) for all five datasets.
+
+    python -m pytest tests
+"""
+
+import datetime
+
+import pandas as pd
+import pytest
+
+from src.data_prep import Expenditures, Collection, ReadingRoom, LoanColl
+from src.sql_backend import (SqlBackend, SqlExpenditures, SqlCollection, SqlReadingRoom,
+                             SqlLoanColl, compare_backends)
+
+UMSATZ = dict(col_name_date='Datum', col_name_expnd='Umsatz (EUR)')
+UMSATZ_BODY = dict(UMSATZ, col_name_body='Lieferant Abk.')
+NEWACQ = dict(col_name_date='Datum', col_name_shelfmark='Signatur')
+NEWACQ_COPY = dict(NEWACQ, col_name_copy='Ex')
+LOAN = dict(col_name_year='year', col_name_loan='cum_loans')
+LOAN_CLASS = dict(LOAN, col_name_class='Systematikgruppe')
+READING = dict(col_name_year='Jahr', col_name_date='Datum', col_name_month='Monat')
+
+CHECKS = [
+    (Expenditures, SqlExpenditures, 'umsatz', 'total_expnd_net', UMSATZ),
+    (Expenditures, SqlExpenditures, 'umsatz', 'total_expnd_mean_by_body', UMSATZ_BODY),
+    (Expenditures, SqlExpenditures, 'umsatz', 'total_expnd_net_year_by_body',
+     dict(col_name_date='Datum', col_name_body='Lieferant Abk.')),
+    (Expenditures, SqlExpenditures, 'umsatz', 'total_expnd_net_current_year', UMSATZ),
+    (Expenditures, SqlExpenditures, 'umsatz', 'total_expnd_net_current_year_by_body',
+     UMSATZ_BODY),
+    (Expenditures, SqlExpenditures, 'umsatz', 'total_expnd_net_years',
+     dict(col_name_date='Datum')),
+    (Expenditures, SqlExpenditures, 'umsatz', 'total_expnd_net_year',
+     dict(UMSATZ_BODY, col_name_expnd_diff='Diff')),
+    (Expenditures, SqlExpenditures, 'umsatz', 'total_expnd_net_year',
+     dict(UMSATZ_BODY, col_name_expnd_diff='Diff', body=None)),
+    (Expenditures, SqlExpenditures, 'umsatz', 'total_expnd_by_bodies_above_value',
+     dict(UMSATZ_BODY, number=9)),
+    (Expenditures, SqlExpenditures, 'budget', 'total_expnd_by_bodies_above_value',
+     dict(col_name_date='Datum', col_name_body='Bezeichnung', col_name_expnd='Ausg. ges.',
+          number=4)),
+    (Collection, SqlCollection, 'newacq', 'total_collection_years', NEWACQ),
+    (Collection, SqlCollection, 'newacq', 'development_collection_current_year', NEWACQ),
+    (Collection, SqlCollection, 'newacq', 'development_media_type_years',
+     dict(NEWACQ_COPY, col_name_media_type='0500', col_name_year='Jahr')),
+    (Collection, SqlCollection, 'newacq', 'development_by_classification',
+     dict(col_name_date='Datum', col_name_year='Jahr', col_name_class='Systematikgruppe',
+          body='LH')),
+    (Collection, SqlCollection, 'newacq', 'development_cumsum', NEWACQ_COPY),
+    (Collection, SqlCollection, 'newacq', 'development_collection_top_class_years',
+     dict(NEWACQ_COPY, col_name_class='Systematikgruppe')),
+    (Collection, SqlCollection, 'newacq', 'development_collection_class_overall_top',
+     dict(NEWACQ_COPY, col_name_class='Systematikgruppe')),
+    (ReadingRoom, SqlReadingRoom, 'readingroom', 'use_by_years', dict(col_name_year='Jahr')),
+    (ReadingRoom, SqlReadingRoom, 'readingroom', 'use_by_months',
+     dict(READING, year=datetime.date.today().year)),
+    (ReadingRoom, SqlReadingRoom, 'readingroom', 'use_by_months', dict(READING, year=None)),
+    (LoanColl, SqlLoanColl, 'loan', 'total_loans', LOAN_CLASS),
+    (LoanColl, SqlLoanColl, 'loan', 'total_loans', dict(LOAN_CLASS, number=5, per_year=True)),
+    (LoanColl, SqlLoanColl, 'loan', 'top_loans_by_title', dict(LOAN, number=5)),
+    (LoanColl, SqlLoanColl, 'loan', 'top_loans_by_title', dict(LOAN, number=5, keep='all')),
+    (LoanColl, SqlLoanColl, 'loan', 'library_loan_class',
+     dict(col_name_year='year', col_name_class='Systematikgruppe',
+          exclude_value='Buchservice', col_name_loan='cum_loans')),
+]
+
+
+@pytest.mark.parametrize('cls_pandas, cls_sql, dataset, method, kwargs', CHECKS,
+                         ids=['{}.{} ({})'.format(c[1].__name__, c[3], c[2]) for c in CHECKS])
+def test_identical_results(storage, helper, cls_pandas, cls_sql, dataset, method, kwargs):
+    if method == 'development_media_type_years':
+        kwargs = dict(kwargs, file=helper['medientypen'])
+    compare_backends(cls_pandas, cls_sql, storage[dataset], method, **kwargs)
+
+
+def test_integer_columns_from_whole_file(tmp_path):
+    # the fractional value is far behind the first rows
+    path = str(tmp_path / 'readingroom_total.csv')
+    pd.DataFrame({'Jahr': [2020] * 2000 + [2021], 'Monat': 1,
+                  'Besuche': [1] * 2000 + [2.5]}).to_csv(path, index=False)
+
+    compare_backends(ReadingRoom, SqlReadingRoom, path, 'use_by_years', col_name_year='Jahr')
+
+
+def test_files_of_tenants_are_separate(tmp_path):
+    backend = SqlBackend('sqlite')
+    totals = []
+    for tenant, visits in (('a', 1), ('b', 2)):
+        (tmp_path / tenant).mkdir()
+        path = str(tmp_path / tenant / 'readingroom_total.csv')
+        pd.DataFrame({'Jahr': [2020], 'Monat': [1], 'Besuche': [visits]}).to_csv(path, index=False)
+        totals.append(path)
+
+    result = [SqlReadingRoom(path, backend=backend).use_by_years('Jahr')['Besuche'].tolist()
+              for path in totals]
+    assert result == [[1], [2]]
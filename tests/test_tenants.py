@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Checks the tenants (src/tenants.py and TENANTS in configuration.py): the
+mapping of the paths to the data folder of a tenant, the routing of the
+requests by the url prefix (TenantMiddleware) and that the callbacks of the
+dashboard serve the data of the tenant of the request. A wrong entry of
+DASHBOARD_TENANTS is reported with the entry at import time.
+
+    python -m pytest tests
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src import tenants
+from src.expenditure_cube import ExpenditureCube
+from src.synthetic_data import SyntheticData, DATASETS, dataset_paths
+from src.tenants import TenantLocal, TenantMiddleware, current_tenant, tenant_path, use_tenant
+
+from configuration import DEFAULT_TENANT, PROCESS_TENANT, FILEPATH_UMSATZ_STOR
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# requests the supplier cards of the umsatz tab for the tenants a and b (url
+# prefix /b), run in a new process with the tenants in the environment
+CALLBACK_SCRIPT = """
+import json, sys
+import index
+index.preload()
+client = index.server.test_client()
+payload = {'output': '..expnd_net_year_by_body.figure...umsatz_diff.figure...umsatz_card.children..',
+           'outputs': [{'id': 'expnd_net_year_by_body', 'property': 'figure'},
+                       {'id': 'umsatz_diff', 'property': 'figure'},
+                       {'id': 'umsatz_card', 'property': 'children'}],
+           'inputs': [{'id': 'my-id1', 'property': 'value', 'value': sys.argv[1]}],
+           'changedPropIds': ['my-id1.value']}
+print(json.dumps({tenant: client.post(prefix + '/_dash-update-component',
+                                      json=payload).get_json()['response']['umsatz_card']
+                  for tenant, prefix in (('a', ''), ('b', '/b'))}))
+"""
+
+
+@pytest.fixture
+def tenant_b(monkeypatch):
+    """Adds the tenant b with the directory /srv/b."""
+    monkeypatch.setitem(tenants.TENANTS, 'b', '/srv/b')
+
+    return 'b'
+
+
+def test_tenant_path(tenant_b):
+    expected = '/srv/b/data/storage_folders/umsatz/umsatz_total.csv'
+
+    assert tenant_path(FILEPATH_UMSATZ_STOR, tenant_b) == expected
+    assert tenant_path(FILEPATH_UMSATZ_STOR) == FILEPATH_UMSATZ_STOR
+    with use_tenant(tenant_b):
+        assert current_tenant() == tenant_b
+        assert tenant_path(FILEPATH_UMSATZ_STOR) == expected
+        # paths outside the data folder are not mapped
+        assert tenant_path(__file__) == __file__
+    assert current_tenant() == PROCESS_TENANT == DEFAULT_TENANT
+
+
+def test_unknown_tenant():
+    with pytest.raises(KeyError):
+        with use_tenant('unknown'):
+            pass
+
+
+def test_tenant_local(tenant_b):
+    local = TenantLocal(lambda: [current_tenant()])
+
+    with use_tenant(tenant_b):
+        assert local() == [tenant_b]
+        assert local() is local()
+    assert local() == [DEFAULT_TENANT]
+
+
+@pytest.mark.parametrize('path, tenant, script_name, path_info', [
+    ('/b/_dash-layout', 'b', '/b', '/_dash-layout'),
+    ('/b/', 'b', '/b', '/'),
+    ('/_dash-layout', DEFAULT_TENANT, '', '/_dash-layout'),
+    ('/', DEFAULT_TENANT, '', '/'),
+    # only the first part of the url is a tenant
+    ('/bb/_dash-layout', DEFAULT_TENANT, '', '/bb/_dash-layout'),
+    ('/assets/b/style.css', DEFAULT_TENANT, '', '/assets/b/style.css'),
+])
+def test_middleware_routes_by_prefix(tenant_b, path, tenant, script_name, path_info):
+    seen = {}
+
+    def app(environ, start_response):
+        seen.update(tenant=current_tenant(), script_name=environ['SCRIPT_NAME'],
+                    path_info=environ['PATH_INFO'], environ=environ['dashboard.tenant'])
+        return [b'']
+
+    TenantMiddleware(app)({'PATH_INFO': path, 'SCRIPT_NAME': ''}, None)
+
+    assert seen == dict(tenant=tenant, script_name=script_name, path_info=path_info,
+                        environ=tenant)
+    assert current_tenant() == DEFAULT_TENANT
+
+
+@pytest.fixture(scope='module')
+def tenant_dirs(tmp_path_factory):
+    """Writes the synthetic data of two tenants (other seeds) and returns
+    their directories."""
+    dirs = {}
+    for tenant, seed in (('a', 1), ('b', 2)):
+        directory = str(tmp_path_factory.mktemp(tenant))
+        generator = SyntheticData(1, seed, 2)
+        paths = dataset_paths(directory)
+        generator.write_helper_files(paths['helper'])
+        for name in DATASETS:
+            generator.write_storage(getattr(generator, name)(), paths['storage'][name])
+        dirs[tenant] = directory
+
+    return dirs
+
+
+def test_callbacks_serve_data_of_tenant(tenant_dirs):
+    storage = {tenant: dataset_paths(directory)['storage']['umsatz']
+               for tenant, directory in tenant_dirs.items()}
+    cubes = {tenant: ExpenditureCube(path) for tenant, path in storage.items()}
+    body = cubes['a'].total_expnd_net_years()['Lieferant Abk.'].iloc[0]
+    # the card of the supplier in the current year (see generate_card_content)
+    expected = {tenant: '{:,} EUR'.format(int(cube.total_expnd_net_current_year_by_body(body)))
+                .replace(',', '.') for tenant, cube in cubes.items()}
+    assert expected['a'] != expected['b']
+
+    env = dict(os.environ, DASHBOARD_TENANT='a', CLIENTSIDE_FILTERING='0',
+               DASHBOARD_TENANTS='a={a},b={b}'.format(**tenant_dirs),
+               PYTHONPATH=os.pathsep.join([PROJECT_ROOT, os.path.join(PROJECT_ROOT, 'dashboard')]))
+    result = subprocess.run([sys.executable, '-c', CALLBACK_SCRIPT, body], env=env,
+                            cwd=os.path.join(PROJECT_ROOT, 'dashboard'),
+                            capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr
+    cards = json.loads(result.stdout.splitlines()[-1])
+
+    for tenant in ('a', 'b'):
+        assert expected[tenant] in json.dumps(cards[tenant], ensure_ascii=False)
+
+
+def import_configuration(**environ):
+    """Imports configuration.py in a new process with the environment
+    variables and returns the process."""
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT, **environ)
+    code = 'import configuration; print(configuration.TENANTS)'
+    return subprocess.run([sys.executable, '-c', code], env=env, capture_output=True, text=True)
+
+
+def test_tenants_from_environment():
+    result = import_configuration(DASHBOARD_TENANTS=' institut-a = /srv/a ,institut-b=/srv/b,')
+
+    assert result.returncode == 0
+    assert "'institut-a': '/srv/a', 'institut-b': '/srv/b'" in result.stdout
+
+
+@pytest.mark.parametrize('value, message', [
+    ('institut-a=/srv/a,institut-b', "the entry 'institut-b' is not 'name=directory'"),
+    ('institut-a=', "the entry 'institut-a=' is not 'name=directory'"),
+    ('=/srv/a', "the entry '=/srv/a' is not 'name=directory'"),
+    ('institut/a=/srv/a', "the entry 'institut/a=/srv/a' is not 'name=directory'"),
+    ('institut-a=/srv/a,institut-a=/srv/b', "the tenant 'institut-a' is defined twice"),
+])
+def test_wrong_entry_is_named(value, message):
+    result = import_configuration(DASHBOARD_TENANTS=value)
+
+    assert result.returncode != 0
+    assert 'ValueError: DASHBOARD_TENANTS: ' + message in result.stderr
+
+
+def test_unknown_process_tenant():
+    result = import_configuration(DASHBOARD_TENANTS='institut-a=/srv/a',
+                                  DASHBOARD_TENANT='institut-b')
+
+    assert "ValueError: DASHBOARD_TENANT: the tenant 'institut-b' is not in" in result.stderr
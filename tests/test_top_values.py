@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+"""Checks bucket_top_values (src/utils.py) and LoanColl.total_loans against
+the groupby implementation they replaced: the values are ranked by the sum of
+their weights (descending, ties by value), the values outside the top number
+are replaced, missing values and rows without group are left out.
+
+    python -m pytest tests
+"""
+
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+import pytest
+
+from src.data_prep import LoanColl
+from src.utils import bucket_top_values
+
+
+def groupby_top_values(df, col_name_sum, col_name_sort, new_value='Sonstige', number=9,
+                       col_name_group=None):
+    """The replaced implementation: groupby, sort and replace (per group)."""
+    df = df.copy()
+    parts = [df] if col_name_group is None else [
+        part for _, part in df.groupby(col_name_group)]
+    for part in parts:
+        sums = part.groupby(col_name_sum)[col_name_sort].sum().sort_values(
+            ascending=False, kind='mergesort')
+        others = part.index[part[col_name_sum].isin(sums.index[number:])]
+        df.loc[others, col_name_sum] = new_value
+
+    return df
+
+
+@pytest.fixture
+def frame():
+    """A small frame with ties, missing values and a row without year."""
+    return pd.DataFrame({
+        'year': [2019, 2019, 2019, 2019, 2020, 2020, 2020, np.nan, 2020],
+        'class': ['A', 'B', 'C', np.nan, 'A', 'B', 'C', 'C', 'D'],
+        'loans': [5, 3, 3, 9, 1, 4, 2, 8, 2],
+    })
+
+
+@pytest.mark.parametrize('number', [0, 1, 2, 3, 10])
+def test_bucket_overall(frame, number):
+    expected = groupby_top_values(frame, 'class', 'loans', number=number)
+    result = bucket_top_values(frame['class'], frame['loans'], number=number)
+
+    pdt.assert_series_equal(pd.Series(result, name='class'), expected['class'])
+
+
+@pytest.mark.parametrize('number', [0, 1, 2, 3, 10])
+def test_bucket_per_group(frame, number):
+    expected = groupby_top_values(frame, 'class', 'loans', number=number,
+                                  col_name_group='year')
+    result = bucket_top_values(frame['class'], frame['loans'], number=number,
+                               groups=frame['year'])
+
+    pdt.assert_series_equal(pd.Series(result, name='class'), expected['class'])
+    # the row without year is not ranked
+    assert result[7] == 'C'
+
+
+@pytest.mark.parametrize('per_year', [False, True])
+def test_total_loans(storage, per_year):
+    df = pd.read_csv(storage['loan'])
+    df = groupby_top_values(df, 'Systematikgruppe', 'cum_loans', number=5,
+                            col_name_group='year' if per_year else None)
+    expected = df.groupby(['year', 'Systematikgruppe']).sum().reset_index().set_index('year')
+
+    result = LoanColl(storage['loan']).total_loans(
+        col_name_year='year', col_name_loan='cum_loans', col_name_class='Systematikgruppe',
+        number=5, per_year=per_year)
+
+    pdt.assert_frame_equal(result, expected, check_index_type=False)